@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+import json
+import math
+import os
+
+
+class P2Quantile:
+    """P² streaming quantile estimator (Jain & Chlamtac). O(1) memory and time."""
+
+    __slots__ = ("p", "n", "q", "pos", "desired", "incr")
+
+    def __init__(self, p):
+        self.p = p
+        self.n = 0
+        self.q = []
+        self.pos = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.incr = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def update(self, x):
+        self.n += 1
+        if self.n <= 5:
+            self.q.append(x)
+            self.q.sort()
+            return
+        q, pos = self.q, self.pos
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            self.desired[i] += self.incr[i]
+        for i in (1, 2, 3):
+            d = self.desired[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                d = 1 if d > 0 else -1
+                # Piecewise-parabolic prediction, falling back to linear if it overshoots
+                qp = q[i] + d / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + d) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i])
+                    + (pos[i + 1] - pos[i] - d) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (pos[i + d] - pos[i])
+                q[i] = qp
+                pos[i] += d
+
+    @property
+    def value(self):
+        if not self.q:
+            return None
+        if self.n <= 5:
+            return self.q[min(len(self.q) - 1, int(round(self.p * (len(self.q) - 1))))]
+        return self.q[2]
+
+    def to_dict(self):
+        return {"p": self.p, "n": self.n, "q": self.q, "pos": self.pos, "desired": self.desired}
+
+    @classmethod
+    def from_dict(cls, data):
+        est = cls(data["p"])
+        est.n, est.q, est.pos, est.desired = data["n"], data["q"], data["pos"], data["desired"]
+        return est
+
+
+class AnomalyDetector:
+    """Flags sustained deviations of one metric from its own learned baseline.
+
+    A slow EWMA/EWMV learns the baseline (mean, variance) and a P² estimator
+    tracks its upper quantile. The default slow_alpha gives the baseline a
+    half-life of ln(2) / slow_alpha ≈ 17,000 samples, about 10 hours at the
+    2 s main-loop tick. A fast EWMA follows the current level. The
+    score is how many baseline standard deviations the fast level sits above
+    (or below) the baseline. A detector enters the anomalous state after
+    `hold` consecutive samples above z_enter and leaves once the score drops
+    below z_exit, so a metric hovering near the limit does not flap. The
+    baseline barely adapts while anomalous, so a slow creep stays visible.
+    """
+
+    __slots__ = ("name", "direction", "slow_alpha", "fast_alpha", "z_enter", "z_exit", "hold", "warmup",
+                 "mean", "var", "fast", "samples", "streak", "anomalous", "quantile")
+
+    def __init__(self, name, direction="high", slow_alpha=4e-5, fast_alpha=0.05,
+                 z_enter=4.0, z_exit=2.0, hold=15, warmup=1800, quantile=0.99):
+        self.name = name
+        self.direction = direction
+        self.slow_alpha = slow_alpha
+        self.fast_alpha = fast_alpha
+        self.z_enter = z_enter
+        self.z_exit = z_exit
+        self.hold = hold
+        self.warmup = warmup
+        self.mean = None
+        self.var = 0.0
+        self.fast = None
+        self.samples = 0
+        self.streak = 0
+        self.anomalous = False
+        self.quantile = P2Quantile(quantile)
+
+    def score(self):
+        if self.mean is None:
+            return 0.0
+        # Floor the deviation so a perfectly flat baseline does not make every wiggle infinite
+        std = max(math.sqrt(self.var), abs(self.mean) * 0.01, 1e-9)
+        z = (self.fast - self.mean) / std
+        if self.direction == "high":
+            return z
+        if self.direction == "low":
+            return -z
+        return abs(z)
+
+    def update(self, value):
+        """Feeds one sample. Returns "enter", "exit" or None."""
+        if value is None:
+            return None
+        value = float(value)
+        self.samples += 1
+        if self.mean is None:
+            self.mean = self.fast = value
+            self.quantile.update(value)
+            return None
+
+        self.fast += self.fast_alpha * (value - self.fast)
+        alpha = self.slow_alpha / 10 if self.anomalous else self.slow_alpha
+        if self.samples < self.warmup:
+            # Learn quickly until there is enough history for a baseline
+            alpha = max(alpha, 1.0 / self.samples)
+        diff = value - self.mean
+        self.mean += alpha * diff
+        self.var = (1 - alpha) * (self.var + alpha * diff * diff)
+        if not self.anomalous:
+            self.quantile.update(value)
+
+        if self.samples < self.warmup:
+            return None
+        z = self.score()
+        if not self.anomalous:
+            self.streak = self.streak + 1 if z > self.z_enter else 0
+            if self.streak >= self.hold:
+                self.anomalous = True
+                self.streak = 0
+                return "enter"
+        elif z < self.z_exit:
+            self.anomalous = False
+            return "exit"
+        return None
+
+    def to_dict(self):
+        return {"mean": self.mean, "var": self.var, "fast": self.fast, "samples": self.samples,
+                "anomalous": self.anomalous, "quantile": self.quantile.to_dict()}
+
+    def load(self, data):
+        self.mean, self.var, self.fast = data["mean"], data["var"], data["fast"]
+        self.samples, self.anomalous = data["samples"], data["anomalous"]
+        self.quantile = P2Quantile.from_dict(data["quantile"])
+
+
+class AnomalyMonitor:
+    """A set of named detectors whose baselines survive restarts."""
+
+    def __init__(self, detectors, state_file=None):
+        self.detectors = {d.name: d for d in detectors}
+        self.state_file = state_file
+
+    def update(self, name, value):
+        detector = self.detectors.get(name)
+        return detector.update(value) if detector else None
+
+    def load(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name, data in state.items():
+            if name in self.detectors:
+                try:
+                    self.detectors[name].load(data)
+                except (KeyError, TypeError):
+                    pass
+
+    def save(self):
+        if not self.state_file:
+            return
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({name: d.to_dict() for name, d in self.detectors.items() if d.mean is not None}, f)
+        os.replace(tmp, self.state_file)
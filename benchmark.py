@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks the watchdog against local stand-ins for every external service.
+
+    python3 benchmark.py                 # all scenarios
+    python3 benchmark.py detection logs  # selected scenarios
+    python3 benchmark.py --duration 600 --json results.json
+
+Nothing leaves the machine: the node RPC, Huginn and Telegram are served
+from localhost, and fake `monad-status`, `nvme` and `journalctl` executables
+are put first on PATH.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import psutil
+
+random.seed(1234)
+
+
+# --- LOCAL STAND-INS ---
+class FakeNode:
+    """JSON-RPC node producing blocks at a fixed rate. `stalled` freezes the head."""
+
+    def __init__(self, block_time=0.4, txs_per_block=(50, 150)):
+        self.block_time = block_time
+        self.txs_per_block = txs_per_block
+        self.genesis = time.time() - 1000 * block_time
+        self.stalled_at = None
+        self.requests = 0
+
+    def head(self):
+        now = self.stalled_at or time.time()
+        return int((now - self.genesis) / self.block_time)
+
+    def block(self, number):
+        rnd = random.Random(number)
+        return {
+            "number": hex(number),
+            "hash": "0x%064x" % number,
+            "timestamp": hex(int(self.genesis + number * self.block_time)),
+            "transactions": ["0x"] * rnd.randint(*self.txs_per_block),
+            "gasUsed": hex(rnd.randint(10_000_000, 60_000_000)),
+            "baseFeePerGas": hex(50 * 10**9),
+        }
+
+    def call(self, req):
+        method, params = req["method"], req.get("params", [])
+        if method == "eth_blockNumber":
+            result = hex(self.head())
+        elif method == "eth_getBlockByNumber":
+            result = self.block(self.head() if params[0] == "latest" else min(int(params[0], 16), self.head()))
+        elif method == "eth_syncing":
+            result = False
+        elif method == "eth_chainId":
+            result = "0x279f"
+        elif method == "net_peerCount":
+            result = "0x20"
+        else:
+            result = "0x"
+        return {"jsonrpc": "2.0", "id": req.get("id"), "result": result}
+
+    def handle(self, handler):
+        self.requests += 1
+        body = json.loads(handler.rfile.read(int(handler.headers["Content-Length"])))
+        reply = [self.call(r) for r in body] if isinstance(body, list) else self.call(body)
+        return 200, reply
+
+
+class FakeHuginn:
+    """Huginn API with injectable latency, outages and a jail switch."""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.down = False
+        self.jailed = False
+        self.stake = 12_000_000.0
+        self.requests = 0
+
+    def handle(self, handler):
+        self.requests += 1
+        time.sleep(self.latency)
+        if self.down:
+            return 503, {"success": False}
+        path = urlsplit(handler.path).path
+        if "/validator/uptime/" in path:
+            return 200, {"uptime": {"validator_id": 7, "last_block_height": 0, "total_events": 1000,
+                                    "finalized_count": 995, "timeout_count": 5}}
+        if "/staking/validator/" in path:
+            return 200, {"success": True, "validator": {"stake": self.stake, "unclaimed_rewards": 10.0,
+                                                        "jailed": self.jailed, "status": "active"}}
+        if path.endswith("/staking/epoch"):
+            return 200, {"success": True, "epoch": 42, "progress": 0.5, "blocks_remaining": 1000}
+        return 404, {"success": False}
+
+
+class FakeTelegram:
+    """Bot API stand-in that records every sent message with its arrival time."""
+
+    def __init__(self):
+        self.messages = []
+        self.requests = 0
+        self._cond = threading.Condition()
+
+    def handle(self, handler):
+        self.requests += 1
+        path = urlsplit(handler.path).path
+        if path.endswith("/sendMessage"):
+            length = int(handler.headers.get("Content-Length", 0))
+            form = parse_qs(handler.rfile.read(length).decode())
+            with self._cond:
+                self.messages.append((time.time(), form.get("text", [""])[0]))
+                self._cond.notify_all()
+            return 200, {"ok": True, "result": {}}
+        if path.endswith("/getUpdates"):
+            time.sleep(1)  # Short stand-in for a long poll
+        return 200, {"ok": True, "result": []}
+
+    def wait_for(self, needle, since, timeout):
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                for sent_at, text in self.messages:
+                    if sent_at >= since and needle in text:
+                        return sent_at
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+
+def serve(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self):
+            status, body = fake.handle(self)
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = _reply
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+MONAD_STATUS_OUTPUT = """consensus:
+  status: in-sync
+  round: 123456
+statesync:
+  status: done
+triedb:
+  capacity: 1.82 TiB
+  used: 402.11 GiB (21.6%)
+"""
+
+
+def install_fake_binaries(workdir, journal_fifo):
+    """Writes fake monad-status, nvme and journalctl executables and puts them first on PATH."""
+    scripts = {
+        "monad-status": f"#!/bin/sh\ncat <<'EOF'\n{MONAD_STATUS_OUTPUT}EOF\n",
+        "nvme": '#!/bin/sh\necho \'{"critical_warning":0,"temperature":313,"percent_used":3}\'\n',
+        # journalctl -o json stand-in: replays whatever is written to the FIFO
+        "journalctl": f"#!/bin/sh\nexec cat {journal_fifo}\n",
+    }
+    for name, body in scripts.items():
+        path = os.path.join(workdir, name)
+        with open(path, "w") as f:
+            f.write(body)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    os.environ["PATH"] = workdir + os.pathsep + os.environ["PATH"]
+
+
+def journal_line(message, cursor):
+    return json.dumps({"__CURSOR": f"s=bench;i={cursor}", "__REALTIME_TIMESTAMP": str(time.time_ns() // 1000),
+                       "MESSAGE": message}) + "\n"
+
+
+# --- SCENARIOS ---
+def bench_collectors(monitor, env, rounds=50):
+    """Wall and CPU time per call of every collector."""
+    collectors = {
+        "get_eth_block_details": monitor.get_eth_block_details,
+        "get_system_health": monitor.get_system_health,
+        "get_monad_status_details": lambda: monitor.monad_status_collector.run_cli(),
+        "get_validator_api_details": monitor.get_validator_api_details,
+    }
+    results = {}
+    for name, func in collectors.items():
+        func()  # warm up caches and connections
+        wall, cpu = [], []
+        for _ in range(rounds):
+            w, c = time.perf_counter(), time.process_time()
+            func()
+            wall.append(time.perf_counter() - w)
+            cpu.append(time.process_time() - c)
+        wall.sort()
+        results[name] = {
+            "p50_ms": wall[len(wall) // 2] * 1000,
+            "p99_ms": wall[int(len(wall) * 0.99)] * 1000,
+            "cpu_ms": sum(cpu) / len(cpu) * 1000,
+        }
+    return results
+
+
+def bench_logs(monitor, env, lines=300_000, batch=2000):
+    """LogEngine throughput on synthetic journal JSON."""
+    messages = ["proposal received", "sending vote", "committed state", "consensus timeout", "peer connected"]
+    raw = [journal_line(random.choice(messages) + " round=%d" % i, i).rstrip("\n").encode() for i in range(lines)]
+    engine = monitor.LogEngine(cursor_file=os.path.join(env["workdir"], "bench_cursor"))
+    started = time.perf_counter()
+    for i in range(0, lines, batch):
+        engine.process_batch(raw[i:i + batch])
+    elapsed = time.perf_counter() - started
+    return {"lines": lines, "lines_per_sec": lines / elapsed}
+
+
+def bench_detection(monitor, env, timeout=60):
+    """End-to-end latency from a fault to the Telegram message, with the real main loop."""
+    node, huginn, telegram = env["node"], env["huginn"], env["telegram"]
+    threading.Thread(target=monitor.main, daemon=True).start()
+    # Let collectors warm up and the initial API state settle
+    time.sleep(monitor.COLLECTOR_SCHEDULE["validator_api"][0] + 3)
+
+    results = {}
+
+    # Missed blocks: enough consecutive timeouts in the journal to cross the threshold
+    t0 = time.time()
+    for i in range(monitor.ALERT_TIMEOUT_THRESHOLD):
+        env["journal"].write(journal_line("Consensus timeout: failed to propose", 10**6 + i))
+    env["journal"].flush()
+    sent = telegram.wait_for("VALIDATOR ALERT", t0, timeout)
+    results["missed_block_s"] = None if sent is None else sent - t0
+
+    # Jail: flip the Huginn flag
+    t0 = time.time()
+    huginn.jailed = True
+    sent = telegram.wait_for("JAILED", t0, timeout)
+    results["jail_s"] = None if sent is None else sent - t0
+    huginn.jailed = False
+
+    # Stall: freeze the head; latency is reported beyond STALL_TIMEOUT
+    t0 = time.time()
+    node.stalled_at = t0
+    sent = telegram.wait_for("Node STUCK", t0, monitor.STALL_TIMEOUT + timeout)
+    results["stall_beyond_timeout_s"] = None if sent is None else sent - t0 - monitor.STALL_TIMEOUT
+    node.stalled_at = None
+    return results
+
+
+def bench_soak(monitor, env, duration):
+    """Per-tick CPU time and RSS growth of the running watchdog (run after detection)."""
+    proc = psutil.Process()
+    rss_start = proc.memory_info().rss
+    cpu_start = time.process_time()
+    requests_start = env["node"].requests + env["huginn"].requests + env["telegram"].requests
+    time.sleep(duration)
+    cpu = time.process_time() - cpu_start
+    ticks = duration / monitor.CHECK_INTERVAL
+    return {
+        "duration_s": duration,
+        "cpu_ms_per_tick": cpu / ticks * 1000,
+        "cpu_percent": cpu / duration * 100,
+        "rss_start_mb": rss_start / 2**20,
+        "rss_growth_mb": (proc.memory_info().rss - rss_start) / 2**20,
+        "outbound_requests_per_sec": (env["node"].requests + env["huginn"].requests + env["telegram"].requests - requests_start) / duration,
+        # The watchdog's own view: p50/p99 per collector and outbound call, loop overruns
+        "self_instrumentation": {
+            f"{kind}:{name}": {"p50_ms": h["p50"] * 1000, "p99_ms": h["p99"] * 1000, "count": h["count"]}
+            for (kind, name), h in sorted(monitor.perf.snapshot()["histograms"].items())
+        },
+        "loop_overruns": monitor.perf.snapshot()["counters"].get("loop_overruns", 0),
+    }
+
+
+def bench_heartbeat(env, duration=5, clients=50, nodes=2000):
+    """Heartbeat server throughput: keep-alive HTTP pings and signed UDP datagrams."""
+    import heartbeat_server as hb
+    from heartbeat_packet import encode_heartbeat
+
+    hb.send_alert = lambda msg: None
+    hb.HEARTBEAT_SECRET = "bench-secret"
+    hb.NODE_TIMEOUTS = {f"n{i}": hb.TIMEOUT_LIMIT for i in range(nodes)}
+    hb.MAX_NODES = 2 * nodes
+
+    async def run():
+        service = hb.HeartbeatService()
+        server = await asyncio.start_server(lambda r, w: hb.handle_http(service, r, w), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: hb.HeartbeatDatagramProtocol(service), local_addr=("127.0.0.1", 0))
+        udp_port = transport.get_extra_info("sockname")[1]
+        tasks = [asyncio.create_task(service.expire_loop()), asyncio.create_task(service.alert_worker())]
+        stop_at = time.monotonic() + duration
+        counts = []
+
+        async def client(i):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            n = 0
+            while time.monotonic() < stop_at:
+                writer.write(f"GET /ping?node=n{(i * 7919 + n) % nodes} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+                await writer.drain()
+                await reader.readuntil(b"OK")
+                n += 1
+            writer.close()
+            counts.append(n)
+
+        await asyncio.gather(*(client(i) for i in range(clients)))
+        http_rate = sum(counts) / duration
+
+        def udp_flood():
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            packets = [encode_heartbeat("bench-secret", f"u{i % nodes}", 10**12 + i, i, 3) for i in range(50_000)]
+            for p in packets:
+                sock.sendto(p, ("127.0.0.1", udp_port))
+            return len(packets)
+
+        before = sum(n.pings for n in service.nodes.values())
+        started = time.monotonic()
+        sent = await asyncio.to_thread(udp_flood)
+        await asyncio.sleep(0.5)
+        accepted = sum(n.pings for n in service.nodes.values()) - before
+        udp_rate = accepted / (time.monotonic() - started)
+
+        for t in tasks:
+            t.cancel()
+        transport.close()
+        server.close()
+        return {"http_pings_per_sec": http_rate, "udp_sent": sent, "udp_accepted": accepted,
+                "udp_pings_per_sec": udp_rate, "nodes": len(service.nodes)}
+
+    return asyncio.run(run())
+
+
+def setup_environment(args):
+    workdir = tempfile.mkdtemp(prefix="watchdog-bench-")
+    fifo = os.path.join(workdir, "journal.fifo")
+    os.mkfifo(fifo)
+    install_fake_binaries(workdir, fifo)
+
+    env = {
+        "workdir": workdir,
+        "node": FakeNode(block_time=args.block_time),
+        "huginn": FakeHuginn(latency=args.huginn_latency),
+        "telegram": FakeTelegram(),
+    }
+    rpc_url = serve(env["node"])
+    huginn_url = serve(env["huginn"])
+    telegram_url = serve(env["telegram"])
+
+    import monitor
+    from huginn_client import HuginnClient
+    from state_store import StateStore
+
+    monitor.NODE_RPC_URL = rpc_url
+    monitor.block_ingestor.rpc_url = rpc_url
+    monitor.rpc_probe.rpc_url = rpc_url
+    monitor.HUGINN_BASE_URL = huginn_url
+    monitor.huginn = HuginnClient(huginn_url)
+    monitor.huginn.on_request = lambda path, seconds: monitor.perf.observe("outbound", "huginn", seconds)
+    monitor.TELEGRAM_API_URL = telegram_url
+    monitor.TELEGRAM_BOT_TOKEN = "bench"
+    monitor.TELEGRAM_CHAT_ID = "1"
+    monitor.DISCORD_WEBHOOK_URL = ""
+    monitor.WATCHDOG_SERVER_IP = ""
+    monitor.FLEET_NODES = []
+    monitor.STALL_TIMEOUT = args.stall_timeout
+    monitor.ANOMALY_DETECTION = False
+    monitor.log_engine = monitor.LogEngine(cursor_file=os.path.join(workdir, "cursor"))
+    # Everything main() persists or re-reads stays in the workdir, so a run leaves no fake state behind
+    monitor.STATE_FILE = os.path.join(workdir, "state.json")
+    monitor.state_store = StateStore(monitor.STATE_FILE, monitor.STATE_SAVE_INTERVAL, monitor.STATE_VOLATILE_SAVE_INTERVAL)
+    monitor.ANOMALY_STATE_FILE = monitor.anomaly_monitor.state_file = os.path.join(workdir, "anomaly.json")
+    monitor.PROFILE_DIR = monitor.profiler.output_dir = workdir
+    monitor.CONFIG_FILE = os.path.join(workdir, "config.py")
+
+    # Opening the FIFO for writing blocks until the fake journalctl opens it
+    threading.Thread(target=lambda: env.__setitem__("journal", open(fifo, "w")), daemon=True).start()
+    return monitor, env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", default=["collectors", "logs", "heartbeat", "detection", "soak"],
+                        help="collectors, logs, heartbeat, detection, soak")
+    parser.add_argument("--duration", type=float, default=60, help="soak duration in seconds")
+    parser.add_argument("--block-time", type=float, default=0.4)
+    parser.add_argument("--huginn-latency", type=float, default=0.05)
+    parser.add_argument("--stall-timeout", type=int, default=10)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    monitor, env = setup_environment(args)
+    results = {}
+    for scenario in args.scenarios:
+        print(f"⏱️  {scenario}...", flush=True)
+        if scenario == "collectors":
+            results[scenario] = bench_collectors(monitor, env)
+        elif scenario == "logs":
+            results[scenario] = bench_logs(monitor, env)
+        elif scenario == "heartbeat":
+            results[scenario] = bench_heartbeat(env)
+        elif scenario == "detection":
+            results[scenario] = bench_detection(monitor, env)
+        elif scenario == "soak":
+            if "detection" not in results:
+                threading.Thread(target=monitor.main, daemon=True).start()
+                time.sleep(5)
+            results[scenario] = bench_soak(monitor, env, args.duration)
+        else:
+            parser.error(f"unknown scenario {scenario}")
+        print(json.dumps(results[scenario], indent=2, default=str), flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import hmac
+import struct
+import time
+
+# --- HEARTBEAT PACKET ---
+# Shared by monitor.py (sender) and heartbeat_server.py (receiver).
+# magic | version | health bitmap | node id length, then node id, then
+# seq | unix time ms | block height, then a truncated HMAC-SHA256 of all of it.
+PACKET_MAGIC = b"MWHB"
+PACKET_VERSION = 1
+PACKET_HEAD = struct.Struct("!4sBHB")
+PACKET_BODY = struct.Struct("!QQQ")
+PACKET_MAC_SIZE = 16
+HEIGHT_UNKNOWN = 2**64 - 1  # Sent when the node's RPC gave no height; decoded as None
+
+HEALTH_RPC_UP = 1
+HEALTH_IN_SYNC = 2
+HEALTH_HUGINN_UP = 4
+HEALTH_JAILED = 8
+HEALTH_MISSING_BLOCKS = 16
+HEALTH_FLAGS = {
+    "rpc_up": HEALTH_RPC_UP,
+    "in_sync": HEALTH_IN_SYNC,
+    "huginn_up": HEALTH_HUGINN_UP,
+    "jailed": HEALTH_JAILED,
+    "missing_blocks": HEALTH_MISSING_BLOCKS,
+}
+
+
+def encode_heartbeat(secret, node_id, seq, height, health, now_ms=None):
+    node = node_id.encode()[:255]
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    payload = PACKET_HEAD.pack(PACKET_MAGIC, PACKET_VERSION, health, len(node)) + node + PACKET_BODY.pack(seq, now_ms, HEIGHT_UNKNOWN if height is None else height)
+    return payload + hmac.new(secret.encode(), payload, hashlib.sha256).digest()[:PACKET_MAC_SIZE]
+
+
+def decode_heartbeat(data, secret_for):
+    """Returns (node_id, seq, sent_ms, height, health) or None if malformed or not authentic.
+
+    height is None when the sender did not know its block height.
+    """
+    if len(data) < PACKET_HEAD.size + PACKET_BODY.size + PACKET_MAC_SIZE:
+        return None
+    magic, version, health, node_len = PACKET_HEAD.unpack_from(data)
+    if magic != PACKET_MAGIC or version != PACKET_VERSION:
+        return None
+    body_at = PACKET_HEAD.size + node_len
+    if len(data) != body_at + PACKET_BODY.size + PACKET_MAC_SIZE:
+        return None
+    node_id = data[PACKET_HEAD.size:body_at].decode(errors="replace")
+    secret = secret_for(node_id)
+    if not secret:
+        return None
+    payload, mac = data[:-PACKET_MAC_SIZE], data[-PACKET_MAC_SIZE:]
+    if not hmac.compare_digest(mac, hmac.new(secret.encode(), payload, hashlib.sha256).digest()[:PACKET_MAC_SIZE]):
+        return None
+    seq, sent_ms, height = PACKET_BODY.unpack_from(data, body_at)
+    return node_id, seq, sent_ms, None if height == HEIGHT_UNKNOWN else height, health
@@ -1,62 +1,317 @@
+import asyncio
+import heapq
+import json
+import math
 import time
-import threading
-import requests
-from flask import Flask
+from urllib.parse import urlsplit, parse_qs
+
+from heartbeat_packet import decode_heartbeat, HEALTH_FLAGS
 
-app = Flask(__name__)
 
 # --- CONFIGURATION ---
 DISCORD_WEBHOOK = "YOUR_DISCORD_WEBHOOK_URL_HERE"
 TELEGRAM_BOT_TOKEN = "YOUR_BOT_TOKEN_HERE"
 TELEGRAM_CHAT_ID = "YOUR_CHAT_ID_HERE"
-TIMEOUT_LIMIT = 180  # Time in seconds (e.g., 180 seconds = 3 minutes)
-
-last_ping_time = time.time()
-alert_sent = False
-
-def send_alert():
-    """Sends a critical alert if the main node stops sending signals"""
-    msg = "🚨 **CRITICAL ALERT: Node Server is Down or Disconnected!** 🚨\n(No heartbeat received for the last 3 minutes!)"
-    
-    # Send to Discord
-    requests.post(DISCORD_WEBHOOK, json={"content": msg})
-    
-    # Send to Telegram
+TIMEOUT_LIMIT = 180  # Default time in seconds (e.g., 180 seconds = 3 minutes)
+LISTEN_HOST = "0.0.0.0"
+LISTEN_PORT = 5000
+
+# Nodes that must be pinging from the start. "default" is the node that calls
+# plain /ping without a node id (single-validator setups). Unauthenticated
+# HTTP pings are only accepted for nodes listed here or in NODE_TIMEOUTS.
+EXPECTED_NODES = ["default"]
+# Per-node timeout overrides in seconds, e.g. {"val-fra-1": 60}
+NODE_TIMEOUTS = {}
+MIN_NODE_TIMEOUT = 5
+MAX_NODE_TIMEOUT = 3600  # Upper bound for a timeout requested with ?timeout= on /ping
+MAX_NODES = 256  # Signed UDP heartbeats may add unlisted nodes up to this many
+
+# --- UDP HEARTBEATS ---
+UDP_PORT = 5000  # Signed UDP heartbeats are accepted on this port (0 = disabled)
+HEARTBEAT_SECRET = ""        # Shared HMAC secret for every node
+HEARTBEAT_SECRETS = {}       # Per-node secrets, e.g. {"val-fra-1": "..."}; override HEARTBEAT_SECRET
+HEARTBEAT_MAX_SKEW = 30      # Reject datagrams whose timestamp is further off than this (seconds)
+CHAIN_STALL_LIMIT = 180      # Alert when a node reports the same block height for this long
+
+
+class NodeState:
+    __slots__ = ("node_id", "timeout", "last_seen", "alerted", "pings", "scheduled",
+                 "seq", "height", "height_changed_at", "health", "stalled")
+
+    def __init__(self, node_id, timeout, now):
+        self.node_id = node_id
+        self.timeout = timeout
+        self.last_seen = now
+        self.alerted = False
+        self.pings = 0
+        self.scheduled = None  # deadline of this node's live heap entry
+        # Reported over signed UDP heartbeats only
+        self.seq = 0
+        self.height = None
+        self.height_changed_at = now
+        self.health = None
+        self.stalled = False
+
+    @property
+    def deadline(self):
+        return self.last_seen + self.timeout
+
+
+class HeartbeatService:
+    """Per-node heartbeat registry with a deadline heap.
+
+    Each node has one live heap entry. A ping only updates last_seen; when the
+    entry surfaces and the node has pinged since, it is pushed back with the
+    real deadline. The expiry task therefore sleeps exactly until the next
+    possible timeout, and pings cost O(1). Only configured nodes may register
+    through plain pings; authenticated heartbeats may add others, up to MAX_NODES.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.heap = []  # (deadline, node_id)
+        self.alerts = asyncio.Queue(maxsize=1000)
+        self._wakeup = asyncio.Event()
+
+    def register(self, node_id, timeout=None):
+        now = time.monotonic()
+        timeout = max(MIN_NODE_TIMEOUT, timeout or NODE_TIMEOUTS.get(node_id, TIMEOUT_LIMIT))
+        node = NodeState(node_id, timeout, now)
+        self.nodes[node_id] = node
+        self._schedule(node)
+        return node
+
+    def _schedule(self, node):
+        earliest = self.heap[0][0] if self.heap else None
+        node.scheduled = node.deadline
+        heapq.heappush(self.heap, (node.deadline, node.node_id))
+        if earliest is None or node.deadline < earliest:
+            self._wakeup.set()
+
+    @staticmethod
+    def configured(node_id):
+        return node_id in EXPECTED_NODES or node_id in NODE_TIMEOUTS or node_id in HEARTBEAT_SECRETS
+
+    @staticmethod
+    def signed_only(node_id, node):
+        """Nodes with their own secret, or that already sent a verified datagram, are refreshed by signed heartbeats only."""
+        return node_id in HEARTBEAT_SECRETS or (node is not None and node.seq > 0)
+
+    def ping(self, node_id, timeout=None, authenticated=False):
+        """Records a heartbeat. Returns the node, or None if `node_id` may not register or needs a signed heartbeat."""
+        if timeout is not None:
+            timeout = min(timeout, MAX_NODE_TIMEOUT) if math.isfinite(timeout) else None
+        node = self.nodes.get(node_id)
+        if not authenticated and self.signed_only(node_id, node):
+            return None
+        if node is None:
+            if not (self.configured(node_id) or (authenticated and len(self.nodes) < MAX_NODES)):
+                return None
+            node = self.register(node_id, timeout)
+        else:
+            node.last_seen = time.monotonic()
+            if timeout and max(MIN_NODE_TIMEOUT, timeout) != node.timeout:
+                node.timeout = max(MIN_NODE_TIMEOUT, timeout)
+                self._schedule(node)
+            elif node.scheduled is None:
+                self._schedule(node)
+        node.pings += 1
+
+        if node.alerted:
+            # Notify if the node comes back online after an outage
+            node.alerted = False
+            self.enqueue_alert(f"✅ **INFO: Node `{node_id}` has reconnected and is sending signals again!**")
+        return node
+
+    def signed_ping(self, node_id, seq, sent_ms, height, health):
+        """Applies an authenticated UDP heartbeat. Replays and stale datagrams are dropped."""
+        node = self.nodes.get(node_id)
+        if node is not None and seq <= node.seq:
+            return False
+        if abs(time.time() * 1000 - sent_ms) > HEARTBEAT_MAX_SKEW * 1000:
+            return False
+
+        node = self.ping(node_id, authenticated=True)
+        if node is None:
+            return False
+        node.seq = seq
+        node.health = health
+        now = time.monotonic()
+        if height is None:
+            # The node's RPC is down; a missing height says nothing about the chain
+            return True
+        if height != node.height:
+            node.height = height
+            node.height_changed_at = now
+            if node.stalled:
+                node.stalled = False
+                self.enqueue_alert(f"✅ **INFO: Node `{node_id}` is producing blocks again (height `{height}`).**")
+        elif not node.stalled and now - node.height_changed_at > CHAIN_STALL_LIMIT:
+            node.stalled = True
+            self.enqueue_alert(
+                f"🛑 **CHAIN STALL: Node `{node_id}` is alive but stuck at block `{height}`** "
+                f"for over {CHAIN_STALL_LIMIT} seconds!"
+            )
+        return True
+
+    def enqueue_alert(self, msg):
+        try:
+            self.alerts.put_nowait(msg)
+        except asyncio.QueueFull:
+            print(f"[ALERT] Queue full, dropping: {msg}")
+
+    async def expire_loop(self):
+        """Fires exactly when the earliest deadline passes."""
+        while True:
+            self._wakeup.clear()
+            if not self.heap:
+                await self._wakeup.wait()
+                continue
+            delay = self.heap[0][0] - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            deadline, node_id = heapq.heappop(self.heap)
+            node = self.nodes.get(node_id)
+            if node is None or node.scheduled != deadline:
+                continue  # superseded entry
+            if node.deadline > time.monotonic():
+                # Pinged since this entry was pushed; re-arm with the real deadline
+                self._schedule(node)
+                continue
+            node.scheduled = None
+            if not node.alerted:
+                node.alerted = True
+                print(f"[ALERT] No heartbeat from {node_id}! Triggering alarms...")
+                self.enqueue_alert(
+                    f"🚨 **CRITICAL ALERT: Node `{node_id}` is Down or Disconnected!** 🚨\n"
+                    f"(No heartbeat received for the last {node.timeout:.0f} seconds!)"
+                )
+            # The node is re-armed by its next ping
+
+    async def alert_worker(self):
+        """Delivers alerts off the request path."""
+        while True:
+            msg = await self.alerts.get()
+            await asyncio.to_thread(send_alert, msg)
+
+    def status(self):
+        now = time.monotonic()
+        status = {}
+        for node_id, node in self.nodes.items():
+            status[node_id] = {
+                "seconds_since_ping": round(now - node.last_seen, 1),
+                "timeout": node.timeout,
+                "down": node.alerted,
+                "pings": node.pings,
+            }
+            if node.health is not None:
+                status[node_id].update({
+                    "height": node.height,
+                    "stalled": node.stalled,
+                    "health": {name: bool(node.health & bit) for name, bit in HEALTH_FLAGS.items()},
+                })
+        return status
+
+
+def send_alert(msg):
+    """Sends an alert to Discord and Telegram"""
+    import requests  # Only needed here, so importing this module stays cheap
+    try:
+        requests.post(DISCORD_WEBHOOK, json={"content": msg}, timeout=10)
+    except Exception as e:
+        print(f"[ALERT] Discord delivery failed: {e}")
+
     t_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    requests.post(t_url, json={"chat_id": TELEGRAM_CHAT_ID, "text": msg, "parse_mode": "Markdown"})
-
-@app.route('/ping', methods=['GET'])
-def ping():
-    """Endpoint that receives the 'I am alive' signal from the main node"""
-    global last_ping_time, alert_sent
-    last_ping_time = time.time()
-    
-    if alert_sent:
-        # Notify if the server comes back online after an outage
-        recovery_msg = "✅ **INFO: Node Server has reconnected and is sending signals again!**"
-        requests.post(DISCORD_WEBHOOK, json={"content": recovery_msg})
-        
-        t_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        requests.post(t_url, json={"chat_id": TELEGRAM_CHAT_ID, "text": recovery_msg, "parse_mode": "Markdown"})
-        
-        alert_sent = False
-        
-    return "OK", 200
-
-def check_timeout():
-    """Background task that continuously checks the time passed since the last ping"""
-    global alert_sent
-    while True:
-        time.sleep(10)
-        if time.time() - last_ping_time > TIMEOUT_LIMIT and not alert_sent:
-            print("[ALERT] Cannot reach the Node Server! Triggering alarms...")
-            send_alert()
-            alert_sent = True
+    try:
+        requests.post(t_url, json={"chat_id": TELEGRAM_CHAT_ID, "text": msg, "parse_mode": "Markdown"}, timeout=10)
+    except Exception as e:
+        print(f"[ALERT] Telegram delivery failed: {e}")
+
+
+# --- HTTP ---
+async def handle_http(service, reader, writer):
+    """Minimal keep-alive HTTP/1.1 handler for /ping and /nodes."""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2:
+                break
+            method, target = parts[0], parts[1]
+            url = urlsplit(target)
+            query = parse_qs(url.query)
+
+            if method == "GET" and url.path == "/ping":
+                node_id = query.get("node", ["default"])[0][:64]
+                try:
+                    timeout = float(query["timeout"][0]) if "timeout" in query else None
+                except ValueError:
+                    timeout = None
+                if service.ping(node_id, timeout) is None:
+                    status, body, content_type = "403 Forbidden", b"Unknown or signed-only node", "text/plain"
+                else:
+                    status, body, content_type = "200 OK", b"OK", "text/plain"
+            elif method == "GET" and url.path == "/nodes":
+                status, body, content_type = "200 OK", json.dumps(service.status()).encode(), "application/json"
+            else:
+                status, body, content_type = "404 Not Found", b"Not Found", "text/plain"
+
+            keep_alive = headers.get("connection", "").lower() != "close" and parts[-1] == "HTTP/1.1"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+# --- UDP ---
+class HeartbeatDatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, service):
+        self.service = service
+        self.rejected = 0
+
+    def datagram_received(self, data, addr):
+        packet = decode_heartbeat(data, lambda node_id: HEARTBEAT_SECRETS.get(node_id, HEARTBEAT_SECRET))
+        if packet is None or not self.service.signed_ping(*packet):
+            self.rejected += 1
+
+
+async def main():
+    service = HeartbeatService()
+    for node_id in EXPECTED_NODES:
+        service.register(node_id)
+
+    server = await asyncio.start_server(lambda r, w: handle_http(service, r, w), LISTEN_HOST, LISTEN_PORT, backlog=1024)
+    if UDP_PORT and (HEARTBEAT_SECRET or HEARTBEAT_SECRETS):
+        await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: HeartbeatDatagramProtocol(service), local_addr=(LISTEN_HOST, UDP_PORT)
+        )
+        print(f"🔐 Accepting signed UDP heartbeats on port {UDP_PORT}...")
+    print(f"🛡️ Heartbeat Server Started. Listening on port {LISTEN_PORT}...")
+    async with server:
+        await asyncio.gather(server.serve_forever(), service.expire_loop(), service.alert_worker())
+
 
 if __name__ == "__main__":
-    # Start the timeout checker in the background
-    checker = threading.Thread(target=check_timeout, daemon=True)
-    checker.start()
-    
-    print("🛡️ Heartbeat Server Started. Listening on port 5000...")
-    app.run(host='0.0.0.0', port=5000)
+    asyncio.run(main())
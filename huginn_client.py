@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+# --- DEFAULT CACHE TTLs (seconds) ---
+# Matched against the start of the endpoint path. Longer than the watchdog's
+# collector intervals (60 s epoch, 10 s validator), so commands, fleet nodes
+# and back-to-back collections share one fetch.
+DEFAULT_TTLS = {
+    "/staking/epoch": 120,
+    "/staking/validator/": 30,
+    "/validator/uptime/": 20,
+}
+
+
+class HuginnError(Exception):
+    """Raised when the Huginn API cannot serve a request."""
+
+
+class HuginnClient:
+    """Pooled Huginn API client.
+
+    * one keep-alive ``requests.Session`` shared by every caller
+    * per-endpoint TTL cache, revalidated with ETag / If-None-Match
+    * single-flight: concurrent identical requests share one HTTP call
+    * exponential backoff while the API is down (no requests are sent)
+    """
+
+    def __init__(self, base_url, timeout=10, ttls=None, pool_size=4, min_backoff=5, max_backoff=300):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self.session = None  # Created on first fetch, so importing this module stays cheap
+
+        self._lock = threading.Lock()
+        self._cache = {}      # path -> (fetched_at, etag, data)
+        self._inflight = {}   # path -> (event, result holder)
+        self._backoff = 0
+        self._down_until = 0.0
+        self.request_count = 0
+        self.on_request = None  # Optional callback(path, seconds) after every HTTP call
+
+    def _ttl_for(self, path):
+        for prefix, ttl in self.ttls.items():
+            if path.startswith(prefix):
+                return ttl
+        return 0
+
+    def get(self, path, ttl=None, allow_stale=False):
+        """Return the decoded JSON body for ``path``.
+
+        ``allow_stale`` returns the last cached body instead of raising while
+        the API is in backoff or the request fails.
+        """
+        ttl = self._ttl_for(path) if ttl is None else ttl
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached and now - cached[0] < ttl:
+                return cached[2]
+
+            if now < self._down_until:
+                if allow_stale and cached:
+                    return cached[2]
+                raise HuginnError(f"Huginn API in backoff for another {self._down_until - now:.0f}s")
+
+            flight = self._inflight.get(path)
+            leader = flight is None
+            if leader:
+                flight = (threading.Event(), {})
+                self._inflight[path] = flight
+
+        event, holder = flight
+        if not leader:
+            event.wait(self.timeout * 2)
+            if "data" in holder:
+                return holder["data"]
+            if allow_stale and cached:
+                return cached[2]
+            raise HuginnError(holder.get("error", "coalesced request did not complete"))
+
+        try:
+            data = self._fetch(path, cached)
+            holder["data"] = data
+            return data
+        except Exception as e:
+            holder["error"] = str(e)
+            if allow_stale and cached:
+                return cached[2]
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(path, None)
+            event.set()
+
+    def _fetch(self, path, cached):
+        headers = {}
+        if cached and cached[1]:
+            headers["If-None-Match"] = cached[1]
+
+        import requests
+        with self._lock:
+            if self.session is None:
+                from requests.adapters import HTTPAdapter
+                self.session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                self.session.mount("https://", adapter)
+                self.session.mount("http://", adapter)
+            self.request_count += 1
+
+        started = time.perf_counter()
+        try:
+            response = self.session.get(f"{self.base_url}{path}", headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            self._mark_down()
+            raise HuginnError(f"Huginn request failed: {e}") from e
+        finally:
+            if self.on_request:
+                self.on_request(path, time.perf_counter() - started)
+
+        if response.status_code >= 500 or response.status_code == 429:
+            self._mark_down()
+            raise HuginnError(f"Huginn returned HTTP {response.status_code}")
+
+        with self._lock:
+            self._backoff = 0
+            self._down_until = 0.0
+
+            if response.status_code == 304 and cached:
+                self._cache[path] = (time.monotonic(), cached[1], cached[2])
+                return cached[2]
+            if response.status_code != 200:
+                raise HuginnError(f"Huginn returned HTTP {response.status_code}")
+
+            data = response.json()
+            self._cache[path] = (time.monotonic(), response.headers.get("ETag"), data)
+            return data
+
+    def _mark_down(self):
+        with self._lock:
+            self._backoff = min(self.max_backoff, self._backoff * 2 if self._backoff else self.min_backoff)
+            self._down_until = time.monotonic() + self._backoff
+
+    # --- ENDPOINTS ---
+    def epoch(self, allow_stale=True):
+        return self.get("/staking/epoch", allow_stale=allow_stale)
+
+    def validator_uptime(self, address):
+        return self.get(f"/validator/uptime/{address}")
+
+    def validator(self, val_id):
+        return self.get(f"/staking/validator/{val_id}")
@@ -1,24 +1,62 @@
 # -*- coding: utf-8 -*-
-import requests
+import sys
 import time
+import atexit
 import datetime
-import psutil
 import subprocess
 import threading
 import re
+import os
+import json
+import math
+import ctypes
+import fcntl
+import socket
+import signal
+from collections import deque, defaultdict
+
+# requests, psutil, http.server, concurrent.futures and the heartbeat codec are imported
+# where they are first used, so `import monitor` and `--once` probes start fast
+
+from huginn_client import HuginnClient
+from timeseries import MetricsStore
+from anomaly import AnomalyDetector, AnomalyMonitor
+from perf import PerfRecorder, SamplingProfiler, WindowedHistogram
+from state_store import StateStore
+from rules import RuleEngine
+from proposals import ProposalTracker
 
 # --- CONFIGURATION ---
 TELEGRAM_BOT_TOKEN = "YOUR_BOT_TOKEN_HERE"
 TELEGRAM_CHAT_ID = "YOUR_CHAT_ID_HERE"
+TELEGRAM_API_URL = "https://api.telegram.org"
 DISCORD_WEBHOOK_URL = ""  # Paste your Discord Webhook URL here (Leave empty if not using)
 WATCHDOG_SERVER_IP = ""   # IP and port of your external Heartbeat server (e.g., "http://IP:PORT")
+HEARTBEAT_UDP_ADDR = ""   # Signed UDP heartbeats instead of HTTP pings (e.g., "IP:5000")
+HEARTBEAT_SECRET = ""     # Shared HMAC secret, must match the heartbeat server
+HEARTBEAT_NODE_ID = ""    # Node ID reported to the heartbeat server (empty = "default", single-node setups)
 NODE_RPC_URL = "http://localhost:8080"
+NODE_WS_URL = ""          # Optional WebSocket RPC for newHeads streaming (e.g., "ws://localhost:8081", needs websocket-client)
 VALIDATOR_MONIKER = "YOUR_VAL_MONIKER_NAME"
 
+# --- FLEET MODE ---
+# Monitor several validators from one process. Leave empty for single-node mode.
+# e.g. [{"name": "val-fra-1", "rpc_url": "http://10.0.0.5:8080", "validator_address": "0x..."}]
+# Optional per node: "ws_url" for newHeads streaming.
+FLEET_NODES = []
+
 # --- API TRACKING ---
 VALIDATOR_ADDRESS = "YOUR_SECP_ADDRESS"
 HUGINN_BASE_URL = "https://validator-api-testnet.huginn.tech/monad-api"
 
+# --- PROPOSAL TRACKING ---
+PROPOSER_ADDRESS = ""       # Beneficiary (`miner`) in the blocks your node proposes (empty = VALIDATOR_ADDRESS)
+EPOCH_LENGTH = 50_000       # Blocks per epoch, used to bucket proposals
+PROPOSAL_EPOCHS_KEPT = 3    # Completed epochs give the expected proposal share
+# Proposer gaps are roughly geometric: a gap of k usual gaps happens with probability e^-k,
+# so the overdue alert fires at -ln(rate) usual gaps (about 14 for one false alarm per million proposals)
+ALERT_PROPOSAL_FALSE_ALARM_RATE = 1e-6
+
 # --- ALERT THRESHOLDS ---
 ALERT_CPU_THRESHOLD = 80  
 ALERT_DISK_THRESHOLD = 90 
@@ -29,26 +67,155 @@ ALERT_GAS_SEC_THRESHOLD = 300_000_000
 ALERT_BASE_FEE_THRESHOLD = 150  
 STAKE_THRESHOLD = 11_000_000  
 API_LAG_THRESHOLD = 5000  # Trigger alert if the API lags behind the local node by this many blocks
+ALERT_DISK_AWAIT_MS = 10  # Average I/O latency of the TrieDB or OS disk over DISK_LATENCY_WINDOW
 # ------------------------
 
+# --- DISKS ---
+TRIEDB_DEVICE = "/dev/triedb"  # Block device (or any path on the mount) holding TrieDB
+DISK_USAGE_INTERVAL = 60       # Seconds between OS disk fill checks
+DISK_LATENCY_WINDOW = 60       # Seconds averaged before a disk latency alert
+DISK_BASELINE_MAX_AGE = 300    # Saved diskstats older than this are not used as a baseline
+DISK_RESCAN_INTERVAL = 600     # Seconds between rescans of the disk list and the OS/TrieDB disk roles
+
+# --- RPC PROBE ---
+# method: params. Each call is timed on its own over a keep-alive connection.
+RPC_PROBE_CALLS = {
+    "eth_blockNumber": [],
+    "eth_getBlockByNumber": ["latest", False],
+    "eth_chainId": [],
+    "eth_call": [{"to": "0x0000000000000000000000000000000000000000", "data": "0x"}, "latest"],
+}
+RPC_REFERENCE_URLS = []    # Public or peer RPCs to compare the head against (e.g. ["https://testnet-rpc.monad.xyz"])
+RPC_EXPECTED_CHAIN_ID = None  # None = the first chain id the node reports
+RPC_PROBE_TIMEOUT = 5
+RPC_PROBE_WINDOW = 300     # Seconds of calls behind the latency percentiles
+ALERT_RPC_P95_MS = 1000    # p95 latency of any probed method
+ALERT_RPC_ERROR_PCT = 10   # Share of the last 100 probe calls that failed
+ALERT_RPC_LAG_BLOCKS = 10  # Local head behind the highest reference RPC
+
+# --- NETWORK ---
+NETWORK_SOCKET_INTERVAL = 10  # Seconds between socket-state scans of /proc/net/tcp (one line per socket)
+NETWORK_WINDOW = 60           # Seconds averaged before a retransmit or drop alert
+ALERT_MIN_PEERS = 5           # Alert when the node reports fewer peers than this
+ALERT_PEER_DROP_PCT = 50      # Alert when the peer count falls this far below its 10-minute high
+ALERT_TCP_RETRANS_PCT = 2     # Retransmitted share of sent TCP segments
+ALERT_NET_DROPS_PER_SEC = 100  # Dropped or errored packets per second on one interface
+ALERT_UDP_RCVBUF_ERRORS_PER_SEC = 10  # UDP datagrams lost to full socket buffers (consensus traffic is UDP)
+
+# --- MONAD PROCESSES ---
+MONAD_PROCESSES = ("monad-bft", "monad-execution", "monad-rpc")
+REQUIRED_PROCESSES = ("monad-bft", "monad-execution")  # Reported missing even if never seen; add "monad-rpc" on hosts that serve RPC
+PROCESS_RESCAN_INTERVAL = 30  # Seconds between searches for a process that is not running
+PROCESS_PSS_INTERVAL = 60     # PSS walks every mapping, so it is sampled less often
+PROCESS_HOT_THREADS = 3
+ALERT_PROCESS_RSS_GROWTH = 4 * 1024**3  # Bytes of RSS growth within an hour that looks like a leak
+ALERT_PROCESS_FD_RATIO = 0.8           # Share of the open-files limit in use
+
+# --- TELEGRAM COMMANDS ---
+TELEGRAM_LONG_POLL_TIMEOUT = 25  # Seconds getUpdates waits for a new command
+TELEGRAM_WEBHOOK_URL = ""        # Optional public HTTPS URL forwarded to TELEGRAM_WEBHOOK_PORT (empty = long polling)
+TELEGRAM_WEBHOOK_PORT = 8443
+
+# --- ONE-SHOT PROBE (--once) ---
+ONCE_COLLECTORS = ("block", "system", "monad_status", "processes", "logs", "validator_api")
+ONCE_DEADLINE = 4            # Seconds for the whole probe; collectors still running are reported as timed out
+ONCE_SAMPLE_SECONDS = 0.25   # Window for CPU, disk and per-process rates
+ONCE_LOG_LINES = 200         # Recent journal entries scanned for missed blocks
+
+# --- WARM RESTART STATE ---
+STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".watchdog_state.json")
+STATE_SAVE_INTERVAL = 5  # Routine state is written at most this often; alerts and command offsets immediately
+STATE_VOLATILE_SAVE_INTERVAL = 600  # Counters and heights alone never trigger a write more often than this
+
+# --- PROMETHEUS / OPENMETRICS EXPORTER ---
+METRICS_PORT = 0  # Set to e.g. 9101 to serve /metrics (0 = disabled)
+METRICS_BIND = "127.0.0.1"
+
+# --- ADAPTIVE ANOMALY DETECTION ---
+ANOMALY_DETECTION = True
+ANOMALY_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".anomaly_baselines.json")
+ANOMALY_SAVE_INTERVAL = 300
+
+# --- SELF-INSTRUMENTATION ---
+PROFILER_ENABLED = False  # Allow /profile and SIGUSR1 to record flame-graph stacks of the watchdog itself
+PROFILE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_SECONDS = 30
+PROFILE_HZ = 100
+
 CHECK_INTERVAL = 2  
 AUTO_REPORT_INTERVAL = 1 * 60 * 60  
+STALL_TIMEOUT = 180  # Seconds without a new block before the node is considered stuck
+BLOCK_WINDOW_SECONDS = 30  # Sliding window for TPS, gas/sec and block time
+MAX_BACKFILL_BLOCKS = 1000  # Gaps larger than this are skipped instead of backfilled
+RPC_BATCH_SIZE = 100
+BACKFILL_TIME_BUDGET = 2    # Seconds of backfill per poll, well inside the block collector's deadline; the rest follows on the next poll
+
+# --- COLLECTOR SCHEDULE ---
+# name: (interval in seconds, deadline in seconds)
+COLLECTOR_SCHEDULE = {
+    "block": (0.5, 5),
+    "system": (2, 10),
+    "processes": (2, 10),
+    "network": (2, 8),
+    "rpc_probe": (5, 25),
+    "monad_status": (1, 8),
+    "validator_api": (10, 25),
+    "logs": (1, 1),
+    "epoch": (60, 15),
+    "heartbeat": (1, 5),  # Signed UDP heartbeats; HTTP pings are sent every HEARTBEAT_HTTP_INTERVAL
+    "perf": (5, 1),
+}
+HEARTBEAT_HTTP_INTERVAL = 30
+
+# --- ALERT RULES ---
+# Added to the built-in rules (see default_alert_rules). A rule named like a
+# built-in one replaces it; {"name": "high_tps", "enabled": False} switches one off.
+# e.g. {"name": "slow_blocks", "metric": "block_time_ms", "op": ">", "threshold": 800, "for": 60,
+#       "hysteresis": 100, "cooldown": 900, "severity": "warning", "message": "🐌 Blocks take `{value:.0f} ms`"}
+ALERT_RULES = []
+
+# --- CONFIG FILE ---
+# Every setting above can be overridden in config.py next to this script. Thresholds
+# and ALERT_RULES are picked up when the file changes; connection settings need a restart.
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.py")
+
+def read_config_file(path=CONFIG_FILE):
+    """UPPERCASE names defined in `path`, or {} when there is no config file."""
+    try:
+        with open(path) as f:
+            source = f.read()
+    except FileNotFoundError:
+        return {}
+    namespace = {}
+    exec(compile(source, path, "exec"), namespace)
+    return {name: value for name, value in namespace.items() if name.isupper()}
+
+globals().update(read_config_file())
+
 
 start_time = time.time()
 last_update_id = None
-missed_block_counter = 0  
-
-# Disk I/O tracking
-last_io_counters = None
-last_io_time = 0
 
-# Block Time Tracking variables
-last_block_time_check = 0
-last_block_height_for_time = 0
+# OS disk fill, refreshed every DISK_USAGE_INTERVAL
+last_disk_usage = None
+last_disk_usage_time = 0
 
 # Session Tracking
 initial_rewards = None
 
+# Last time each main-loop alert (and the automatic report) went out; survives restarts
+alert_cooldowns = defaultdict(float)
+
+# Rolling history behind /status and the automatic report (bounded ring buffers)
+metrics_store = MetricsStore()
+
+# Latency histograms and counters for the watchdog's own hot paths (/perf and /metrics)
+perf = PerfRecorder()
+
+# Shared, cached Huginn API client (keep-alive pool, TTL cache, backoff)
+huginn = HuginnClient(HUGINN_BASE_URL)
+huginn.on_request = lambda path, seconds: perf.observe("outbound", "huginn", seconds)
+
 def get_uptime():
     seconds = time.time() - start_time
     m, s = divmod(seconds, 60)
@@ -63,49 +230,299 @@ def format_bytes(size):
         size /= 1024.0
 
 def telegram_api(method, data=None):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/{method}"
+    import requests
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/{method}"
     try:
-        if data:
-            response = requests.post(url, data=data, timeout=5)
-        else:
-            response = requests.get(url, timeout=5)
+        with perf.timed("outbound", f"telegram_{method}"):
+            if data:
+                response = requests.post(url, data=data, timeout=5)
+            else:
+                response = requests.get(url, timeout=5)
         return response.json()
     except Exception:
         return None
 
+# --- ALERT DISPATCH ---
+ALERT_QUEUE_SIZE = 100
+ALERT_DEDUP_WINDOW = 30  # Identical alerts within this many seconds are suppressed
+ALERT_MAX_RETRIES = 5
+
+class DeliveryRejected(Exception):
+    """Raised by a channel's send function when retrying cannot help (e.g. HTTP 4xx)."""
+
+class AlertChannel:
+    """One delivery channel with its own bounded queue and worker thread.
+
+    Sends are paced by a token bucket, retried with exponential backoff
+    (honouring the server's retry_after), identical queued messages are
+    coalesced and identical messages sent recently are dropped. Only rate
+    limits, server errors and network errors are retried.
+    """
+
+    def __init__(self, name, send_func, rate_per_sec, burst, queue_size=ALERT_QUEUE_SIZE):
+        self.name = name
+        self.send_func = send_func
+        self.rate_per_sec = rate_per_sec
+        self.burst = burst
+        self.queue_size = queue_size
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.queue = deque()
+        self.recent = {}  # (target, text) -> sent_at
+        self.sent = 0
+        self.dropped = 0
+        self.suppressed = 0
+        self.failed = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, text, target=None, dedup=True):
+        key = (target, text)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            if dedup and time.monotonic() - self.recent.get(key, -ALERT_DEDUP_WINDOW) < ALERT_DEDUP_WINDOW:
+                self.suppressed += 1
+                return
+            for item in self.queue:
+                if item["key"] == key:
+                    item["count"] += 1
+                    return
+            if len(self.queue) >= self.queue_size:
+                self.queue.popleft()
+                self.dropped += 1
+            self.queue.append({"key": key, "count": 1, "queued_at": time.monotonic()})
+            self._cond.notify()
+
+    def _take_token(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate_per_sec)
+            self.last_refill = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            time.sleep((1 - self.tokens) / self.rate_per_sec)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self.queue:
+                    self._cond.wait()
+                item = self.queue.popleft()
+
+            target, text = item["key"]
+            if item["count"] > 1:
+                text += f"\n_(repeated {item['count']}x)_"
+
+            backoff = 1
+            for _ in range(ALERT_MAX_RETRIES):
+                self._take_token()
+                try:
+                    ok, retry_after = self.send_func(target, text)
+                except DeliveryRejected as e:
+                    self.failed += 1
+                    print(f"⚠️ [ALERT] {self.name} rejected the message: {e}")
+                    break
+                if ok:
+                    self.sent += 1
+                    perf.observe("alert_delivery", self.name, time.monotonic() - item["queued_at"])
+                    with self._cond:
+                        self.recent[item["key"]] = time.monotonic()
+                        if len(self.recent) > self.queue_size:
+                            cutoff = time.monotonic() - ALERT_DEDUP_WINDOW
+                            self.recent = {k: t for k, t in self.recent.items() if t > cutoff}
+                    break
+                time.sleep(retry_after or backoff)
+                backoff = min(backoff * 2, 60)
+            else:
+                self.failed += 1
+                print(f"⚠️ [ALERT] {self.name} delivery failed after {ALERT_MAX_RETRIES} attempts.")
+
+    def stats(self):
+        with self._cond:
+            return {"queued": len(self.queue), "sent": self.sent, "dropped": self.dropped, "suppressed": self.suppressed, "failed": self.failed}
+
+def deliver_telegram(chat_id, text):
+    chat_id = chat_id or TELEGRAM_CHAT_ID
+    result = telegram_api("sendMessage", {"chat_id": chat_id, "text": text, "parse_mode": "Markdown"})
+    if result is not None and result.get("error_code") == 400:
+        # Almost always Markdown the parser rejects (an odd `_` or `*`); the plain text still gets through
+        result = telegram_api("sendMessage", {"chat_id": chat_id, "text": text})
+    if result is None:
+        return False, None
+    if result.get("ok"):
+        return True, None
+    code = result.get("error_code") or 0
+    if code == 429 or code >= 500:
+        return False, result.get("parameters", {}).get("retry_after")
+    raise DeliveryRejected(f"HTTP {code}: {result.get('description')}")
+
+def deliver_discord(_target, text):
+    import requests
+    try:
+        with perf.timed("outbound", "discord"):
+            response = requests.post(DISCORD_WEBHOOK_URL, json={"content": text}, timeout=5)
+    except requests.RequestException:
+        return False, None
+    if response.status_code == 429:
+        try:
+            return False, response.json().get("retry_after")
+        except ValueError:
+            return False, None
+    if response.status_code >= 500:
+        return False, None
+    if response.status_code >= 300:
+        raise DeliveryRejected(f"HTTP {response.status_code}: {response.text[:200]}")
+    return True, None
+
+class AlertDispatcher:
+    """Fans every alert out to Telegram and (if configured) Discord without blocking the caller."""
+
+    def __init__(self):
+        # Telegram: about 1 msg/s per chat; Discord webhooks: 5 requests per 2 s
+        self.telegram = AlertChannel("telegram", deliver_telegram, rate_per_sec=1, burst=3)
+        self.discord = AlertChannel("discord", deliver_discord, rate_per_sec=2.5, burst=5)
+        self.history = deque(maxlen=20)  # (timestamp, text) of recent alerts for /alerts
+
+    def channels(self):
+        return [self.telegram, self.discord] if DISCORD_WEBHOOK_URL else [self.telegram]
+
+    def alert(self, text, channel="all"):
+        self.history.append((time.time(), text))
+        for ch in self.channels():
+            if channel in ("all", ch.name):
+                ch.submit(text)
+
+    def message(self, chat_id, text):
+        self.telegram.submit(text, target=chat_id, dedup=False)
+
+alert_dispatcher = AlertDispatcher()
+
 def send_message(chat_id, text):
-    data = {"chat_id": chat_id, "text": text, "parse_mode": "Markdown"}
-    telegram_api("sendMessage", data)
+    alert_dispatcher.message(chat_id, text)
 
-def send_alert(text):
-    send_message(TELEGRAM_CHAT_ID, text)
+def send_alert(text, channel="all"):
+    alert_dispatcher.alert(text, channel)
 
 # --- NVME WEAR & TEMPERATURE FETCHING ---
+NVME_IOCTL_ADMIN_CMD = 0xC0484E41  # _IOWR('N', 0x41, struct nvme_admin_cmd)
+NVME_DEVICE_RESCAN_INTERVAL = 600
+NVME_WEAR_INTERVAL = 3600  # Wear changes over days, no need to read it often
+
+class NvmeAdminCmd(ctypes.Structure):
+    _fields_ = [
+        ("opcode", ctypes.c_uint8), ("flags", ctypes.c_uint8), ("rsvd1", ctypes.c_uint16),
+        ("nsid", ctypes.c_uint32), ("cdw2", ctypes.c_uint32), ("cdw3", ctypes.c_uint32),
+        ("metadata", ctypes.c_uint64), ("addr", ctypes.c_uint64),
+        ("metadata_len", ctypes.c_uint32), ("data_len", ctypes.c_uint32),
+        ("cdw10", ctypes.c_uint32), ("cdw11", ctypes.c_uint32), ("cdw12", ctypes.c_uint32),
+        ("cdw13", ctypes.c_uint32), ("cdw14", ctypes.c_uint32), ("cdw15", ctypes.c_uint32),
+        ("timeout_ms", ctypes.c_uint32), ("result", ctypes.c_uint32),
+    ]
+
+class NvmeReader:
+    """Reads NVMe wear and temperature without forking.
+
+    Temperature (fast path) comes from the controller's hwmon node in sysfs.
+    Wear (slow path) comes from the SMART log page via the NVMe admin ioctl and
+    is cached for NVME_WEAR_INTERVAL; the `nvme` CLI is only used as a fallback
+    when the ioctl is not permitted. The namespace list is cached as well.
+    """
+
+    def __init__(self):
+        self.drives = []
+        self.last_scan = 0
+        self.smart = {}  # drive -> (read_at, wear, temp)
+
+    def scan(self):
+        try:
+            self.drives = sorted(d for d in os.listdir('/sys/block') if re.match(r'^nvme\d+n\d+$', d))
+        except OSError:
+            self.drives = []
+        self.last_scan = time.time()
+
+    @staticmethod
+    def controller(drive):
+        return re.match(r'^(nvme\d+)', drive).group(1)
+
+    def read_hwmon_temp(self, drive):
+        ctrl_dir = f"/sys/class/nvme/{self.controller(drive)}"
+        try:
+            for entry in os.listdir(ctrl_dir):
+                if entry.startswith("hwmon"):
+                    with open(f"{ctrl_dir}/{entry}/temp1_input") as f:
+                        return int(f.read()) // 1000
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def read_smart_ioctl(self, drive):
+        buf = ctypes.create_string_buffer(512)
+        cmd = NvmeAdminCmd()
+        cmd.opcode = 0x02  # Get Log Page
+        cmd.nsid = 0xFFFFFFFF
+        cmd.addr = ctypes.addressof(buf)
+        cmd.data_len = 512
+        cmd.cdw10 = 0x02 | ((512 // 4 - 1) << 16)  # SMART / Health log, NUMD
+        fd = os.open(f"/dev/{self.controller(drive)}", os.O_RDONLY)
+        try:
+            fcntl.ioctl(fd, NVME_IOCTL_ADMIN_CMD, cmd)
+        finally:
+            os.close(fd)
+        raw = buf.raw
+        temp = int.from_bytes(raw[1:3], "little") - 273
+        wear = raw[5]
+        return wear, temp
+
+    def read_smart_cli(self, drive):
+        output = subprocess.check_output(['nvme', 'smart-log', f'/dev/{drive}', '-o', 'json'], text=True, stderr=subprocess.DEVNULL, timeout=5)
+        data = json.loads(output)
+        wear = int(data.get("percent_used", data.get("percentage_used")))
+        temp = int(data["temperature"]) - 273
+        return wear, temp
+
+    def read_smart(self, drive):
+        try:
+            return self.read_smart_ioctl(drive)
+        except Exception:
+            return self.read_smart_cli(drive)
+
+    def stats(self):
+        now = time.time()
+        if now - self.last_scan > NVME_DEVICE_RESCAN_INTERVAL:
+            self.scan()
+
+        result = []
+        for drive in self.drives:
+            cached = self.smart.get(drive)
+            if cached is None or now - cached[0] > NVME_WEAR_INTERVAL:
+                try:
+                    wear, temp = self.read_smart(drive)
+                    cached = (now, wear, temp)
+                except Exception:
+                    # Retry on the next wear refresh rather than every tick
+                    cached = (now, None, None)
+                self.smart[drive] = cached
+            _, wear, smart_temp = cached
+            temp = self.read_hwmon_temp(drive)
+            if temp is None:
+                temp = smart_temp
+            if wear is not None and temp is not None:
+                result.append((drive, wear, temp))
+        return result
+
+nvme_reader = NvmeReader()
+
 def get_nvme_stats():
     nvme_lines = []
     try:
-        ls_output = subprocess.check_output(['ls', '/dev/'], text=True)
-        drives = [d for d in ls_output.split('\n') if re.match(r'^nvme\d+n\d+$', d)]
-        
-        for drive in drives:
-            try:
-                cmd = f"nvme smart-log /dev/{drive}"
-                output = subprocess.check_output(cmd, shell=True, text=True, stderr=subprocess.DEVNULL)
-                
-                wear = None
-                temp = None
-                
-                wear_match = re.search(r'percentage_used\s*:\s*(\d+)', output, re.IGNORECASE)
-                temp_match = re.search(r'temperature\s*:\s*(\d+)', output, re.IGNORECASE)
-                
-                if wear_match and temp_match:
-                    wear = int(wear_match.group(1))
-                    temp = int(temp_match.group(1))
-                    
-                    emoji = "🟢" if wear < 75 else ("🟡" if wear < 100 else "🔴")
-                    nvme_lines.append(f"{emoji} *NVMe {drive}:* Wear `{wear}%` | Temp `{temp}°C`")
-            except Exception:
-                continue
+        drives = nvme_reader.stats()
+        snapshot.publish("nvme", drives)
+        for drive, wear, temp in drives:
+            emoji = "🟢" if wear < 75 else ("🟡" if wear < 100 else "🔴")
+            nvme_lines.append(f"{emoji} *NVMe {drive}:* Wear `{wear}%` | Temp `{temp}°C`")
     except Exception:
         pass
         
@@ -113,6 +530,7 @@ def get_nvme_stats():
 
 # General CPU Temperature (Fallback)
 def get_temperature():
+    import psutil
     try:
         if hasattr(psutil, "sensors_temperatures"):
             temps = psutil.sensors_temperatures()
@@ -125,30 +543,303 @@ def get_temperature():
         pass
     return "N/A"
 
+# --- DISK PERFORMANCE ---
+DISKSTATS_IGNORED_RE = re.compile(r'^(loop|ram|zram|sr|fd)\d')
+DISKSTATS_STACKED_RE = re.compile(r'^(dm-|md)')  # Built on other disks; left out of the aggregate
+
+class DiskStatsCollector:
+    """Per-device IOPS, throughput, await, utilization and queue depth from /proc/diskstats.
+
+    One read of /proc/diskstats per call; every figure is a delta against the
+    previous read, the same way iostat computes them. Only whole disks are
+    reported (partitions are folded into their disk), and the disks holding
+    the OS root and TrieDB are identified so alerts and /status can name them.
+    """
+
+    def __init__(self, path="/proc/diskstats"):
+        self.path = path
+        self.disks = set()
+        self.roles = {}  # role -> disk name
+        self.last_scan = 0
+        self.last = None
+        self.last_time = 0
+
+    @staticmethod
+    def disk_of(sys_path):
+        sys_path = os.path.realpath(sys_path)
+        if os.path.exists(os.path.join(sys_path, "partition")):
+            sys_path = os.path.dirname(sys_path)
+        return os.path.basename(sys_path)
+
+    def resolve(self, path):
+        """Whole-disk name behind a block device or a path on a mounted filesystem."""
+        if path.startswith("/dev/"):
+            sys_path = f"/sys/class/block/{os.path.basename(os.path.realpath(path))}"
+        else:
+            dev = os.stat(path).st_dev
+            sys_path = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+        return self.disk_of(sys_path) if os.path.exists(sys_path) else None
+
+    def scan(self):
+        try:
+            self.disks = {d for d in os.listdir('/sys/block') if not DISKSTATS_IGNORED_RE.match(d)}
+        except OSError:
+            self.disks = set()
+        roles = {}
+        for role, path in (("triedb", TRIEDB_DEVICE), ("os", "/")):
+            try:
+                disk = self.resolve(path)
+            except OSError:
+                disk = None
+            if disk:
+                roles[role] = disk
+        self.roles = roles
+        self.last_scan = time.time()
+
+    def read(self):
+        counters = {}
+        with open(self.path) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 14 and fields[2] in self.disks:
+                    counters[fields[2]] = tuple(map(int, fields[3:14]))
+        return counters
+
+    def collect(self):
+        if time.time() - self.last_scan > DISK_RESCAN_INTERVAL:
+            self.scan()
+        now = time.monotonic()
+        current = self.read()
+        previous, dt = self.last, now - self.last_time
+        self.last, self.last_time = current, now
+        if previous is None or dt <= 0:
+            return None
+
+        devices = {}
+        for name, cur in current.items():
+            prev = previous.get(name)
+            if prev is None:
+                continue
+            d = [c - p for c, p in zip(cur, prev)]
+            if min(d[:8]) < 0:
+                continue  # Counter wrapped or device was reset
+            reads, writes = d[0], d[4]
+            devices[name] = {
+                "r_iops": reads / dt,
+                "w_iops": writes / dt,
+                "read_mbs": d[2] * 512 / dt / (1024 * 1024),
+                "write_mbs": d[6] * 512 / dt / (1024 * 1024),
+                "r_await_ms": d[3] / reads if reads else None,
+                "w_await_ms": d[7] / writes if writes else None,
+                "await_ms": (d[3] + d[7]) / (reads + writes) if reads + writes else None,
+                "util": min(100.0, d[9] / (dt * 10)),
+                "queue": d[10] / (dt * 1000),  # Average queue depth (aqu-sz)
+                "in_flight": cur[8],
+            }
+        return devices
+
+    def to_state(self):
+        if self.last is None:
+            return None
+        return {"read_at": time.time() - (time.monotonic() - self.last_time), "counters": self.last}
+
+    def load_state(self, data):
+        """Restores the previous read so the first tick after a restart already has deltas."""
+        age = time.time() - data["read_at"]
+        if 0 <= age <= DISK_BASELINE_MAX_AGE:
+            self.last = {name: tuple(c) for name, c in data["counters"].items()}
+            self.last_time = time.monotonic() - age
+
+disk_stats = DiskStatsCollector()
+
+def disk_role_label(name, roles):
+    labels = [role for role, disk in roles.items() if disk == name]
+    return "/".join(labels)
+
+# --- NETWORK THROUGHPUT & PEER HEALTH ---
+NETWORK_IGNORED_RE = re.compile(r'^(lo|ifb|docker\d|veth|br-|virbr|cni|flannel|cali)')
+TCP_STATES = {"01": "established", "02": "syn_sent", "03": "syn_recv", "04": "fin_wait1", "05": "fin_wait2",
+              "06": "time_wait", "07": "close", "08": "close_wait", "09": "last_ack", "0A": "listen", "0B": "closing"}
+MONAD_PEERS_RE = re.compile(r'peers?(?:[ _]count)?:\s*(\d+)', re.IGNORECASE)
+
+class NetStatsCollector:
+    """Per-interface throughput, drops and errors, TCP/UDP health and the node's peer count.
+
+    /proc/net/dev and /proc/net/snmp are read once per call and turned into
+    rates against the previous read, like DiskStatsCollector. Socket states
+    need one line per socket from /proc/net/tcp{,6}, so they are counted
+    every NETWORK_SOCKET_INTERVAL only. The peer count comes from the node's
+    net_peerCount RPC, falling back to the monad-status output.
+    """
+
+    def __init__(self, dev_path="/proc/net/dev", snmp_path="/proc/net/snmp"):
+        self.dev_path = dev_path
+        self.snmp_path = snmp_path
+        self.last = None  # (monotonic time, interfaces, snmp)
+        self.sockets = {}
+        self.last_socket_scan = 0
+
+    def read_dev(self):
+        interfaces = {}
+        with open(self.dev_path) as f:
+            for line in f.readlines()[2:]:
+                name, _, counters = line.partition(":")
+                name = name.strip()
+                if NETWORK_IGNORED_RE.match(name):
+                    continue
+                v = counters.split()
+                # rx bytes, packets, errs, drop | tx bytes, packets, errs, drop
+                interfaces[name] = (int(v[0]), int(v[1]), int(v[2]), int(v[3]), int(v[8]), int(v[9]), int(v[10]), int(v[11]))
+        return interfaces
+
+    def read_snmp(self):
+        snmp = {}
+        with open(self.snmp_path) as f:
+            lines = f.readlines()
+        for header, values in zip(lines[::2], lines[1::2]):
+            proto, _, names = header.partition(":")
+            if proto in ("Tcp", "Udp"):
+                for name, value in zip(names.split(), values.partition(":")[2].split()):
+                    snmp[f"{proto}.{name}"] = int(value)
+        return snmp
+
+    def read_sockets(self):
+        states = defaultdict(int)
+        for path in ("/proc/net/tcp", "/proc/net/tcp6"):
+            try:
+                with open(path) as f:
+                    next(f, None)
+                    for line in f:
+                        states[TCP_STATES.get(line.split(None, 4)[3], "other")] += 1
+            except OSError:
+                continue
+        return dict(states)
+
+    def read_peers(self):
+        try:
+            peers = block_ingestor.rpc_batch([("net_peerCount", [])])[0]
+            if peers is not None:
+                return int(peers, 16) if isinstance(peers, str) else int(peers)
+        except Exception:
+            pass
+        return (snapshot.get("monad_status") or {}).get("peers")
+
+    def collect(self):
+        now = time.monotonic()
+        interfaces, snmp = self.read_dev(), self.read_snmp()
+        if now - self.last_socket_scan > NETWORK_SOCKET_INTERVAL:
+            self.sockets = self.read_sockets()
+            self.last_socket_scan = now
+        previous, self.last = self.last, (now, interfaces, snmp)
+        result = {"interfaces": {}, "tcp": None, "udp": None, "sockets": self.sockets, "peers": self.read_peers()}
+        if previous is None or now <= previous[0]:
+            return result
+        dt = now - previous[0]
+        for name, cur in interfaces.items():
+            prev = previous[1].get(name)
+            if prev is None:
+                continue
+            d = [c - p for c, p in zip(cur, prev)]
+            if min(d) < 0:
+                continue  # Counter wrapped or interface was reset
+            result["interfaces"][name] = {
+                "rx_mbs": d[0] / dt / (1024 * 1024),
+                "tx_mbs": d[4] / dt / (1024 * 1024),
+                "rx_pps": d[1] / dt,
+                "tx_pps": d[5] / dt,
+                "drops_per_sec": (d[3] + d[7]) / dt,
+                "errors_per_sec": (d[2] + d[6]) / dt,
+            }
+        rate = lambda key: max(snmp.get(key, 0) - previous[2].get(key, 0), 0) / dt
+        out_segs, retrans = rate("Tcp.OutSegs"), rate("Tcp.RetransSegs")
+        result["tcp"] = {
+            "out_segs_per_sec": out_segs,
+            "retrans_per_sec": retrans,
+            "retrans_pct": retrans / out_segs * 100 if out_segs else 0.0,
+            "in_errs_per_sec": rate("Tcp.InErrs"),
+            "resets_per_sec": rate("Tcp.EstabResets"),
+            "established": snmp.get("Tcp.CurrEstab"),
+        }
+        result["udp"] = {
+            "in_per_sec": rate("Udp.InDatagrams"),
+            "in_errors_per_sec": rate("Udp.InErrors"),
+            "rcvbuf_errors_per_sec": rate("Udp.RcvbufErrors"),
+        }
+        return result
+
+net_stats = NetStatsCollector()
+
+def get_network_details():
+    try:
+        details = net_stats.collect()
+    except OSError:
+        return None
+    t = time.time()
+    interfaces = details["interfaces"]
+    if interfaces:
+        metrics_store.record("net_rx_mbs", sum(i["rx_mbs"] for i in interfaces.values()), t)
+        metrics_store.record("net_tx_mbs", sum(i["tx_mbs"] for i in interfaces.values()), t)
+    for name, i in interfaces.items():
+        metrics_store.record(f"net_drops:{name}", i["drops_per_sec"] + i["errors_per_sec"], t)
+    if details["tcp"]:
+        metrics_store.record("tcp_retrans_pct", details["tcp"]["retrans_pct"], t)
+        metrics_store.record("udp_rcvbuf_errors", details["udp"]["rcvbuf_errors_per_sec"], t)
+    metrics_store.record("peers", details["peers"], t)
+    return details
+
+def get_network_section(network):
+    """One line for /status: throughput, retransmits and peers."""
+    if not network:
+        return ""
+    interfaces = network["interfaces"].values()
+    rx, tx = sum(i["rx_mbs"] for i in interfaces), sum(i["tx_mbs"] for i in interfaces)
+    line = f"🌐 *Network:* `{rx:.2f}` MB/s in | `{tx:.2f}` MB/s out"
+    if network["tcp"]:
+        line += f" | retrans `{network['tcp']['retrans_pct']:.2f}%`"
+    if network["peers"] is not None:
+        line += f" | 👥 `{network['peers']}` peers"
+    established = network["sockets"].get("established")
+    if established is not None:
+        line += f" | TCP `{established}` est."
+    return line + "\n"
+
 # --- SYSTEM HEALTH SUMMARY ---
 def get_system_health():
-    global last_io_counters, last_io_time
+    global last_disk_usage, last_disk_usage_time
+    import psutil
     cpu = psutil.cpu_percent(interval=None)
     ram = psutil.virtual_memory().percent
+    current_time = time.time()
     
-    disk_info = psutil.disk_usage('/')
-    disk_percent = disk_info.percent
-    disk_str = f"{format_bytes(disk_info.used)} / {format_bytes(disk_info.total)} ({disk_percent}%)"
+    # Fill level moves slowly, no need to stat the root filesystem every tick
+    if last_disk_usage is None or current_time - last_disk_usage_time > DISK_USAGE_INTERVAL:
+        last_disk_usage = psutil.disk_usage('/')
+        last_disk_usage_time = current_time
+    disk_percent = last_disk_usage.percent
+    disk_str = f"{format_bytes(last_disk_usage.used)} / {format_bytes(last_disk_usage.total)} ({disk_percent}%)"
     
     # Disk I/O calculation
-    current_io = psutil.disk_io_counters()
-    current_time = time.time()
     disk_io_str = "0.00 MB/s Read | 0.00 MB/s Write"
+    try:
+        devices = disk_stats.collect()
+    except OSError:
+        devices = None
+    if devices is not None:
+        physical = [d for name, d in devices.items() if not DISKSTATS_STACKED_RE.match(name)]
+        read_speed = sum(d["read_mbs"] for d in physical)
+        write_speed = sum(d["write_mbs"] for d in physical)
+        disk_io_str = f"{read_speed:.2f} MB/s Read | {write_speed:.2f} MB/s Write"
+        metrics_store.record("disk_read_mbs", read_speed, current_time)
+        metrics_store.record("disk_write_mbs", write_speed, current_time)
+        for name, d in devices.items():
+            metrics_store.record(f"disk_await_ms:{name}", d["await_ms"], current_time)
+            metrics_store.record(f"disk_util:{name}", d["util"], current_time)
+            metrics_store.record(f"disk_queue:{name}", d["queue"], current_time)
+        snapshot.publish("disk_io", {"read_mbs": read_speed, "write_mbs": write_speed})
+        snapshot.publish("diskstats", {"devices": devices, "roles": dict(disk_stats.roles)})
     
-    if last_io_counters and last_io_time:
-        time_diff = current_time - last_io_time
-        if time_diff > 0:
-            read_speed = (current_io.read_bytes - last_io_counters.read_bytes) / time_diff / (1024 * 1024)
-            write_speed = (current_io.write_bytes - last_io_counters.write_bytes) / time_diff / (1024 * 1024)
-            disk_io_str = f"{read_speed:.2f} MB/s Read | {write_speed:.2f} MB/s Write"
-            
-    last_io_counters = current_io
-    last_io_time = current_time
+    metrics_store.record("cpu", cpu, current_time)
+    metrics_store.record("ram", ram, current_time)
     
     temp_str = get_temperature()
     nvme_str = get_nvme_stats()
@@ -158,11 +849,8 @@ def get_system_health():
 # --- HUGINN EXPLORER API DATA ---
 def get_epoch_details():
     try:
-        epoch_url = f"{HUGINN_BASE_URL}/staking/epoch"
-        response = requests.get(epoch_url, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            
+        data = huginn.epoch()
+        if data:
             if data.get("success") and "epoch" in data:
                 current_epoch = data["epoch"]
                 
@@ -183,11 +871,9 @@ def get_epoch_details():
         print(f"⚠️ [API ERROR] Epoch Fetch Failed: {e}")
     return "N/A", "N/A", "N/A"
 
-def get_validator_api_details():
+def get_validator_api_details(address=None):
     try:
-        uptime_url = f"{HUGINN_BASE_URL}/validator/uptime/{VALIDATOR_ADDRESS}"
-        uptime_response = requests.get(uptime_url, timeout=10)
-        uptime_data = uptime_response.json()
+        uptime_data = huginn.validator_uptime(address or VALIDATOR_ADDRESS)
 
         val_info = uptime_data.get("uptime", uptime_data)
         val_id = val_info.get("validator_id")
@@ -204,16 +890,13 @@ def get_validator_api_details():
         val_status = "unknown"
 
         if val_id:
-            stake_url = f"{HUGINN_BASE_URL}/staking/validator/{val_id}"
-            stake_response = requests.get(stake_url, timeout=10)
-            if stake_response.status_code == 200:
-                stake_data = stake_response.json()
-                if stake_data.get("success") and "validator" in stake_data:
-                    v_data = stake_data["validator"]
-                    stake = float(v_data.get("stake", 0))
-                    rewards = float(v_data.get("unclaimed_rewards", 0))
-                    is_jailed = v_data.get("jailed", False)
-                    val_status = v_data.get("status", "unknown")
+            stake_data = huginn.validator(val_id)
+            if stake_data.get("success") and "validator" in stake_data:
+                v_data = stake_data["validator"]
+                stake = float(v_data.get("stake", 0))
+                rewards = float(v_data.get("unclaimed_rewards", 0))
+                is_jailed = v_data.get("jailed", False)
+                val_status = v_data.get("status", "unknown")
 
         return {
             "val_id": val_id,
@@ -221,6 +904,7 @@ def get_validator_api_details():
             "rewards": rewards,
             "uptime_pct": uptime_pct,
             "timeout_count": timeout_count,
+            "finalized_count": finalized,
             "is_jailed": is_jailed,
             "status": val_status,
             "api_block_height": api_block_height
@@ -228,79 +912,483 @@ def get_validator_api_details():
     except Exception:
         return None
 
+# --- BLOCK INGESTION (newHeads stream + batched backfill) ---
+class BlockIngestor:
+    """Ingests every block header from the local node.
+
+    With NODE_WS_URL set (and websocket-client installed) a newHeads
+    subscription announces the head; otherwise eth_blockNumber is polled.
+    Either way, any blocks between the last ingested one and the head are
+    fetched with batched eth_getBlockByNumber calls, so TPS, gas/sec and block
+    time are computed from real header timestamps over a sliding window.
+    Backfill stops at the first block the node does not return and after
+    BACKFILL_TIME_BUDGET per poll; the next poll continues from there.
+    """
+
+    def __init__(self, rpc_url, ws_url="", window_seconds=BLOCK_WINDOW_SECONDS, session=None):
+        self.rpc_url = rpc_url
+        self.ws_url = ws_url
+        self.window_seconds = window_seconds
+        self.session = session  # Created on first use
+        self.blocks = deque()  # (number, timestamp, tx_count, gas_used, base_fee_gwei)
+        self.last_number = None
+        self.on_block = None  # Optional callback(number, proposer) for every ingested header
+        self._ws_head = None
+        self._ws_connected = False
+        self._lock = threading.Lock()
+
+    def rpc_batch(self, calls, timeout=5):
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+        payload = [{"jsonrpc": "2.0", "method": m, "params": p, "id": i} for i, (m, p) in enumerate(calls)]
+        with perf.timed("outbound", "node_rpc"):
+            response = self.session.post(self.rpc_url, json=payload, timeout=timeout)
+        response.raise_for_status()
+        replies = response.json()
+        if isinstance(replies, dict):
+            raise ValueError(replies.get("error", "unexpected RPC reply"))
+        results = [None] * len(calls)
+        for reply in replies:
+            results[reply["id"]] = reply.get("result")
+        return results
+
+    def head_number(self):
+        with self._lock:
+            if self._ws_connected and self._ws_head is not None:
+                return self._ws_head
+        return int(self.rpc_batch([("eth_blockNumber", [])])[0], 16)
+
+    def poll(self):
+        started = time.monotonic()
+        head = self.head_number()
+        if self.last_number is None or head - self.last_number > MAX_BACKFILL_BLOCKS:
+            first = max(head - 1, 0)
+        else:
+            first = self.last_number + 1
+
+        for batch_start in range(first, head + 1, RPC_BATCH_SIZE):
+            if batch_start > first and time.monotonic() - started > BACKFILL_TIME_BUDGET:
+                break
+            numbers = range(batch_start, min(batch_start + RPC_BATCH_SIZE, head + 1))
+            headers = self.rpc_batch([("eth_getBlockByNumber", [hex(n), False]) for n in numbers])
+            for block in headers:
+                if not block:
+                    # Not served yet; skipping it would leave a permanent gap, so retry from here next poll
+                    return head
+                self._ingest(block)
+        return head
+
+    def _ingest(self, block):
+        number = int(block["number"], 16)
+        if self.last_number is not None and number <= self.last_number:
+            return
+        self.blocks.append((
+            number,
+            int(block["timestamp"], 16),
+            len(block.get("transactions", [])),
+            int(block.get("gasUsed", "0x0"), 16),
+            int(block.get("baseFeePerGas", "0x0"), 16) / 10**9,
+        ))
+        self.last_number = number
+        if self.on_block:
+            self.on_block(number, block.get("miner"))
+        while self.blocks[-1][1] - self.blocks[0][1] > self.window_seconds:
+            self.blocks.popleft()
+
+    def metrics(self):
+        """Returns (height, tps, gas_per_sec, base_fee, block_time_ms) over the window."""
+        if not self.blocks:
+            return self.last_number, 0, 0, 0.0, 0.0
+        newest = self.blocks[-1]
+        span = newest[1] - self.blocks[0][1]
+        if span <= 0 or len(self.blocks) < 2:
+            return newest[0], 0, 0, newest[4], 0.0
+        # The oldest block only marks the start of the window
+        txs = sum(b[2] for b in self.blocks) - self.blocks[0][2]
+        gas = sum(b[3] for b in self.blocks) - self.blocks[0][3]
+        block_time_ms = span / (len(self.blocks) - 1) * 1000
+        return newest[0], int(txs / span), int(gas / span), newest[4], block_time_ms
+
+    def start_stream(self):
+        if not self.ws_url:
+            return False
+        try:
+            import websocket
+        except ImportError:
+            print("⚠️ [INFO] websocket-client not installed, falling back to RPC polling for blocks.")
+            return False
+        threading.Thread(target=self._stream, args=(websocket,), daemon=True).start()
+        return True
+
+    def _stream(self, websocket):
+        backoff = 1
+        while True:
+            try:
+                ws = websocket.create_connection(self.ws_url, timeout=30)
+                ws.send(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "eth_subscribe", "params": ["newHeads"]}))
+                ws.recv()  # subscription id
+                print("📡 [INFO] Subscribed to newHeads.")
+                backoff = 1
+                while True:
+                    msg = json.loads(ws.recv())
+                    head = msg.get("params", {}).get("result", {}).get("number")
+                    if head:
+                        with self._lock:
+                            self._ws_head = int(head, 16)
+                            self._ws_connected = True
+            except Exception as e:
+                print(f"⚠️ [WS] newHeads stream dropped: {e}")
+            with self._lock:
+                self._ws_connected = False
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+# Proposer of every ingested block, per epoch; shared by all nodes in fleet mode
+proposal_tracker = ProposalTracker(EPOCH_LENGTH, PROPOSAL_EPOCHS_KEPT)
+
+block_ingestor = BlockIngestor(NODE_RPC_URL, NODE_WS_URL)
+block_ingestor.on_block = proposal_tracker.record
+
 def get_eth_block_details():
-    global last_block_time_check, last_block_height_for_time
-    payload = {"jsonrpc": "2.0", "method": "eth_getBlockByNumber", "params": ["latest", False], "id": 1}
     try:
-        response = requests.post(NODE_RPC_URL, json=payload, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        if "result" in data and data["result"]:
-            block = data["result"]
-            height = int(block["number"], 16)
-            
-            tx_in_block = len(block["transactions"])
-            estimated_tps = int(tx_in_block * 2.5) 
-            
-            gas_used = int(block.get("gasUsed", "0x0"), 16)
-            base_fee = int(block.get("baseFeePerGas", "0x0"), 16) / 10**9 
-            gas_per_sec = int(gas_used * 2.5)
-            
-            # --- Live Block Time (ms) Calculation ---
-            current_time = time.time()
-            block_time_ms = 0.0
-            if last_block_height_for_time != 0 and height > last_block_height_for_time:
-                blocks_diff = height - last_block_height_for_time
-                time_diff = current_time - last_block_time_check
-                block_time_ms = (time_diff / blocks_diff) * 1000
-            
-            last_block_time_check = current_time
-            last_block_height_for_time = height
-            
-            return height, estimated_tps, gas_per_sec, base_fee, block_time_ms
-        return None, 0, 0, 0.0, 0.0
+        previous = block_ingestor.last_number
+        block_ingestor.poll()
+        details = block_ingestor.metrics()
+        if block_ingestor.last_number != previous:
+            _, tps, gas_per_sec, base_fee, block_time_ms = details
+            now = time.time()
+            metrics_store.record("tps", tps, now)
+            metrics_store.record("gas_per_sec", gas_per_sec, now)
+            metrics_store.record("base_fee", base_fee, now)
+            if block_time_ms > 0:
+                metrics_store.record("block_time_ms", block_time_ms, now)
+        return details
     except Exception:
         return None, 0, 0, 0.0, 0.0
 
-def get_monad_status_details():
-    details = {"triedb_percent": None, "triedb_str": "N/A", "sync_status": "Unknown", "epoch": "N/A", "round": "N/A"}
-    try:
-        result = subprocess.run(['monad-status'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=5)
-        lines = result.stdout.split('\n')
-        in_consensus = False
+# --- RPC LATENCY & CORRECTNESS PROBE ---
+class RpcProbe:
+    """Times a small mix of RPC calls against the node and checks the answers.
+
+    Every method in RPC_PROBE_CALLS is sent as its own request over one
+    keep-alive session (separate from the block ingestor's, so backfill
+    batches do not queue in front of it). Latencies, failed calls included,
+    go into windowed histograms, so p50/p95/p99 follow the last
+    RPC_PROBE_WINDOW seconds. Answers are checked for a stable chain id, a
+    head that never goes backwards and a latest block that matches it. The
+    head is compared with RPC_REFERENCE_URLS to measure how far the node lags.
+    """
+
+    def __init__(self, rpc_url, reference_urls=()):
+        self.rpc_url = rpc_url
+        self.reference_urls = reference_urls
+        self.session = None  # Created on first use
+        self.histograms = {}  # method -> WindowedHistogram, plus "all"
+        self.outcomes = deque(maxlen=100)  # True for every failed call
+        self.last_error = None
+        self.chain_id = RPC_EXPECTED_CHAIN_ID
+        self.last_head = None
+
+    def call(self, url, method, params):
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+        response = self.session.post(url, json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params}, timeout=RPC_PROBE_TIMEOUT)
+        response.raise_for_status()
+        reply = response.json()
+        if reply.get("error"):
+            raise ValueError(reply["error"].get("message", reply["error"]) if isinstance(reply["error"], dict) else reply["error"])
+        return reply.get("result")
+
+    def observe(self, method, seconds):
+        for name in (method, "all"):
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = WindowedHistogram(RPC_PROBE_WINDOW)
+            hist.observe(seconds)
+
+    def check(self, method, result, head, problems):
+        """Validates one answer; returns the head it implies, if any."""
+        if method == "eth_blockNumber":
+            number = int(result, 16)
+            if self.last_head is not None and number < self.last_head:
+                problems.append(f"eth_blockNumber went backwards ({self.last_head} -> {number})")
+            self.last_head = max(number, self.last_head or 0)
+            return number
+        if method == "eth_getBlockByNumber":
+            if not isinstance(result, dict) or not result.get("hash") or not result.get("number"):
+                problems.append("eth_getBlockByNumber(latest) returned no block")
+                return None
+            number = int(result["number"], 16)
+            if head is not None and number < head:
+                problems.append(f"latest block {number} is older than eth_blockNumber {head}")
+            return number
+        if method == "eth_chainId":
+            chain_id = int(result, 16)
+            if self.chain_id is None:
+                self.chain_id = chain_id
+            elif chain_id != self.chain_id:
+                problems.append(f"chain id {chain_id} instead of {self.chain_id}")
+        elif method == "eth_call" and not (isinstance(result, str) and result.startswith("0x")):
+            problems.append(f"eth_call returned {result!r}")
+        return None
+
+    def reference_head(self):
+        heads = []
+        for url in self.reference_urls:
+            try:
+                with perf.timed("outbound", "rpc_reference"):
+                    heads.append(int(self.call(url, "eth_blockNumber", []), 16))
+            except Exception:
+                continue
+        return max(heads) if heads else None, len(heads)
+
+    def collect(self):
+        problems = []
+        head = None
+        for method, params in RPC_PROBE_CALLS.items():
+            started = time.perf_counter()
+            try:
+                result = self.call(self.rpc_url, method, params)
+            except Exception as e:
+                self.observe(method, time.perf_counter() - started)
+                self.outcomes.append(True)
+                self.last_error = f"{method}: {e}"
+                continue
+            self.observe(method, time.perf_counter() - started)
+            self.outcomes.append(False)
+            try:
+                head = self.check(method, result, head, problems) or head
+            except (TypeError, ValueError) as e:
+                problems.append(f"{method} returned unparseable data: {e}")
+
+        reference_head, references_up = self.reference_head() if self.reference_urls else (None, 0)
+        local_head = head if head is not None else block_ingestor.last_number
+        methods = {}
+        for name, hist in self.histograms.items():
+            recent = hist.recent()
+            if not recent.count:
+                continue
+            methods[name] = {
+                "p50_ms": recent.quantile(0.5) * 1000,
+                "p95_ms": recent.quantile(0.95) * 1000,
+                "p99_ms": recent.quantile(0.99) * 1000,
+                "max_ms": recent.max * 1000,
+                "count": recent.count,
+                "total": hist.total.to_dict(),
+            }
+        overall = methods.get("all", {})
+        if overall:
+            metrics_store.record("rpc_p95_ms", overall["p95_ms"])
+        return {
+            "methods": methods,
+            "error_pct": sum(self.outcomes) / len(self.outcomes) * 100 if self.outcomes else 0.0,
+            "last_error": self.last_error,
+            "problems": problems,
+            "chain_id": self.chain_id,
+            "head": local_head,
+            "reference_head": reference_head,
+            "references_up": references_up,
+            "lag_blocks": reference_head - local_head if reference_head is not None and local_head is not None else None,
+        }
+
+rpc_probe = RpcProbe(NODE_RPC_URL, RPC_REFERENCE_URLS)
+
+def get_rpc_probe_section(probe):
+    """RPC latency percentiles, errors and lag for /status."""
+    if not probe or "all" not in probe["methods"]:
+        return ""
+    overall = probe["methods"]["all"]
+    line = (f"📡 *RPC p50/p95/p99:* `{overall['p50_ms']:.0f}` / `{overall['p95_ms']:.0f}` / `{overall['p99_ms']:.0f}` ms"
+            f" | errors `{probe['error_pct']:.0f}%`")
+    if probe["lag_blocks"] is not None:
+        line += f" | lag `{probe['lag_blocks']}` blocks"
+    lines = [line] + [f"🧪 `{problem}`" for problem in probe["problems"]]
+    return "\n".join(lines) + "\n"
+
+# --- MONAD-STATUS COLLECTOR ---
+MONAD_STATUS_INTERVAL = 5        # Normal cadence for running the monad-status CLI
+MONAD_STATUS_MAX_INTERVAL = 120  # Cadence ceiling while the CLI is failing or slow
+MONAD_STATUS_SLOW = 2            # A run slower than this (seconds) counts as slow
+MONAD_STATUS_CLI_TIMEOUT = 5
+MONAD_STATUS_RPC_TIMEOUT = 2     # eth_syncing; CLI and RPC together stay inside the collector deadline
+MONAD_STATUS_STALE_AFTER = 3 * MONAD_STATUS_INTERVAL  # CLI values older than this are dropped while the CLI fails
+
+MONAD_SECTION_RE = re.compile(r'^([\w-]+):')
+MONAD_STATUS_RE = re.compile(r'(?:^|\s)status:\s*(.+?)\s*$')
+MONAD_ROUND_RE = re.compile(r'(?:^|\s)round:\s*(.+?)\s*$')
+MONAD_CAPACITY_RE = re.compile(r'capacity:\s*(.+?)\s*$')
+MONAD_USED_RE = re.compile(r'used:\s*(.*?)\s*\(([\d\.]+)%\)')
+
+class MonadStatusCollector:
+    """Keeps sync status, round and TrieDB usage up to date.
+
+    Sync status is read from the node over RPC (eth_syncing) on every call.
+    The monad-status CLI is only forked for round and TrieDB usage, on an
+    adaptive cadence that backs off exponentially while it fails or is slow.
+    The same dict object is returned until a field changes, so the scheduler
+    only publishes real changes into the snapshot. When the CLI has failed for
+    MONAD_STATUS_STALE_AFTER, its last round, peers and TrieDB figures are
+    dropped instead of being reported as current.
+    """
+
+    def __init__(self):
+        self.details = {"triedb_percent": None, "triedb_str": "N/A", "sync_status": "Unknown", "epoch": "N/A", "round": "N/A"}
+        self.interval = MONAD_STATUS_INTERVAL
+        self.next_run = 0
+        self.cli_sync_status = None
+        self.cli_ok_at = time.monotonic()
+
+    @staticmethod
+    def parse(output):
+        fields = {}
+        section = None
         capacity_str = ""
         used_amount_str = ""
-        
-        for line in lines:
-            if line.startswith('consensus:'): in_consensus = True
-            elif line.startswith('statesync:') or line.startswith('rpc:'): in_consensus = False
-            
-            if in_consensus:
-                if 'status:' in line: details["sync_status"] = line.split('status:')[1].strip()
-                elif 'round:' in line: details["round"] = line.split('round:')[1].strip()
-            
-            if 'capacity:' in line: capacity_str = line.split('capacity:')[1].strip()
-            if 'used:' in line and '%' in line:
-                match = re.search(r'used:\s*(.*?)\s*\(([\d\.]+)%\)', line)
-                if match:
-                    used_amount_str = match.group(1).strip()
-                    details["triedb_percent"] = float(match.group(2))
-        
-        if capacity_str and used_amount_str and details["triedb_percent"] is not None:
-            details["triedb_str"] = f"{used_amount_str} / {capacity_str} ({details['triedb_percent']}%)"
-        elif details["triedb_percent"] is not None:
-            details["triedb_str"] = f"{details['triedb_percent']}%"
-        return details
-    except Exception:
-        return details
+        for line in output.splitlines():
+            section_match = MONAD_SECTION_RE.match(line)
+            if section_match:
+                section = section_match.group(1)
+            if section == "consensus":
+                m = MONAD_STATUS_RE.search(line)
+                if m:
+                    fields["sync_status"] = m.group(1)
+                    continue
+                m = MONAD_ROUND_RE.search(line)
+                if m:
+                    fields["round"] = m.group(1)
+                    continue
+            m = MONAD_PEERS_RE.search(line)
+            if m:
+                fields["peers"] = int(m.group(1))
+                continue
+            m = MONAD_CAPACITY_RE.search(line)
+            if m:
+                capacity_str = m.group(1)
+                continue
+            m = MONAD_USED_RE.search(line)
+            if m:
+                used_amount_str = m.group(1).strip()
+                fields["triedb_percent"] = float(m.group(2))
+
+        if capacity_str and used_amount_str and "triedb_percent" in fields:
+            fields["triedb_str"] = f"{used_amount_str} / {capacity_str} ({fields['triedb_percent']}%)"
+        elif "triedb_percent" in fields:
+            fields["triedb_str"] = f"{fields['triedb_percent']}%"
+        return fields
+
+    def run_cli(self, timeout=MONAD_STATUS_CLI_TIMEOUT):
+        started = time.monotonic()
+        try:
+            result = subprocess.run(['monad-status'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=timeout)
+            fields = self.parse(result.stdout) if result.returncode == 0 else {}
+        except Exception:
+            fields = {}
+        elapsed = time.monotonic() - started
+
+        if fields:
+            self.cli_ok_at = time.monotonic()
+        if not fields or elapsed > MONAD_STATUS_SLOW:
+            self.interval = min(self.interval * 2, MONAD_STATUS_MAX_INTERVAL)
+        else:
+            self.interval = MONAD_STATUS_INTERVAL
+        self.next_run = time.monotonic() + self.interval
+        return fields
+
+    def read_rpc_sync_status(self):
+        try:
+            syncing = block_ingestor.rpc_batch([("eth_syncing", [])], timeout=MONAD_STATUS_RPC_TIMEOUT)[0]
+        except Exception:
+            return None
+        if syncing is False:
+            return "in-sync"
+        if isinstance(syncing, dict):
+            current = int(syncing.get("currentBlock", "0x0"), 16)
+            highest = int(syncing.get("highestBlock", "0x0"), 16)
+            return f"syncing ({highest - current} behind)"
+        return None
+
+    def collect(self):
+        fields = {}
+        if time.monotonic() >= self.next_run:
+            # Whatever the deadline leaves after the eth_syncing call
+            deadline = COLLECTOR_SCHEDULE["monad_status"][1]
+            fields = self.run_cli(max(min(MONAD_STATUS_CLI_TIMEOUT, deadline - MONAD_STATUS_RPC_TIMEOUT - 1), 1))
+            if "sync_status" in fields:
+                self.cli_sync_status = fields["sync_status"]
+        if time.monotonic() - self.cli_ok_at > MONAD_STATUS_STALE_AFTER:
+            fields.update({"triedb_percent": None, "triedb_str": "N/A", "round": "N/A", "peers": None})
+            self.cli_sync_status = None
+
+        rpc_sync_status = self.read_rpc_sync_status()
+        sync_status = rpc_sync_status or fields.get("sync_status") or self.cli_sync_status
+        if sync_status:
+            fields["sync_status"] = sync_status
+
+        changed = {k: v for k, v in fields.items() if self.details.get(k) != v}
+        if changed:
+            self.details = {**self.details, **changed}
+        return self.details
+
+monad_status_collector = MonadStatusCollector()
+
+def get_monad_status_details():
+    return monad_status_collector.collect()
+
+def get_history_section(window):
+    """Rolling min/avg/p99/max over the last `window` seconds for /status and reports."""
+    rows = [
+        ("🧠 CPU", "cpu", lambda v: f"{v:.0f}%"),
+        ("💾 RAM", "ram", lambda v: f"{v:.0f}%"),
+        ("⏱️ Block Time", "block_time_ms", lambda v: f"{v:.0f} ms"),
+        ("⚡ TPS", "tps", lambda v: f"{v:.0f}"),
+        ("🔥 Gas/Sec", "gas_per_sec", lambda v: f"{v / 1_000_000:.1f}M"),
+        ("💸 Base Fee", "base_fee", lambda v: f"{v:.2f} gwei"),
+        ("📥 Disk Read", "disk_read_mbs", lambda v: f"{v:.1f} MB/s"),
+        ("📤 Disk Write", "disk_write_mbs", lambda v: f"{v:.1f} MB/s"),
+        ("🌐 Net In", "net_rx_mbs", lambda v: f"{v:.1f} MB/s"),
+        ("🌐 Net Out", "net_tx_mbs", lambda v: f"{v:.1f} MB/s"),
+        ("👥 Peers", "peers", lambda v: f"{v:.0f}"),
+        ("📡 RPC p95", "rpc_p95_ms", lambda v: f"{v:.0f} ms"),
+    ]
+    lines = []
+    for label, name, fmt in rows:
+        st = metrics_store.stats(name, window)
+        if st:
+            lines.append(f"{label}: `{fmt(st['avg'])}` avg | `{fmt(st['p99'])}` p99 | `{fmt(st['max'])}` max")
+    if not lines:
+        return ""
+    label = f"{window // 86400}d" if window >= 86400 else f"{window // 3600}h"
+    return f"**📊 Last {label}**\n" + "\n".join(lines) + "\n━━━━━━━━━━━━━━━━━━━━━\n"
+
+def get_proposal_section(address):
+    """Proposal stats counted from our own block headers, shown even while Huginn is down."""
+    st = proposal_tracker.summary(address)
+    if st is None:
+        return ""
+    baseline = f" (usual `{st['baseline_share'] * 100:.2f}%`)" if st["baseline_share"] is not None else ""
+    since = f"`{st['blocks_since_last']:,}` blocks ago" if st["blocks_since_last"] is not None else "`none seen yet`"
+    lines = [
+        "**🧱 Local Proposals**",
+        f"📦 *Epoch {st['epoch']}:* `{st['proposed']}` of `{st['blocks']:,}` blocks | share `{st['share'] * 100:.2f}%`{baseline}",
+        f"🕒 *Last Proposal:* {since}",
+    ]
+    if st["shortfall"] is not None and st["shortfall"] >= 1:
+        lines.append(f"📉 *Shortfall:* `{st['shortfall']:.0f}` fewer than expected this epoch")
+    rec = st["reconciled"]
+    if rec and rec["through"] is not None:
+        lines.append(f"🔍 *Huginn Check:* local `{rec['local']}` vs Huginn `{rec['huginn']}` finalized | `{rec['timeouts']}` timeouts")
+    return "\n".join(lines) + "\n━━━━━━━━━━━━━━━━━━━━━\n"
 
 def create_status_message(local_height, tps, gas_sec, base_fee, block_time_ms, cpu, ram, disk_str, disk_io_str, temp_str, nvme_str, monad_details, val_data):
     if local_height is None:
         return "🚨 *ERROR:* Cannot reach the local Node RPC!"
     
     uptime = get_uptime()
+    missed_block_counter = log_engine.missed_blocks
     now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    api_epoch, _, _ = get_epoch_details()
+    api_epoch, _, _ = snapshot.get("epoch") or ("N/A", "N/A", "N/A")
     
     if val_data and val_data.get('is_jailed'):
         val_status = "🛑 `JAILED (Slashed!)`"
@@ -341,7 +1429,20 @@ def create_status_message(local_height, tps, gas_sec, base_fee, block_time_ms, c
         val_section = "**🏆 Validator Stats**\n⚠️ *Awaiting Huginn API Data*\n━━━━━━━━━━━━━━━━━━━━━\n"
 
     gas_formatted = f"{gas_sec / 1_000_000:.1f}M" if gas_sec > 0 else "0"
+    history_section = get_history_section(3600)
     nvme_section = f"{nvme_str}\n" if nvme_str else ""
+    
+    disk_latency_section = ""
+    diskstats = snapshot.get("diskstats")
+    if diskstats:
+        for name in sorted(set(diskstats["roles"].values())):
+            d = diskstats["devices"].get(name)
+            if d:
+                fmt = lambda v: f"{v:.2f} ms" if v is not None else "idle"
+                disk_latency_section += (
+                    f"🐢 *{disk_role_label(name, diskstats['roles'])} ({name}):* r `{fmt(d['r_await_ms'])}` | w `{fmt(d['w_await_ms'])}` | "
+                    f"`{d['r_iops'] + d['w_iops']:.0f}` IOPS | util `{d['util']:.0f}%` | q `{d['queue']:.1f}`\n"
+                )
     block_time_display = f"{block_time_ms:.0f} ms" if block_time_ms > 0 else "Calculating..."
 
     msg = (
@@ -354,17 +1455,23 @@ def create_status_message(local_height, tps, gas_sec, base_fee, block_time_ms, c
         f"⚡ *Current TPS:* `{tps}`\n"
         f"🔥 *Gas/Sec:* `{gas_formatted}` | 💸 *Base Fee:* `{base_fee:.2f} gwei`\n"
         f"🔄 *Sync Status:* {sync_emoji} `{sync_status}`\n"
+        + get_rpc_probe_section(snapshot.get("rpc_probe")) +
         f"🎯 *Epoch:* `{api_epoch}`\n"  
         f"🔁 *Round:* `{rnd}`\n"
         f"✍️ *Node Status:* {val_status}\n"
         "━━━━━━━━━━━━━━━━━━━━━\n"
-        + val_section +
+        + history_section
+        + val_section
+        + get_proposal_section(PROPOSER_ADDRESS or VALIDATOR_ADDRESS) +
         "**🖥️ Server Health**\n"
         f"🧠 *CPU:* `{cpu}%` | 💾 *RAM:* `{ram}%`\n"
+        + get_process_section(snapshot.get("processes")) +
         f"🌡️ *Temp (Gen):* `{temp_str}`\n"
         + nvme_section +
-        "💽 *OS Disk:* `{disk_str}`\n"
+        f"💽 *OS Disk:* `{disk_str}`\n"
         f"⚙️ *Disk I/O:* `{disk_io_str}`\n"
+        + disk_latency_section
+        + get_network_section(snapshot.get("network")) +
         f"🗄️ *TrieDB:* `{triedb_str}`\n"
         f"⏳ *Bot Uptime:* `{uptime}`\n"
         "━━━━━━━━━━━━━━━━━━━━━\n"
@@ -372,169 +1479,1756 @@ def create_status_message(local_height, tps, gas_sec, base_fee, block_time_ms, c
     )
     return msg
 
+# --- JOURNALD LOG ENGINE ---
+LOG_UNIT = "monad-bft"
+LOG_CURSOR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".journal_cursor")
+LOG_CURSOR_SAVE_INTERVAL = 1  # Seconds between cursor writes
+LOG_REPLAY_MAX_AGE = 60       # Entries written this long before the reader started (replayed after downtime) are not counted
+LOG_MISS_RE = re.compile(r'consensus timeout|failed to propose|missed block', re.IGNORECASE)
+LOG_EVENT_RE = re.compile(r'(consensus timeout|failed to propose|missed block)|sending vote|committed state', re.IGNORECASE)
+
+class LogEngine:
+    """Follows the monad-bft journal as JSON in buffered batches.
+
+    All patterns are matched with one precompiled regex. The journal cursor is
+    persisted after each batch so a restart resumes exactly where it stopped,
+    and counters are guarded by a lock since the main loop reads and resets them.
+    Entries written more than `max_age` before the reader started only advance
+    the cursor: after a long downtime the replayed history must not page a
+    stale missed-block alert. Live entries always count, however far behind
+    the reader falls; skipped ones are counted in `replay_skipped`.
+    """
+
+    def __init__(self, unit=LOG_UNIT, cursor_file=LOG_CURSOR_FILE, max_age=LOG_REPLAY_MAX_AGE):
+        self.unit = unit
+        self.cursor_file = cursor_file
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.missed_blocks = 0
+        self.total_lines = 0
+        self.lines_per_sec = 0.0
+        self.lag_seconds = None
+        self.replay_skipped = 0
+        self.replay_before = None  # Set when the reader starts
+        self.cursor = None  # Read from cursor_file when the reader starts, not at import
+        self._last_cursor_save = 0
+        self._rate_lines = 0
+        self._rate_started = time.monotonic()
+
+    def load_cursor(self):
+        if not self.cursor_file:
+            return None
+        try:
+            with open(self.cursor_file) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def save_cursor(self):
+        if not self.cursor or not self.cursor_file:
+            return
+        tmp = self.cursor_file + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                f.write(self.cursor)
+            os.replace(tmp, self.cursor_file)
+        except OSError as e:
+            print(f"⚠️ [LOG] Cannot persist journal cursor: {e}")
+
+    def command(self):
+        cmd = ['journalctl', '-u', self.unit, '-f', '-o', 'json', '--output-fields=MESSAGE']
+        if self.cursor:
+            cmd.append(f'--after-cursor={self.cursor}')
+        else:
+            cmd += ['-n', '0']
+        return cmd
+
+    def process_batch(self, lines):
+        missed = 0
+        skipped = 0
+        reset = False
+        cursor = None
+        realtime = None
+        oldest = self.replay_before
+        for raw in lines:
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                continue
+            cursor = entry.get("__CURSOR", cursor)
+            realtime = entry.get("__REALTIME_TIMESTAMP", realtime)
+            message = entry.get("MESSAGE")
+            if not isinstance(message, str):
+                continue
+            if oldest is not None and realtime:
+                try:
+                    if int(realtime) / 1_000_000 < oldest:
+                        skipped += 1
+                        continue
+                except ValueError:
+                    pass
+            m = LOG_EVENT_RE.search(message)
+            if m is None:
+                continue
+            if m.group(1) or LOG_MISS_RE.search(message, m.end()):
+                missed += 1
+            else:
+                missed = 0
+                reset = True
+
+        with self._lock:
+            self.missed_blocks = missed if reset else self.missed_blocks + missed
+            self.total_lines += len(lines)
+            self.replay_skipped += skipped
+        self._rate_lines += len(lines)
+        if cursor:
+            self.cursor = cursor
+        if realtime:
+            # journalctl always includes the entry timestamp (microseconds); the gap is our reading lag
+            try:
+                self.lag_seconds = max(0.0, time.time() - int(realtime) / 1_000_000)
+                perf.observe("log", "journal_lag", self.lag_seconds)
+            except ValueError:
+                pass
+
+        now = time.monotonic()
+        if now - self._rate_started >= 1:
+            self.lines_per_sec = self._rate_lines / (now - self._rate_started)
+            self._rate_lines = 0
+            self._rate_started = now
+        if now - self._last_cursor_save >= LOG_CURSOR_SAVE_INTERVAL:
+            self.save_cursor()
+            self._last_cursor_save = now
+
+    def consume_missed(self, threshold):
+        """Returns and resets the missed-block counter once it reaches threshold."""
+        with self._lock:
+            missed = self.missed_blocks
+            if missed < threshold:
+                return 0
+            self.missed_blocks = 0
+            return missed
+
+    def to_state(self):
+        with self._lock:
+            return {"missed_blocks": self.missed_blocks}
+
+    def load_state(self, data):
+        with self._lock:
+            self.missed_blocks = data.get("missed_blocks", 0)
+
+    def stats(self):
+        with self._lock:
+            return {"missed_blocks": self.missed_blocks, "total_lines": self.total_lines, "lines_per_sec": self.lines_per_sec,
+                    "lag_seconds": self.lag_seconds, "replay_skipped": self.replay_skipped}
+
+    def run(self):
+        print("🥷 [INFO] Ninja Log Reader started...")
+        self.cursor = self.load_cursor()
+        if self.max_age is not None:
+            self.replay_before = time.time() - self.max_age
+        backoff = 1
+        while True:
+            try:
+                process = subprocess.Popen(self.command(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+                fd = process.stdout.fileno()
+                pending = b""
+                while True:
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    backoff = 1
+                    pending += chunk
+                    *lines, pending = pending.split(b"\n")
+                    if lines:
+                        self.process_batch(lines)
+                process.wait()
+            except Exception as e:
+                print(f"⚠️ [LOG] Journal reader failed: {e}")
+            self.save_cursor()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+log_engine = LogEngine()
+
 def monitor_logs():
-    global missed_block_counter
-    print("🥷 [INFO] Ninja Log Reader started...")
-    process = subprocess.Popen(['journalctl', '-u', 'monad-bft', '-f', '-n', '0'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-    for line in process.stdout:
-        line_lower = line.lower()
-        if "consensus timeout" in line_lower or "failed to propose" in line_lower or "missed block" in line_lower:
-            missed_block_counter += 1
-        elif "sending vote" in line_lower or "committed state" in line_lower:
-            missed_block_counter = 0
-
-def check_updates():
-    global last_update_id
-    params = {"timeout": 0}
-    if last_update_id:
-        params["offset"] = last_update_id + 1
+    log_engine.run()
+
+# --- MONAD PROCESS TRACKING ---
+class ProcessTracker:
+    """Per-process CPU, memory, fds, context switches and I/O for the Monad daemons.
+
+    psutil.Process handles are cached and reused every tick; the process table
+    is only scanned again when a tracked process is missing or its handle died.
+    A new create_time for a name means the daemon restarted, which is queued
+    as an alert. CPU and rates are deltas between consecutive samples.
+    """
+
+    def __init__(self, names=MONAD_PROCESSES):
+        self.names = names
+        self.handles = {}     # name -> psutil.Process
+        self.started = {}     # name -> create_time of the last known instance
+        self.previous = {}    # name -> (monotonic time, cpu total, ctx switches, io (read, write), {tid: cpu})
+        self.pss = {}         # name -> (read_at, pss bytes)
+        self.fd_limits = {}   # name -> soft RLIMIT_NOFILE
+        self.restarts = {name: 0 for name in names}
+        self.events = deque(maxlen=20)
+        self.last_scan = 0
+        self._lock = threading.Lock()
+
+    def scan(self):
+        import psutil
+        wanted = [n for n in self.names if n not in self.handles]
+        for proc in psutil.process_iter(["name", "cmdline", "create_time"]):
+            info = proc.info
+            cmd = os.path.basename((info.get("cmdline") or [""])[0])
+            for name in wanted:
+                if info.get("name") == name[:15] or cmd == name:
+                    self.adopt(name, proc, info["create_time"])
+                    wanted.remove(name)
+                    break
+            if not wanted:
+                break
+        self.last_scan = time.time()
+
+    def adopt(self, name, proc, create_time):
+        import psutil
+        known = self.started.get(name)
+        if known is not None and known != create_time:
+            self.restarts[name] += 1
+            with self._lock:
+                self.events.append(f"🔄 *PROCESS RESTARTED:* `{name}` is running again as PID `{proc.pid}` (restart #{self.restarts[name]})")
+        self.started[name] = create_time
+        self.handles[name] = proc
+        try:
+            self.fd_limits[name] = proc.rlimit(psutil.RLIMIT_NOFILE)[0]
+        except (psutil.Error, AttributeError):
+            self.fd_limits[name] = None
+        self.previous.pop(name, None)
+        self.pss.pop(name, None)
+
+    def drop(self, name):
+        self.handles.pop(name, None)
+        self.previous.pop(name, None)
+        with self._lock:
+            self.events.append(f"🛑 *PROCESS DOWN:* `{name}` is no longer running!")
+
+    def sample(self, name, proc, now):
+        import psutil
+        with proc.oneshot():
+            cpu = proc.cpu_times()
+            mem = proc.memory_info()
+            ctx = proc.num_ctx_switches()
+            fds = proc.num_fds()
+            threads = {t.id: t.user_time + t.system_time for t in proc.threads()}
+            try:
+                io = proc.io_counters()
+                io = (io.read_bytes, io.write_bytes)
+            except (psutil.AccessDenied, AttributeError):
+                io = None
+        cpu_total = cpu.user + cpu.system
+        ctx_total = ctx.voluntary + ctx.involuntary
+
+        pss_at, pss = self.pss.get(name, (0, None))
+        if time.time() - pss_at > PROCESS_PSS_INTERVAL:
+            try:
+                pss = proc.memory_full_info().pss
+            except (psutil.AccessDenied, AttributeError):
+                pss = None
+            self.pss[name] = (time.time(), pss)
+
+        stats = {"pid": proc.pid, "rss": mem.rss, "pss": pss, "fds": fds, "fd_limit": self.fd_limits.get(name), "threads": len(threads),
+                 "restarts": self.restarts[name], "cpu": None, "ctx_per_sec": None,
+                 "read_bps": None, "write_bps": None, "hot_threads": []}
+        prev = self.previous.get(name)
+        self.previous[name] = (now, cpu_total, ctx_total, io, threads)
+        if prev is None or now <= prev[0]:
+            return stats
+
+        dt = now - prev[0]
+        stats["cpu"] = (cpu_total - prev[1]) / dt * 100
+        stats["ctx_per_sec"] = (ctx_total - prev[2]) / dt
+        if io and prev[3]:
+            stats["read_bps"] = (io[0] - prev[3][0]) / dt
+            stats["write_bps"] = (io[1] - prev[3][1]) / dt
+        busiest = sorted(((t - prev[4].get(tid, t)) / dt * 100, tid) for tid, t in threads.items())[-PROCESS_HOT_THREADS:]
+        for pct, tid in reversed(busiest):
+            if pct < 1:
+                break
+            stats["hot_threads"].append((self.thread_name(proc.pid, tid), pct))
+        return stats
+
+    @staticmethod
+    def thread_name(pid, tid):
+        try:
+            with open(f"/proc/{pid}/task/{tid}/comm") as f:
+                return f.read().strip()
+        except OSError:
+            return str(tid)
+
+    def collect(self):
+        import psutil
+        if len(self.handles) < len(self.names) and time.time() - self.last_scan > PROCESS_RESCAN_INTERVAL:
+            self.scan()
+
+        now = time.monotonic()
+        result = {}
+        for name in self.names:
+            proc = self.handles.get(name)
+            if proc is None:
+                continue
+            try:
+                if not proc.is_running():
+                    raise psutil.NoSuchProcess(proc.pid)
+                result[name] = self.sample(name, proc, now)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                self.drop(name)
+                # Look for the replacement right away so a restart is reported as one
+                self.scan()
+                if name in self.handles:
+                    try:
+                        result[name] = self.sample(name, self.handles[name], now)
+                    except psutil.Error:
+                        pass
+            except psutil.AccessDenied:
+                continue
+
+        t = time.time()
+        for name, st in result.items():
+            metrics_store.record(f"proc_cpu:{name}", st["cpu"], t)
+            metrics_store.record(f"proc_rss:{name}", st["rss"], t)
+            metrics_store.record(f"proc_fds:{name}", st["fds"], t)
+        return result
+
+    def drain_events(self):
+        with self._lock:
+            events = list(self.events)
+            self.events.clear()
+        # A quick restart queues "down" then "restarted"; the second says it all
+        return [e for i, e in enumerate(events) if not ("DOWN" in e and any("RESTARTED" in later for later in events[i + 1:]))]
+
+    def to_state(self):
+        return {"started": dict(self.started), "restarts": dict(self.restarts)}
+
+    def load_state(self, data):
+        # A daemon that restarted while the watchdog was down is reported on the first scan
+        self.started.update(data.get("started", {}))
+        for name, count in data.get("restarts", {}).items():
+            if name in self.restarts:
+                self.restarts[name] = count
+
+process_tracker = ProcessTracker()
+
+def get_process_section(processes):
+    """One line per Monad daemon for /status, with the 1h RSS trend."""
+    if not process_tracker.started:
+        return ""
+    lines = []
+    for name in MONAD_PROCESSES:
+        st = (processes or {}).get(name)
+        if st is None:
+            # Optional daemons this host never ran (e.g. monad-rpc on a validator) are left out
+            if name in REQUIRED_PROCESSES or name in process_tracker.started:
+                lines.append(f"🛑 *{name}:* `not running`")
+            continue
+        cpu = f"{st['cpu']:.0f}%" if st["cpu"] is not None else "..."
+        rss_hist = metrics_store.stats(f"proc_rss:{name}", 3600)
+        growth = f" ({'+' if st['rss'] >= rss_hist['min'] else '-'}{format_bytes(abs(st['rss'] - rss_hist['min']))} 1h)" if rss_hist else ""
+        line = f"⚙️ *{name}:* CPU `{cpu}` | RSS `{format_bytes(st['rss'])}`{growth} | fds `{st['fds']}`"
+        if st["hot_threads"]:
+            thread, pct = st["hot_threads"][0]
+            line += f" | 🔥 `{thread}` `{pct:.0f}%`"
+        if st["restarts"]:
+            line += f" | 🔄 `{st['restarts']}`"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+# --- HEARTBEAT EMITTER ---
+class HeartbeatEmitter:
+    """Tells the external heartbeat server that this watchdog is alive.
+
+    With HEARTBEAT_UDP_ADDR and HEARTBEAT_SECRET set, every call sends one
+    HMAC-signed datagram carrying the node ID, a sequence number, the local
+    block height and a health bitmap built from the snapshot. Otherwise it
+    falls back to a plain HTTP GET on WATCHDOG_SERVER_IP/ping.
+    """
+
+    def __init__(self):
+        self.node_id = HEARTBEAT_NODE_ID or "default"
+        # Start from the clock so the sequence keeps increasing across restarts
+        self.seq = time.time_ns() // 1000
+        self.sock = None
+        self.addr = None
+        self.last_http_ping = 0
+        import requests
+        self.session = requests.Session()
+        if HEARTBEAT_UDP_ADDR and HEARTBEAT_SECRET:
+            host, _, port = HEARTBEAT_UDP_ADDR.rpartition(":")
+            self.addr = (host, int(port))
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    @staticmethod
+    def health_bits(data):
+        from heartbeat_packet import HEALTH_RPC_UP, HEALTH_IN_SYNC, HEALTH_HUGINN_UP, HEALTH_JAILED, HEALTH_MISSING_BLOCKS
+        bits = 0
+        block = data.get("block")
+        if block and block[0] is not None:
+            bits |= HEALTH_RPC_UP
+        if (data.get("monad_status") or {}).get("sync_status") == "in-sync":
+            bits |= HEALTH_IN_SYNC
+        val = data.get("validator_api")
+        if val is not None:
+            bits |= HEALTH_HUGINN_UP
+            if val.get("is_jailed"):
+                bits |= HEALTH_JAILED
+        if (data.get("logs") or {}).get("missed_blocks"):
+            bits |= HEALTH_MISSING_BLOCKS
+        return bits
+
+    def emit(self):
+        if self.sock:
+            from heartbeat_packet import encode_heartbeat
+            _, data = snapshot.read()
+            block = data.get("block")
+            self.seq += 1
+            packet = encode_heartbeat(HEARTBEAT_SECRET, self.node_id, self.seq, block[0] if block else None, self.health_bits(data))
+            self.sock.sendto(packet, self.addr)
+        elif WATCHDOG_SERVER_IP and time.time() - self.last_http_ping >= HEARTBEAT_HTTP_INTERVAL:
+            self.last_http_ping = time.time()
+            params = {"node": HEARTBEAT_NODE_ID} if HEARTBEAT_NODE_ID else None
+            self.session.get(f"{WATCHDOG_SERVER_IP.rstrip('/')}/ping", params=params, timeout=5)
+
+# --- SHARED SNAPSHOT ---
+class Snapshot:
+    """Latest collector results, versioned per key.
+
+    Writers replace the whole dict under a lock (copy-on-write), so readers
+    just grab the current reference and never block on a slow collector.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+        self._versions = {}
+        self.updated_at = {}
+        self.version = 0
+
+    def publish(self, key, value):
+        with self._lock:
+            data = dict(self._data)
+            data[key] = value
+            versions = dict(self._versions)
+            versions[key] = versions.get(key, 0) + 1
+            updated_at = dict(self.updated_at)
+            updated_at[key] = time.time()
+            self._data = data
+            self._versions = versions
+            self.updated_at = updated_at
+            self.version += 1
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def version_of(self, key):
+        return self._versions.get(key, 0)
+
+    def read(self):
+        return self.version, self._data
+
+snapshot = Snapshot()
+
+# --- COLLECTOR SCHEDULER ---
+class CollectorScheduler:
+    """Runs every collector on its own interval in a thread pool.
+
+    A collector that overruns its deadline is abandoned: its fallback value is
+    published, its late result is dropped, and it is not resubmitted until the
+    stuck call returns (requests/subprocess timeouts bound how long that is).
+    """
+
+    def __init__(self, snapshot, tick=0.05):
+        self.snapshot = snapshot
+        self.tick = tick
+        self.collectors = {}
+        self._executor = None
+        self._thread = None
+
+    def register(self, name, func, interval, deadline, fallback=None):
+        self.collectors[name] = {
+            "func": perf.wrap("collector", name, func),
+            "interval": interval,
+            "deadline": deadline,
+            "fallback": fallback,
+            "next_run": 0.0,
+            "future": None,
+            "started": 0.0,
+            "timed_out": False,
+        }
+
+    def start(self):
+        from concurrent.futures import ThreadPoolExecutor
+        self._executor = ThreadPoolExecutor(max_workers=len(self.collectors) + 2, thread_name_prefix="collector")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            now = time.monotonic()
+            for name, c in self.collectors.items():
+                future = c["future"]
+                if future is not None:
+                    if future.done():
+                        c["future"] = None
+                        if not c["timed_out"]:
+                            try:
+                                result = future.result()
+                                # Collectors return the same object when nothing changed
+                                if result is not self.snapshot.get(name):
+                                    self.snapshot.publish(name, result)
+                            except Exception as e:
+                                print(f"⚠️ [COLLECTOR] {name} failed: {e}")
+                                self.snapshot.publish(name, c["fallback"])
+                    elif not c["timed_out"] and now - c["started"] > c["deadline"]:
+                        future.cancel()
+                        c["timed_out"] = True
+                        perf.incr("collector_timeouts")
+                        print(f"⚠️ [COLLECTOR] {name} exceeded its {c['deadline']}s deadline")
+                        self.snapshot.publish(name, c["fallback"])
+                    continue
+
+                if now >= c["next_run"]:
+                    c["started"] = now
+                    c["timed_out"] = False
+                    c["next_run"] = now + c["interval"]
+                    c["future"] = self._executor.submit(c["func"])
+            time.sleep(self.tick)
+
+def finish_tick(started):
+    """Records how long a main-loop tick took and returns the sleep until the next one."""
+    elapsed = time.monotonic() - started
+    perf.observe("loop", "main", elapsed)
+    if elapsed > CHECK_INTERVAL:
+        perf.incr("loop_overruns")
+        return 0
+    return CHECK_INTERVAL - elapsed
+
+# --- SAMPLING PROFILER ---
+profiler = SamplingProfiler(PROFILE_DIR, hz=PROFILE_HZ)
+
+def start_profile(seconds=PROFILE_SECONDS, chat_id=None):
+    """Records folded stacks for `seconds` in the background and reports the file when done."""
+    def done(path):
+        text = f"🔬 Profile written to `{path}`" if path else "⚠️ Profiling failed, see the watchdog log."
+        if path:
+            print(f"🔬 [PROFILER] Profile written to {path}")
+        if chat_id:
+            send_message(chat_id, text)
+    return profiler.start(seconds, on_done=done)
+
+def install_profile_signal():
+    """`kill -USR1 <pid>` records a profile when PROFILER_ENABLED is set."""
+    if not PROFILER_ENABLED or threading.current_thread() is not threading.main_thread():
+        return
+    signal.signal(signal.SIGUSR1, lambda signum, frame: start_profile())
+
+# --- ADAPTIVE ANOMALY DETECTION ---
+# metric: (label, value formatter). Fed once per main-loop tick.
+ANOMALY_METRICS = {
+    "block_time_ms": ("⏱️ Block Time", lambda v: f"{v:.0f} ms"),
+    "gas_per_sec": ("🔥 Gas/Sec", lambda v: f"{v / 1_000_000:.1f}M"),
+    "base_fee": ("💸 Base Fee", lambda v: f"{v:.2f} gwei"),
+    "cpu": ("🧠 CPU", lambda v: f"{v:.0f}%"),
+    "ram": ("💾 RAM", lambda v: f"{v:.0f}%"),
+    "rpc_p95_ms": ("📡 RPC p95", lambda v: f"{v:.0f} ms"),
+}
+
+anomaly_monitor = AnomalyMonitor([AnomalyDetector(name) for name in ANOMALY_METRICS], ANOMALY_STATE_FILE)
+
+def check_anomalies(samples):
+    """Feeds {metric: value} into the detectors and returns alert texts for state changes."""
+    alerts = []
+    for name, value in samples.items():
+        if value is None:
+            continue
+        event = anomaly_monitor.update(name, value)
+        if event is None:
+            continue
+        label, fmt = ANOMALY_METRICS[name]
+        detector = anomaly_monitor.detectors[name]
+        if event == "enter":
+            p99 = detector.quantile.value
+            alerts.append(
+                f"📈 **ANOMALY: {label}** 📈\nNow `{fmt(detector.fast)}` vs. usual `{fmt(detector.mean)}`"
+                + (f" (p99 `{fmt(p99)}`)" if p99 is not None else "")
+            )
+        else:
+            alerts.append(f"✅ {label} is back to its usual level (`{fmt(detector.fast)}`).")
+    return alerts
+
+# --- ALERT RULES ---
+def default_alert_rules():
+    """The built-in threshold alerts, read from the current settings so a config reload retunes them."""
+    resources = "SYSTEM RESOURCE WARNING"
+    return [
+        {"name": "high_cpu", "metric": "cpu", "op": ">", "threshold": ALERT_CPU_THRESHOLD, "hysteresis": 5,
+         "group": resources, "message": "⚠️ *HIGH CPU:* `{value}%`"},
+        {"name": "high_ram", "metric": "ram", "op": ">", "threshold": ALERT_RAM_THRESHOLD, "hysteresis": 5,
+         "group": resources, "message": "⚠️ *HIGH RAM:* `{value}%`"},
+        {"name": "os_disk_full", "metric": "disk_percent", "op": ">", "threshold": ALERT_DISK_THRESHOLD, "hysteresis": 1,
+         "group": resources, "message": "💽 *OS DISK:* `{value}%`"},
+        {"name": "triedb_full", "metric": "triedb_percent", "op": ">", "threshold": ALERT_DISK_THRESHOLD, "hysteresis": 1,
+         "group": resources, "message": "🗄️💽 *TRIEDB:* `{value}%`"},
+        {"name": "nvme_wear", "metric": "nvme_wear", "op": ">=", "threshold": 100, "severity": "critical", "group": resources,
+         "message": "🔥 **NVME WEAR CRITICAL!** `{instance}` has exceeded 100% wear! Ticking Time Bomb! 💣"},
+        {"name": "slow_disk", "metric": "disk_await_ms", "op": ">", "threshold": ALERT_DISK_AWAIT_MS, "group": "DISK LATENCY WARNING",
+         "message": f"🐢 *SLOW DISK ({{instance}}):* await `{{value:.1f}} ms` over {DISK_LATENCY_WINDOW}s"},
+        {"name": "process_fds", "metric": "proc_fd_ratio", "op": ">", "threshold": ALERT_PROCESS_FD_RATIO, "hysteresis": 0.05,
+         "group": "PROCESS RESOURCE WARNING", "message": "📂 *{instance}:* `{value:.0%}` of the open-files limit in use"},
+        {"name": "process_rss_growth", "metric": "proc_rss_growth_gib", "op": ">", "threshold": ALERT_PROCESS_RSS_GROWTH / 1024**3,
+         "group": "PROCESS RESOURCE WARNING", "message": "📈 *{instance}:* RSS grew `{value:.2f} GiB` in the last hour"},
+        {"name": "low_peers", "metric": "peers", "op": "<", "threshold": ALERT_MIN_PEERS, "hysteresis": 2, "cooldown": 600,
+         "severity": "critical", "message": "🔌 **LOW PEER COUNT** 🔌\nThe node is connected to only `{value}` peers!",
+         "resolved": "✅ Peer count recovered to `{value}`."},
+        {"name": "peer_drop", "metric": "peer_drop_pct", "op": ">", "threshold": ALERT_PEER_DROP_PCT, "hysteresis": 10,
+         "group": "NETWORK WARNING", "message": "👥 *Peers:* `{value:.0f}%` below their 10-minute high"},
+        {"name": "tcp_retransmits", "metric": "tcp_retrans_pct", "op": ">", "threshold": ALERT_TCP_RETRANS_PCT, "group": "NETWORK WARNING",
+         "message": f"🔁 *TCP retransmits:* `{{value:.2f}}%` of sent segments over {NETWORK_WINDOW}s"},
+        {"name": "net_drops", "metric": "net_drops", "op": ">", "threshold": ALERT_NET_DROPS_PER_SEC, "group": "NETWORK WARNING",
+         "message": f"📉 *{{instance}}:* `{{value:.0f}}` dropped or errored packets/s over {NETWORK_WINDOW}s"},
+        {"name": "udp_buffer_overruns", "metric": "udp_rcvbuf_errors", "op": ">", "threshold": ALERT_UDP_RCVBUF_ERRORS_PER_SEC,
+         "group": "NETWORK WARNING", "message": f"📦 *UDP receive buffers full:* `{{value:.0f}}` datagrams/s lost over {NETWORK_WINDOW}s"},
+        {"name": "slow_rpc", "metric": "rpc_p95_ms", "op": ">", "threshold": ALERT_RPC_P95_MS, "for": 10, "hysteresis": ALERT_RPC_P95_MS / 5,
+         "group": "RPC WARNING", "message": f"🐌 *{{instance}}:* p95 `{{value:.0f}} ms` over the last {RPC_PROBE_WINDOW}s"},
+        {"name": "rpc_errors", "metric": "rpc_error_pct", "op": ">", "threshold": ALERT_RPC_ERROR_PCT, "hysteresis": 5,
+         "group": "RPC WARNING", "message": "❌ *Failed calls:* `{value:.0f}%` of the last probe calls"},
+        {"name": "rpc_lag", "metric": "rpc_lag_blocks", "op": ">", "threshold": ALERT_RPC_LAG_BLOCKS, "for": 15, "hysteresis": ALERT_RPC_LAG_BLOCKS / 2,
+         "message": "🐢 **NODE BEHIND REFERENCE RPC** 🐢\nThe local head is `{value}` blocks behind the reference RPC."},
+        {"name": "rpc_bad_data", "metric": "rpc_bad_responses", "op": ">=", "threshold": 1, "cooldown": 900, "severity": "critical",
+         "message": "🧪 **RPC CORRECTNESS CHECK FAILED** 🧪\n`{value}` check(s) failed, see /status for details."},
+        {"name": "heavy_execution", "metric": "gas_per_sec", "op": ">=", "threshold": ALERT_GAS_SEC_THRESHOLD, "severity": "info",
+         "message": "🔥 **HEAVY EXECUTION ALERT** 🔥\nNetwork burning `{value:,.0f}` Gas/sec!"},
+        {"name": "base_fee_spike", "metric": "base_fee", "op": ">=", "threshold": ALERT_BASE_FEE_THRESHOLD, "severity": "info",
+         "message": "💸 **BASE FEE SPIKE DETECTED** 💸\nFees skyrocketed to `{value:.2f} gwei`!"},
+        {"name": "high_tps", "metric": "tps", "op": ">=", "threshold": ALERT_TPS_THRESHOLD, "severity": "info",
+         "message": "🚀 **HIGH TPS ALERT** 🚀\nNetwork reached `{value}` TPS!"},
+        {"name": "proposal_overdue", "metric": "proposal_overdue", "op": ">", "threshold": -math.log(ALERT_PROPOSAL_FALSE_ALARM_RATE), "hysteresis": 1,
+         "cooldown": 1800, "message": "🧱 **NO RECENT PROPOSALS** 🧱\nNo block proposed for `{value:.1f}x` our usual gap between proposals."},
+        {"name": "api_lag", "metric": "api_lag", "op": ">", "threshold": API_LAG_THRESHOLD, "cooldown": 3600,
+         "message": "⏳ **HUGINN API LAG WARNING** ⏳\nHuginn API is lagging `{value:,}` blocks behind your local node!\n"
+                    "Delegation and reward metrics might not be up-to-date right now."},
+    ]
+
+def build_alert_rules():
+    """Built-in rules merged with ALERT_RULES (same name replaces, "enabled": False removes)."""
+    rules = {rule["name"]: rule for rule in default_alert_rules()}
+    for rule in ALERT_RULES:
+        rules[rule.get("name")] = rule
+    return list(rules.values())
+
+alert_rules = RuleEngine(build_alert_rules())
+config_mtime = None
+
+def reload_config():
+    """Re-reads config.py when it changed and recompiles the alert rules. A broken file keeps the old settings."""
+    global config_mtime
+    try:
+        mtime = os.stat(CONFIG_FILE).st_mtime
+    except OSError:
+        return
+    if config_mtime is None:
+        config_mtime = mtime
+    if mtime == config_mtime:
+        return
+    config_mtime = mtime
+    previous = {name: value for name, value in globals().items() if name.isupper()}
+    try:
+        globals().update(read_config_file(CONFIG_FILE))
+        alert_rules.load(build_alert_rules())
+    except Exception as e:
+        globals().update(previous)
+        print(f"⚠️ [CONFIG] Keeping the previous settings, {CONFIG_FILE} is invalid: {e}")
+        return
+    print(f"🔁 [CONFIG] Reloaded {CONFIG_FILE} ({len(alert_rules.rules)} alert rules)")
+
+def collect_rule_metrics(nodes):
+    """Flattens the snapshot into the {metric[@instance]: value} dict the alert rules run against."""
+    values = {}
+    system = snapshot.get("system")
+    if system:
+        values.update({"cpu": system[0], "ram": system[1], "disk_percent": system[2]})
+    values["triedb_percent"] = (snapshot.get("monad_status") or {}).get("triedb_percent")
+    for drive, wear, temp in snapshot.get("nvme") or ():
+        values[f"nvme_wear@{drive}"] = wear
+        values[f"nvme_temp@{drive}"] = temp
+    roles = disk_stats.roles
+    for name in set(roles.values()):
+        st = metrics_store.stats(f"disk_await_ms:{name}", DISK_LATENCY_WINDOW)
+        # Require several busy samples so one slow flush does not page anyone
+        if st and st["count"] >= 5:
+            values[f"disk_await_ms@{disk_role_label(name, roles)}"] = st["avg"]
+    probe = snapshot.get("rpc_probe")
+    if probe:
+        values["rpc_error_pct"] = probe["error_pct"]
+        values["rpc_lag_blocks"] = probe["lag_blocks"]
+        values["rpc_bad_responses"] = len(probe["problems"])
+        for method, st in probe["methods"].items():
+            # Percentiles of a handful of calls are just the slowest call
+            if method != "all" and st["count"] >= 20:
+                values[f"rpc_p95_ms@{method}"] = st["p95_ms"]
+    network = snapshot.get("network")
+    if network:
+        values["peers"] = network["peers"]
+        peers_hist = metrics_store.stats("peers", 600)
+        if network["peers"] is not None and peers_hist and peers_hist["max"] > 0:
+            values["peer_drop_pct"] = (peers_hist["max"] - network["peers"]) / peers_hist["max"] * 100
+        # Averages over NETWORK_WINDOW, so one bad sample does not page anyone
+        for key, series in [("tcp_retrans_pct", "tcp_retrans_pct"), ("udp_rcvbuf_errors", "udp_rcvbuf_errors")] + \
+                [(f"net_drops@{name}", f"net_drops:{name}") for name in network["interfaces"]]:
+            st = metrics_store.stats(series, NETWORK_WINDOW)
+            if st and st["count"] >= 5:
+                values[key] = st["avg"]
+    for name, st in (snapshot.get("processes") or {}).items():
+        if st["fd_limit"]:
+            values[f"proc_fd_ratio@{name}"] = st["fds"] / st["fd_limit"]
+        rss_hist = metrics_store.stats(f"proc_rss:{name}", 3600)
+        if rss_hist:
+            values[f"proc_rss_growth_gib@{name}"] = (st["rss"] - rss_hist["min"]) / 1024**3
+    for node in nodes:
+        values.update(node.rule_metrics(snapshot))
+    return values
+
+def evaluate_alert_rules(nodes):
+    with perf.timed("loop", "rules"):
+        return alert_rules.evaluate(collect_rule_metrics(nodes), time.time())
+
+def format_rule_alerts(firings):
+    """Turns rule firings into (text, channel) messages; firings of one group share a message."""
+    messages = []
+    groups = {}
+    for firing in firings:
+        if firing.rule.group and not firing.resolved:
+            groups.setdefault((firing.rule.group, firing.rule.channel), []).append(firing.text)
+        else:
+            messages.append((firing.text, firing.rule.channel))
+    for (group, channel), lines in groups.items():
+        messages.append((f"🚨 **{group}** 🚨\n\n" + "\n".join(lines), channel))
+    return messages
+
+# --- PER-NODE CHAIN & VALIDATOR CHECKS ---
+class NodeMonitor:
+    """Chain and validator alert state for one node.
+
+    Used for the local node in single-node mode and for every entry of
+    FLEET_NODES in fleet mode. Snapshot keys are prefixed with key_prefix so
+    many nodes can share one snapshot and one scheduler.
+    """
+
+    __slots__ = ("name", "validator_address", "ingestor", "key_prefix",
+                 "last_height", "last_height_change_time", "last_val_api_version",
+                 "last_stake", "initial_rewards", "api_down_alerted", "last_jail_alert_time",
+                 "proposer_address")
+
+    # Alert state carried over a restart
+    STATE_FIELDS = ("last_stake", "initial_rewards", "api_down_alerted", "last_jail_alert_time")
+    # Changes with every block, so it is saved along with the rest but never triggers a write
+    VOLATILE_FIELDS = ("last_height", "last_height_change_time")
+
+    def __init__(self, name, validator_address, ingestor, key_prefix="", proposer_address=None):
+        self.name = name
+        self.validator_address = validator_address
+        self.ingestor = ingestor
+        self.key_prefix = key_prefix
+        self.proposer_address = proposer_address or validator_address
+        proposal_tracker.track(self.proposer_address)
+        self.last_height = 0
+        self.last_height_change_time = time.time()
+        self.last_val_api_version = 0
+        self.last_stake = None
+        self.initial_rewards = None
+        self.api_down_alerted = False
+        self.last_jail_alert_time = 0
+
+    def collect_block(self):
+        try:
+            self.ingestor.poll()
+            return self.ingestor.metrics()
+        except Exception:
+            return None, 0, 0, 0.0, 0.0
+
+    def collect_validator_api(self):
+        return get_validator_api_details(self.validator_address)
+
+    def register(self, scheduler):
+        scheduler.register(f"{self.key_prefix}block", self.collect_block, *COLLECTOR_SCHEDULE["block"], fallback=(None, 0, 0, 0.0, 0.0))
+        if self.validator_address:
+            scheduler.register(f"{self.key_prefix}validator_api", self.collect_validator_api, *COLLECTOR_SCHEDULE["validator_api"])
+
+    def check(self, snapshot):
+        """Returns the alert texts raised by the latest snapshot for this node."""
+        alerts = []
+        block = snapshot.get(f"{self.key_prefix}block")
+        current_height = block[0] if block else None
+        val_key = f"{self.key_prefix}validator_api"
+        val_api_data = snapshot.get(val_key)
+        val_api_fresh = snapshot.version_of(val_key) != self.last_val_api_version
+        self.last_val_api_version = snapshot.version_of(val_key)
+
+        # --- HUGINN API SILENCE PROTECTION (lag is the api_lag rule) ---
+        if val_api_fresh and val_api_data is None:
+            if not self.api_down_alerted:
+                alerts.append("⚠️ **API SILENCE WARNING** ⚠️\nHuginn API is unreachable! The bot cannot track delegation (stake) changes right now (Blind spot).")
+                self.api_down_alerted = True
+        elif val_api_fresh:
+            if self.api_down_alerted:
+                alerts.append("✅ Huginn API connection restored. Monitoring is active.")
+                self.api_down_alerted = False
+            if self.initial_rewards is None and val_api_data.get("rewards"):
+                self.initial_rewards = val_api_data["rewards"]
+            if val_api_data.get("api_block_height") is not None:
+                proposal_tracker.reconcile(self.proposer_address, val_api_data["api_block_height"],
+                                           val_api_data.get("finalized_count", 0), val_api_data.get("timeout_count", 0))
+
+            # --- STAKE ALERTS ---
+            if "stake" in val_api_data:
+                current_stake = val_api_data["stake"]
+                if self.last_stake is not None:
+                    if current_stake < self.last_stake:
+                        dropped_amount = self.last_stake - current_stake
+                        alerts.append(f"⚠️ **STAKE DROP ALERT** ⚠️\n`{dropped_amount:,.2f} MON` was unstaked from your validator!\nCurrent Stake: `{current_stake:,.2f} MON`")
+                    elif current_stake > self.last_stake:
+                        gained_amount = current_stake - self.last_stake
+                        alerts.append(f"🎉 **STAKE INCREASE ALERT** 🎉\n`{gained_amount:,.2f} MON` was delegated to your validator!\nCurrent Stake: `{current_stake:,.2f} MON`")
+                self.last_stake = current_stake
         
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates"
+        if val_api_data and val_api_data.get("is_jailed") and time.time() - self.last_jail_alert_time > 60:
+            alerts.append("🚨 *CRITICAL ALERT* 🚨\n\nYour validator has been **JAILED (Slashed)**! Immediate action required!")
+            self.last_jail_alert_time = time.time()
+
+        if current_height is not None:
+            if current_height != self.last_height:
+                self.last_height_change_time = time.time()
+            elif time.time() - self.last_height_change_time >= STALL_TIMEOUT: 
+                alerts.append(f"🛑 *ALERT: Node STUCK!*\nBlock: `{current_height}`\nNo new blocks for {STALL_TIMEOUT // 60} minutes!")
+                self.last_height_change_time = time.time()
+            self.last_height = current_height
+        return alerts
+
+    def rule_metrics(self, snapshot):
+        """This node's values for the alert rules; fleet nodes use `metric@name` keys."""
+        block = snapshot.get(f"{self.key_prefix}block")
+        val = snapshot.get(f"{self.key_prefix}validator_api")
+        values = {}
+        if block and block[0] is not None:
+            height, tps, gas_sec, base_fee, block_time_ms = block
+            if not self.key_prefix:
+                # Chain-wide numbers; in fleet mode every node would report the same ones
+                values.update({"tps": tps, "gas_per_sec": gas_sec, "base_fee": base_fee, "block_time_ms": block_time_ms})
+            if val and val.get("api_block_height") is not None:
+                values["api_lag"] = height - val["api_block_height"]
+        if val:
+            values.update({"uptime_pct": val.get("uptime_pct"), "stake": val.get("stake"),
+                           "is_jailed": int(bool(val.get("is_jailed")))})
+        proposals = proposal_tracker.summary(self.proposer_address)
+        if proposals:
+            values.update({"proposal_overdue": proposals["overdue"], "proposal_share": proposals["share"],
+                           "proposal_shortfall": proposals["shortfall"]})
+        if self.key_prefix:
+            return {f"{key}@{self.name}": value for key, value in values.items()}
+        return values
+
+    def to_state(self):
+        return {field: getattr(self, field) for field in self.STATE_FIELDS}
+
+    def volatile_state(self):
+        return {field: getattr(self, field) for field in self.VOLATILE_FIELDS}
+
+    def load_state(self, data):
+        for field in self.STATE_FIELDS + self.VOLATILE_FIELDS:
+            if field in data:
+                setattr(self, field, data[field])
+
+    def summary_line(self, snapshot):
+        block = snapshot.get(f"{self.key_prefix}block")
+        val = snapshot.get(f"{self.key_prefix}validator_api")
+        if not block or block[0] is None:
+            return f"🔴 *{self.name}:* RPC unreachable"
+        height, tps, _, _, block_time_ms = block
+        emoji = "🟢" if time.time() - self.last_height_change_time < 30 else "🟡"
+        line = f"{emoji} *{self.name}:* `{height}` | `{block_time_ms:.0f} ms` | `{tps}` TPS"
+        if val:
+            jailed = " | 🛑 `JAILED`" if val.get("is_jailed") else ""
+            line += f" | 🟢 `{val['uptime_pct']:.2f}%` | 💎 `{val['stake']:,.0f} MON`{jailed}"
+        proposals = proposal_tracker.summary(self.proposer_address)
+        if proposals and proposals["proposed"]:
+            line += f" | 🧱 `{proposals['proposed']}`"
+        return line
+
+fleet_nodes = []
+
+def create_fleet_status_message():
+    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    lines = [f"🛰️ *MONAD WATCHDOG FLEET* ({len(fleet_nodes)} nodes)", f"📅 `{now}`", "━━━━━━━━━━━━━━━━━━━━━"]
+    lines += [node.summary_line(snapshot) for node in fleet_nodes]
+    lines += ["━━━━━━━━━━━━━━━━━━━━━", f"⏳ *Bot Uptime:* `{get_uptime()}`"]
+    return "\n".join(lines)
+
+def run_fleet():
+    """Fleet mode: RPC and Huginn collectors for every node in FLEET_NODES over shared pools."""
+    print(f"🛰️ [INFO] Monad Watchdog fleet mode started for {len(FLEET_NODES)} nodes...")
+    import requests
+    from requests.adapters import HTTPAdapter
+    # Every node's collectors may be in flight at once; undersized pools would serialize them
+    pool_size = max(len(FLEET_NODES), 4)
+    rpc_session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    rpc_session.mount("http://", adapter)
+    rpc_session.mount("https://", adapter)
+    huginn.pool_size = max(huginn.pool_size, pool_size)  # Its session is created on the first fetch
+
+    scheduler = CollectorScheduler(snapshot)
+    for cfg in FLEET_NODES:
+        ingestor = BlockIngestor(cfg["rpc_url"], cfg.get("ws_url", ""), session=rpc_session)
+        ingestor.on_block = proposal_tracker.record
+        node = NodeMonitor(cfg["name"], cfg.get("validator_address"), ingestor, key_prefix=f"{cfg['name']}:",
+                           proposer_address=cfg.get("proposer_address"))
+        ingestor.start_stream()
+        node.register(scheduler)
+        fleet_nodes.append(node)
+    scheduler.register("epoch", get_epoch_details, *COLLECTOR_SCHEDULE["epoch"])
+    scheduler.register("perf", perf.snapshot, *COLLECTOR_SCHEDULE["perf"])
+    restore_state(fleet_nodes)
+    save_state_on_exit(fleet_nodes)
+    scheduler.start()
+
+    if METRICS_PORT:
+        start_metrics_server(MetricsExporter(snapshot))
+    TelegramCommandHandler().start()
+    install_profile_signal()
+
+    alert_cooldowns.setdefault("report", time.time())
+    last_state_marker = state_marker()
+    while True:
+        tick_started = time.monotonic()
+        reload_config()
+        firings = evaluate_alert_rules(fleet_nodes)
+        for node in fleet_nodes:
+            alerts = node.check(snapshot)
+            node_firings = [f for f in firings if f.key.partition("@")[2] == node.name]
+            for text, channel in format_rule_alerts(node_firings):
+                if channel == "all":
+                    alerts.append(text)
+                else:
+                    send_alert(f"🛰️ *{node.name}*\n\n{text}", channel)
+            if alerts:
+                # One message per node per tick, however many checks fired
+                send_alert(f"🛰️ *{node.name}*\n\n" + "\n\n".join(alerts))
+
+        if time.time() - alert_cooldowns["report"] > AUTO_REPORT_INTERVAL:
+            send_message(TELEGRAM_CHAT_ID, "⏰ *AUTOMATIC REPORT*\n\n" + create_fleet_status_message())
+            alert_cooldowns["report"] = time.time()
+        marker = state_marker()
+        persist_state(fleet_nodes, urgent=marker != last_state_marker)
+        last_state_marker = marker
+        time.sleep(finish_tick(tick_started))
+
+# --- PROMETHEUS / OPENMETRICS EXPORTER ---
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def format_labels(labels):
+    """`{k="v",...}` with backslashes, quotes and newlines escaped, or "" without labels."""
+    if not labels:
+        return ""
+    escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+class MetricsExporter:
+    """Renders the snapshot as OpenMetrics text.
+
+    Scrapes never collect anything: the body is rendered from the snapshot and
+    cached until the snapshot version changes, so concurrent scrapers mostly
+    get a ready-made byte string.
+    """
+
+    def __init__(self, snapshot, prefix="monad_watchdog"):
+        self.snapshot = snapshot
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._cached_version = -1
+        self._cached_body = b""
+
+    def body(self):
+        version = self.snapshot.version
+        if version == self._cached_version:
+            return self._cached_body
+        with self._lock:
+            if version != self._cached_version:
+                self._cached_body = self.render().encode()
+                self._cached_version = version
+            return self._cached_body
+
+    def render(self):
+        _, data = self.snapshot.read()
+        out = []
+
+        def metric(name, help_text, samples, kind="gauge"):
+            samples = [(labels, value) for labels, value in samples if value is not None]
+            if not samples:
+                return
+            full = f"{self.prefix}_{name}"
+            out.append(f"# TYPE {full} {kind}")
+            out.append(f"# HELP {full} {help_text}")
+            suffix = "_total" if kind == "counter" else ""
+            for labels, value in samples:
+                out.append(f"{full}{suffix}{format_labels(labels)} {float(value)}")
+
+        # (labels, snapshot key prefix) per node; fleet nodes get a `node` label
+        nodes = [({"node": node.name}, node.key_prefix) for node in fleet_nodes] or [({}, "")]
+        blocks = [(labels, data.get(f"{prefix}block")) for labels, prefix in nodes]
+        blocks = [(labels, block) for labels, block in blocks if block]
+        up = [(labels, block) for labels, block in blocks if block[0] is not None]
+        metric("block_height", "Latest local block height.", [(l, b[0]) for l, b in up])
+        metric("block_time_seconds", "Average block time over the sliding window.", [(l, b[4] / 1000) for l, b in up])
+        metric("tps", "Transactions per second over the sliding window.", [(l, b[1]) for l, b in up])
+        metric("gas_per_second", "Gas used per second over the sliding window.", [(l, b[2]) for l, b in up])
+        metric("base_fee_gwei", "Base fee of the latest block in gwei.", [(l, b[3]) for l, b in up])
+        metric("rpc_up", "Whether the local node RPC answered the last poll.", [(l, 1 if b[0] is not None else 0) for l, b in blocks])
+
+        system = data.get("system")
+        if system:
+            cpu, ram, disk_percent = system[:3]
+            metric("cpu_percent", "System-wide CPU usage.", [({}, cpu)])
+            metric("ram_percent", "System-wide memory usage.", [({}, ram)])
+            metric("disk_percent", "Root filesystem usage.", [({}, disk_percent)])
+
+        disk_io = data.get("disk_io")
+        if disk_io:
+            metric("disk_read_bytes_per_second", "Aggregate disk read throughput.", [({}, disk_io["read_mbs"] * 1024 * 1024)])
+            metric("disk_write_bytes_per_second", "Aggregate disk write throughput.", [({}, disk_io["write_mbs"] * 1024 * 1024)])
+
+        diskstats = data.get("diskstats")
+        if diskstats:
+            roles = diskstats["roles"]
+            devices = sorted(diskstats["devices"].items())
+            labels = lambda name, **extra: {"device": name, "role": disk_role_label(name, roles), **extra}
+            metric("disk_iops", "Completed I/O operations per second per disk.",
+                   [(labels(n, op="read"), d["r_iops"]) for n, d in devices] + [(labels(n, op="write"), d["w_iops"]) for n, d in devices])
+            metric("disk_throughput_bytes_per_second", "Throughput per disk.",
+                   [(labels(n, op="read"), d["read_mbs"] * 1024 * 1024) for n, d in devices] + [(labels(n, op="write"), d["write_mbs"] * 1024 * 1024) for n, d in devices])
+            metric("disk_await_seconds", "Average time per completed I/O, including queueing.",
+                   [(labels(n, op="read"), d["r_await_ms"] and d["r_await_ms"] / 1000) for n, d in devices] + [(labels(n, op="write"), d["w_await_ms"] and d["w_await_ms"] / 1000) for n, d in devices])
+            metric("disk_utilization_ratio", "Fraction of time the disk had I/O in flight.", [(labels(n), d["util"] / 100) for n, d in devices])
+            metric("disk_queue_depth", "Average number of queued and in-flight requests.", [(labels(n), d["queue"]) for n, d in devices])
+            metric("disk_in_flight", "Requests in flight at the last read.", [(labels(n), d["in_flight"]) for n, d in devices])
+
+        processes = data.get("processes")
+        if processes is not None:
+            procs = sorted(processes.items())
+            metric("process_up", "1 when the Monad daemon is running.",
+                   [({"process": name}, 1 if name in processes else 0) for name in process_tracker.started])
+            metric("process_cpu_percent", "CPU used by the process (100 = one core).", [({"process": n}, st["cpu"]) for n, st in procs])
+            metric("process_resident_memory_bytes", "Resident set size.", [({"process": n}, st["rss"]) for n, st in procs])
+            metric("process_pss_bytes", "Proportional set size.", [({"process": n}, st["pss"]) for n, st in procs])
+            metric("process_open_fds", "Open file descriptors.", [({"process": n}, st["fds"]) for n, st in procs])
+            metric("process_threads", "Number of threads.", [({"process": n}, st["threads"]) for n, st in procs])
+            metric("process_context_switches_per_second", "Voluntary and involuntary context switches.", [({"process": n}, st["ctx_per_sec"]) for n, st in procs])
+            metric("process_io_bytes_per_second", "Storage I/O issued by the process.",
+                   [({"process": n, "op": "read"}, st["read_bps"]) for n, st in procs] + [({"process": n, "op": "write"}, st["write_bps"]) for n, st in procs])
+            metric("process_restarts", "Restarts seen since the watchdog started.", [({"process": n}, count) for n, count in sorted(process_tracker.restarts.items())], kind="counter")
+
+        nvme = data.get("nvme")
+        if nvme:
+            metric("nvme_wear_percent", "NVMe percentage used (SMART).", [({"device": d}, wear) for d, wear, _ in nvme])
+            metric("nvme_temperature_celsius", "NVMe composite temperature.", [({"device": d}, temp) for d, _, temp in nvme])
+
+        probe = data.get("rpc_probe")
+        if probe:
+            methods = sorted((m, st) for m, st in probe["methods"].items() if m != "all")
+            if methods:
+                full = f"{self.prefix}_rpc_probe_latency_seconds"
+                out.append(f"# TYPE {full} histogram")
+                out.append(f"# HELP {full} Latency of the RPC probe calls against the local node.")
+                for method, st in methods:
+                    for bound, count in st["total"]["buckets"]:
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        out.append(f'{full}_bucket{{method="{method}",le="{le}"}} {count}')
+                    out.append(f'{full}_sum{{method="{method}"}} {st["total"]["sum"]}')
+                    out.append(f'{full}_count{{method="{method}"}} {st["total"]["count"]}')
+            metric("rpc_probe_recent_latency_seconds", f"RPC probe latency quantiles over the last {RPC_PROBE_WINDOW}s.",
+                   [({"method": m, "quantile": q}, st[f"p{q[2:]}_ms"] / 1000) for m, st in methods for q in ("0.50", "0.95", "0.99")])
+            metric("rpc_probe_error_percent", "Share of the last 100 probe calls that failed.", [({}, probe["error_pct"])])
+            metric("rpc_probe_problems", "Correctness checks that failed in the last probe round.", [({}, len(probe["problems"]))])
+            metric("rpc_reference_lag_blocks", "Blocks the local head is behind the highest reference RPC.", [({}, probe["lag_blocks"])])
+
+        network = data.get("network")
+        if network:
+            interfaces = sorted(network["interfaces"].items())
+            metric("network_bytes_per_second", "Throughput per interface.",
+                   [({"interface": n, "direction": "rx"}, i["rx_mbs"] * 1024 * 1024) for n, i in interfaces]
+                   + [({"interface": n, "direction": "tx"}, i["tx_mbs"] * 1024 * 1024) for n, i in interfaces])
+            metric("network_packets_per_second", "Packets per second per interface.",
+                   [({"interface": n, "direction": "rx"}, i["rx_pps"]) for n, i in interfaces]
+                   + [({"interface": n, "direction": "tx"}, i["tx_pps"]) for n, i in interfaces])
+            metric("network_drops_per_second", "Dropped packets per second per interface.", [({"interface": n}, i["drops_per_sec"]) for n, i in interfaces])
+            metric("network_errors_per_second", "Errored packets per second per interface.", [({"interface": n}, i["errors_per_sec"]) for n, i in interfaces])
+            tcp, udp = network["tcp"], network["udp"]
+            if tcp:
+                metric("tcp_retransmit_percent", "Retransmitted share of sent TCP segments.", [({}, tcp["retrans_pct"])])
+                metric("tcp_resets_per_second", "Established TCP connections reset per second.", [({}, tcp["resets_per_sec"])])
+                metric("udp_receive_buffer_errors_per_second", "UDP datagrams dropped because the socket buffer was full.", [({}, udp["rcvbuf_errors_per_sec"])])
+            metric("tcp_sockets", "TCP sockets by state.", [({"state": state}, n) for state, n in sorted(network["sockets"].items())])
+            metric("peers", "Peers reported by the node.", [({}, network["peers"])])
+
+        monad = data.get("monad_status")
+        if monad:
+            metric("triedb_used_percent", "TrieDB usage reported by monad-status.", [({}, monad.get("triedb_percent"))])
+            metric("in_sync", "1 when the node reports it is in sync.", [({}, 1 if monad.get("sync_status") == "in-sync" else 0)])
+            rnd = monad.get("round")
+            if isinstance(rnd, str) and rnd.isdigit():
+                metric("consensus_round", "Current consensus round.", [({}, int(rnd))])
+
+        vals = [(labels, data.get(f"{prefix}validator_api")) for labels, prefix in nodes if f"{prefix}validator_api" in data]
+        metric("huginn_up", "Whether the last Huginn API read succeeded.", [(l, 0 if v is None else 1) for l, v in vals])
+        vals = [(labels, val) for labels, val in vals if val]
+        metric("huginn_stake_mon", "Validator stake reported by Huginn.", [(l, v.get("stake")) for l, v in vals])
+        metric("huginn_rewards_mon", "Unclaimed rewards reported by Huginn.", [(l, v.get("rewards")) for l, v in vals])
+        metric("huginn_uptime_percent", "Validator uptime reported by Huginn.", [(l, v.get("uptime_pct")) for l, v in vals])
+        metric("huginn_timeouts", "Timeout count reported by Huginn.", [(l, v.get("timeout_count")) for l, v in vals])
+        metric("huginn_jailed", "1 when Huginn reports the validator as jailed.", [(l, 1 if v.get("is_jailed") else 0) for l, v in vals])
+        metric("huginn_block_height", "Latest block height seen by Huginn.", [(l, v.get("api_block_height")) for l, v in vals])
+
+        node_of = {node.proposer_address.lower(): node.name for node in fleet_nodes if node.proposer_address}
+        proposals = [(address, proposal_tracker.summary(address)) for address in sorted(proposal_tracker.tracked)]
+        proposals = [({"address": address, **({"node": node_of[address]} if address in node_of else {})}, st)
+                     for address, st in proposals if st]
+        metric("epoch_proposals", "Blocks proposed in the current epoch, counted from local headers.", [(l, st["proposed"]) for l, st in proposals])
+        metric("epoch_proposal_share", "Share of the current epoch's blocks we proposed.", [(l, st["share"]) for l, st in proposals])
+        metric("blocks_since_proposal", "Blocks since our last proposal.", [(l, st["blocks_since_last"]) for l, st in proposals])
+        metric("epoch_blocks_seen", "Blocks of the current epoch ingested locally.", [({}, proposals[0][1]["blocks"])] if proposals else [])
+
+        logs = data.get("logs")
+        if logs:
+            metric("missed_blocks", "Consecutive missed blocks seen in the monad-bft journal.", [({}, logs["missed_blocks"])])
+            metric("log_lines", "Journal lines processed.", [({}, logs["total_lines"])], kind="counter")
+            metric("log_lines_per_second", "Journal reader throughput.", [({}, logs["lines_per_sec"])])
+            metric("log_lag_seconds", "Age of the newest journal entry when it was processed.", [({}, logs.get("lag_seconds"))])
+            metric("log_replay_skipped", "Journal entries from before the reader started that were not counted.",
+                   [({}, logs.get("replay_skipped", 0))], kind="counter")
+
+        perf_stats = data.get("perf")
+        if perf_stats:
+            histograms = sorted(perf_stats["histograms"].items())
+            if histograms:
+                full = f"{self.prefix}_latency_seconds"
+                out.append(f"# TYPE {full} histogram")
+                out.append(f"# HELP {full} Latency of the watchdog's own collectors, outbound calls and main loop.")
+                for (kind, name), h in histograms:
+                    labels = {"kind": kind, "name": name}
+                    for bound, count in h["buckets"]:
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        out.append(f"{full}_bucket{format_labels({**labels, 'le': le})} {count}")
+                    out.append(f"{full}_sum{format_labels(labels)} {h['sum']}")
+                    out.append(f"{full}_count{format_labels(labels)} {h['count']}")
+            counters = perf_stats["counters"]
+            metric("loop_overruns", "Main-loop ticks that took longer than CHECK_INTERVAL.", [({}, counters.get("loop_overruns", 0))], kind="counter")
+            metric("collector_timeouts", "Collector runs abandoned at their deadline.", [({}, counters.get("collector_timeouts", 0))], kind="counter")
+
+        metric("alert_active", "1 for every alert rule instance currently raised.",
+               [({"rule": rule.name, "metric": key, "severity": rule.severity}, 1) for rule, key, _ in alert_rules.active()])
+        metric("snapshot_version", "Snapshot version the metrics were rendered from.", [({}, self.snapshot.version)])
+        out.append("# EOF")
+        return "\n".join(out) + "\n"
+
+def start_metrics_server(exporter, port=METRICS_PORT, bind=METRICS_BIND):
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = exporter.body()
+            if "application/openmetrics-text" in self.headers.get("Accept", ""):
+                content_type = OPENMETRICS_CONTENT_TYPE
+            else:
+                # The classic text format has no EOF marker
+                content_type = PROMETHEUS_CONTENT_TYPE
+                body = body[:-len(b"# EOF\n")]
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((bind, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📊 [INFO] Metrics exporter listening on {bind}:{server.server_port}/metrics")
+    return server
+
+# --- TELEGRAM COMMAND HANDLER ---
+class TelegramCommandHandler:
+    """Answers Telegram commands on its own thread, from the snapshot only.
+
+    Updates arrive by long polling getUpdates, or through a local webhook
+    receiver when TELEGRAM_WEBHOOK_URL is set. No command triggers a
+    collection, so replies are immediate and the monitoring loop is untouched.
+    """
+
+    def __init__(self):
+        import requests
+        self.session = requests.Session()
+        self.webhook_secret = os.urandom(16).hex()
+        self.commands = {
+            "/start": self.cmd_start,
+            "/status": self.cmd_status,
+            "/history": self.cmd_history,
+            "/alerts": self.cmd_alerts,
+            "/perf": self.cmd_perf,
+            "/profile": self.cmd_profile,
+            "/rules": self.cmd_rules,
+        }
+
+    # --- COMMANDS ---
+    def cmd_start(self, args):
+        return "👋 Hello! Type */status* for detailed metrics.\nOther commands: */history* `[1h|24h|7d]`, */alerts*, */rules*, */perf*, */profile* `[seconds]`"
+
+    def cmd_status(self, args):
+        if fleet_nodes:
+            return create_fleet_status_message()
+        block = snapshot.get("block")
+        system = snapshot.get("system")
+        if block is None or system is None:
+            return "🔄 Collectors are still warming up, try again in a few seconds."
+        local_height, tps, gas_sec, base_fee, block_time_ms = block
+        cpu, ram, disk_percent, disk_str, disk_io_str, temp_str, nvme_str = system
+        monad_details = snapshot.get("monad_status") or {}
+        val_data = snapshot.get("validator_api")
+        return create_status_message(local_height, tps, gas_sec, base_fee, block_time_ms, cpu, ram, disk_str, disk_io_str, temp_str, nvme_str, monad_details, val_data)
+
+    def cmd_history(self, args):
+        windows = {"1h": 3600, "24h": 86400, "7d": 7 * 86400}
+        window = windows.get(args[0] if args else "1h")
+        if window is None:
+            return "Usage: */history* `[1h|24h|7d]`"
+        return get_history_section(window) or "📊 No history recorded yet."
+
+    def cmd_alerts(self, args):
+        if not alert_dispatcher.history:
+            return "✅ No alerts since the watchdog started."
+        lines = ["**🔔 Recent Alerts**"]
+        for sent_at, text in reversed(alert_dispatcher.history):
+            stamp = datetime.datetime.fromtimestamp(sent_at).strftime('%m-%d %H:%M:%S')
+            first_line = text.strip().split("\n")[0]
+            lines.append(f"`{stamp}` {first_line}")
+        return "\n".join(lines)
+
+    def cmd_rules(self, args):
+        active = alert_rules.active()
+        severity_emoji = {"info": "🔵", "warning": "🟡", "critical": "🔴"}
+        lines = [f"**📐 Alert Rules** ({len(alert_rules.rules)} loaded, {len(active)} firing)"]
+        for rule, key, value in active:
+            lines.append(f"{severity_emoji[rule.severity]} `{rule.name}` on `{key}`: `{value}` {rule.op} `{rule.threshold}`")
+        if not active:
+            lines.append("✅ Nothing is firing.")
+        return "\n".join(lines)
+
+    def cmd_perf(self, args):
+        import psutil
+        now = time.time()
+        lines = ["**⚙️ Watchdog Performance**"]
+        for key, updated in sorted(snapshot.updated_at.items()):
+            lines.append(f"• `{key}` updated `{now - updated:.1f}s` ago")
+        stats = perf.snapshot()
+        titles = {"collector": "⏱️ *Collectors*", "outbound": "🌐 *Outbound Calls*", "alert_delivery": "📨 *Alert Delivery*", "loop": "🔁 *Main Loop*"}
+        for kind, title in titles.items():
+            rows = sorted((name, h) for (k, name), h in stats["histograms"].items() if k == kind)
+            if rows:
+                lines.append(f"\n{title} (p50 / p99 / max)")
+            for name, h in rows:
+                lines.append(f"• `{name}`: `{h['p50'] * 1000:.1f}` / `{h['p99'] * 1000:.1f}` / `{h['max'] * 1000:.1f}` ms ({h['count']:,})")
+        counters = stats["counters"]
+        lines.append(f"⚠️ *Loop overruns:* `{counters.get('loop_overruns', 0)}` | *Collector timeouts:* `{counters.get('collector_timeouts', 0)}`")
+        logs = snapshot.get("logs")
+        if logs:
+            lag = logs.get("lag_seconds")
+            lag_str = f"`{lag:.1f}s` behind" if lag is not None else "no entries yet"
+            lines.append(f"🥷 *Log Reader:* `{logs['lines_per_sec']:.0f}` lines/s | `{logs['total_lines']:,}` total | {lag_str}")
+        for channel in alert_dispatcher.channels():
+            st = channel.stats()
+            lines.append(f"📨 *{channel.name}:* sent `{st['sent']}` | queued `{st['queued']}` | suppressed `{st['suppressed']}` | failed `{st['failed']}`")
+        lines.append(f"🌐 *Huginn requests:* `{huginn.request_count}`")
+        lines.append(f"🧮 *Watchdog RSS:* `{format_bytes(psutil.Process().memory_info().rss)}`")
+        return "\n".join(lines)
+
+    def cmd_profile(self, args):
+        if not PROFILER_ENABLED:
+            return "🔬 Profiling is disabled. Set `PROFILER_ENABLED = True` to allow it."
+        try:
+            seconds = min(max(int(args[0]), 1), 300) if args else PROFILE_SECONDS
+        except ValueError:
+            return "Usage: */profile* `[seconds]`"
+        if start_profile(seconds, chat_id=TELEGRAM_CHAT_ID) is None:
+            return "🔬 A profile is already running."
+        return f"🔬 Sampling every thread at {PROFILE_HZ} Hz for `{seconds}s`..."
+
+    # --- UPDATE HANDLING ---
+    def handle_update(self, update):
+        message = update.get("message") or {}
+        text = message.get("text")
+        chat_id = message.get("chat", {}).get("id")
+        if not text or str(chat_id) != str(TELEGRAM_CHAT_ID):
+            return
+        parts = text.split()
+        command = parts[0].split("@")[0]
+        handler = self.commands.get(command)
+        if handler:
+            try:
+                send_message(chat_id, handler(parts[1:]))
+            except Exception as e:
+                print(f"⚠️ [COMMAND] {command} failed: {e}")
+
+    def poll_forever(self):
+        global last_update_id
+        url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/getUpdates"
+        self.session.post(f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/deleteWebhook", timeout=10)
+        backoff = 1
+        while True:
+            params = {"timeout": TELEGRAM_LONG_POLL_TIMEOUT, "allowed_updates": '["message"]'}
+            if last_update_id:
+                params["offset"] = last_update_id + 1
+            try:
+                response = self.session.get(url, params=params, timeout=TELEGRAM_LONG_POLL_TIMEOUT + 10)
+                data = response.json()
+                if not data.get("ok"):
+                    raise ValueError(data.get("description", "getUpdates failed"))
+                backoff = 1
+                for update in data.get("result", []):
+                    last_update_id = update["update_id"]
+                    self.handle_update(update)
+            except Exception as e:
+                print(f"⚠️ [COMMAND] getUpdates failed: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def serve_webhook(self):
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        handler_self = self
+
+        class WebhookHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.headers.get("X-Telegram-Bot-Api-Secret-Token") != handler_self.webhook_secret:
+                    self.send_error(403)
+                    return
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.send_response(200)
+                self.end_headers()
+                try:
+                    handler_self.handle_update(json.loads(body))
+                except ValueError:
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("0.0.0.0", TELEGRAM_WEBHOOK_PORT), WebhookHandler)
+        server.daemon_threads = True
+        self.session.post(f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/setWebhook", timeout=10, data={
+            "url": TELEGRAM_WEBHOOK_URL,
+            "secret_token": self.webhook_secret,
+            "allowed_updates": '["message"]',
+        })
+        print(f"📬 [INFO] Telegram webhook receiver listening on port {TELEGRAM_WEBHOOK_PORT}")
+        server.serve_forever()
+
+    def run(self):
+        while True:
+            try:
+                if TELEGRAM_WEBHOOK_URL:
+                    self.serve_webhook()
+                else:
+                    self.poll_forever()
+            except Exception as e:
+                print(f"⚠️ [COMMAND] Command handler crashed: {e}")
+                time.sleep(5)
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+state_store = StateStore(STATE_FILE, STATE_SAVE_INTERVAL, STATE_VOLATILE_SAVE_INTERVAL)
+
+def collect_state(nodes):
+    """Alert state; a change is on disk within STATE_SAVE_INTERVAL."""
+    return {
+        "initial_rewards": initial_rewards,
+        "last_update_id": last_update_id,
+        "cooldowns": dict(alert_cooldowns),
+        "rules": alert_rules.to_state(),
+        "nodes": {node.name: node.to_state() for node in nodes},
+        "logs": log_engine.to_state(),
+        "processes": process_tracker.to_state(),
+    }
+
+def collect_volatile_state(nodes):
+    """Baselines that move every tick or block; they ride along with the writes of collect_state()."""
+    return {
+        "node_heights": {node.name: node.volatile_state() for node in nodes},
+        "disks": disk_stats.to_state(),
+        "proposals": proposal_tracker.to_state(),
+    }
+
+def restore_state(nodes):
+    """Loads the state file saved by a previous run. Returns True if anything was restored."""
+    global initial_rewards, last_update_id
+    state = state_store.load()
+    if not state:
+        return False
     try:
-        response = requests.get(url, params=params, timeout=5)
-        data = response.json()
-        if not data.get("ok"): return
-
-        for result in data.get("result", []):
-            last_update_id = result["update_id"]
-            if "message" in result and "text" in result["message"]:
-                text = result["message"]["text"]
-                chat_id = result["message"]["chat"]["id"]
-                
-                if str(chat_id) == str(TELEGRAM_CHAT_ID):
-                    if text == "/start":
-                        send_message(chat_id, "👋 Hello! Type */status* for detailed metrics.")
-                    elif text == "/status":
-                        send_message(chat_id, "🔄 Fetching dashboard...")
-                        local_height, tps, gas_sec, base_fee, block_time_ms = get_eth_block_details()
-                        cpu, ram, disk_percent, disk_str, disk_io_str, temp_str, nvme_str = get_system_health()
-                        monad_details = get_monad_status_details()
-                        val_data = get_validator_api_details()
-                        
-                        msg = create_status_message(local_height, tps, gas_sec, base_fee, block_time_ms, cpu, ram, disk_str, disk_io_str, temp_str, nvme_str, monad_details, val_data)
-                        send_message(chat_id, msg)
-    except Exception:
-        pass
+        initial_rewards = state.get("initial_rewards")
+        last_update_id = state.get("last_update_id")
+        alert_cooldowns.update(state.get("cooldowns", {}))
+        alert_rules.load_state(state.get("rules", {}))
+        saved_nodes = state.get("nodes", {})
+        saved_heights = state.get("node_heights", {})
+        for node in nodes:
+            node.load_state({**saved_nodes.get(node.name, {}), **saved_heights.get(node.name, {})})
+        if state.get("logs"):
+            log_engine.load_state(state["logs"])
+        if state.get("disks"):
+            disk_stats.load_state(state["disks"])
+        if state.get("processes"):
+            process_tracker.load_state(state["processes"])
+        if state.get("proposals"):
+            proposal_tracker.load_state(state["proposals"])
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        print(f"⚠️ [STATE] Ignoring unreadable state file: {e}")
+        return False
+    print(f"♻️ [INFO] Restored alert state from {state_store.path}")
+    return True
+
+def state_marker():
+    """Changes whenever an alert, report or command offset must be on disk before the next tick."""
+    last_alert = alert_dispatcher.history[-1][0] if alert_dispatcher.history else None
+    return last_update_id, last_alert, tuple(sorted(alert_cooldowns.items()))
+
+def persist_state(nodes, urgent=False):
+    try:
+        state_store.save(collect_state(nodes), urgent, volatile=lambda: collect_volatile_state(nodes))
+    except OSError as e:
+        print(f"⚠️ [STATE] Cannot persist state: {e}")
+
+def save_state_on_exit(nodes):
+    """Writes the state, volatile baselines included, one last time when the process exits.
+
+    SIGTERM (systemctl stop) is turned into a normal exit so the save runs.
+    """
+    atexit.register(persist_state, nodes, urgent=True)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
 
 def main():
-    global missed_block_counter, initial_rewards
+    global initial_rewards
+    
+    if FLEET_NODES:
+        run_fleet()
+        return
     
     print("🚀 [INFO] Monad Ultimate Validator Watchdog started...")
-    init_data = get_validator_api_details()
-    if init_data and init_data.get('rewards'):
-        initial_rewards = init_data["rewards"]
+    local_node = NodeMonitor(VALIDATOR_MONIKER, VALIDATOR_ADDRESS, block_ingestor, proposer_address=PROPOSER_ADDRESS)
+    # A warm restart already knows the stake and session rewards, so skip the blocking fetch
+    if not restore_state([local_node]) or (VALIDATOR_ADDRESS and local_node.last_stake is None):
+        init_data = get_validator_api_details()
+        if init_data and init_data.get('rewards') and initial_rewards is None:
+            initial_rewards = init_data["rewards"]
+        local_node.last_stake = init_data.get("stake") if init_data else None
+    save_state_on_exit([local_node])
         
     log_thread = threading.Thread(target=monitor_logs, daemon=True)
     log_thread.start()
     
-    last_height = 0
-    stuck_counter = 0
-    last_report_time = time.time()
-    last_hardware_alert_time = 0 
-    last_tps_alert_time = 0 
-    last_gas_alert_time = 0
-    last_fee_alert_time = 0
+    block_ingestor.start_stream()
+    
+    scheduler = CollectorScheduler(snapshot)
+    scheduler.register("block", get_eth_block_details, *COLLECTOR_SCHEDULE["block"], fallback=(None, 0, 0, 0.0, 0.0))
+    scheduler.register("system", get_system_health, *COLLECTOR_SCHEDULE["system"])
+    scheduler.register("processes", process_tracker.collect, *COLLECTOR_SCHEDULE["processes"])
+    scheduler.register("network", get_network_details, *COLLECTOR_SCHEDULE["network"])
+    scheduler.register("rpc_probe", rpc_probe.collect, *COLLECTOR_SCHEDULE["rpc_probe"])
+    scheduler.register("monad_status", get_monad_status_details, *COLLECTOR_SCHEDULE["monad_status"],
+                       fallback={"triedb_percent": None, "triedb_str": "N/A", "sync_status": "Unknown", "epoch": "N/A", "round": "N/A"})
+    scheduler.register("validator_api", get_validator_api_details, *COLLECTOR_SCHEDULE["validator_api"])
+    scheduler.register("logs", log_engine.stats, *COLLECTOR_SCHEDULE["logs"])
+    scheduler.register("epoch", get_epoch_details, *COLLECTOR_SCHEDULE["epoch"])
+    if (HEARTBEAT_UDP_ADDR and HEARTBEAT_SECRET) or WATCHDOG_SERVER_IP:
+        heartbeat_emitter = HeartbeatEmitter()
+        scheduler.register("heartbeat", heartbeat_emitter.emit, *COLLECTOR_SCHEDULE["heartbeat"])
+    scheduler.register("perf", perf.snapshot, *COLLECTOR_SCHEDULE["perf"])
+    scheduler.start()
+    
+    if METRICS_PORT:
+        start_metrics_server(MetricsExporter(snapshot))
     
-    # --- ALARM TRACKING VARIABLES ---
-    last_api_lag_alert_time = 0
-    api_down_alerted = False
-    last_stake = init_data.get("stake") if init_data else None
+    TelegramCommandHandler().start()
+    install_profile_signal()
+    
+    alert_cooldowns.setdefault("report", time.time())
+    last_state_marker = state_marker()
+    last_anomaly_save = time.time()
+    last_anomaly_height = None
+    last_anomaly_probe_version = 0
+    if ANOMALY_DETECTION:
+        anomaly_monitor.load()
     
     while True:
-        check_updates()
-                
-        current_height, current_tps, current_gas_sec, current_base_fee, current_block_time_ms = get_eth_block_details()
-        cpu, ram, disk_percent, disk_str, disk_io_str, temp_str, nvme_str = get_system_health()
-        monad_details = get_monad_status_details()
-        triedb_percent = monad_details.get("triedb_percent")
-        val_api_data = get_validator_api_details()
+        tick_started = time.monotonic()
+        # Each check only needs its own collector: a slow psutil or NVMe read must not hold up the block checks
+        block = snapshot.get("block")
+        system = snapshot.get("system")
+        current_height, current_tps, current_gas_sec, current_base_fee, current_block_time_ms = block or (None, 0, 0, 0.0, 0.0)
+        cpu, ram, disk_percent, disk_str, disk_io_str, temp_str, nvme_str = system or (None,) * 7
+        monad_details = snapshot.get("monad_status") or {}
+        val_api_data = snapshot.get("validator_api")
         
-        # --- HUGINN API SILENCE & LAG PROTECTION ---
-        if val_api_data is None:
-            if not api_down_alerted:
-                send_alert("⚠️ **API SILENCE WARNING** ⚠️\nHuginn API is unreachable! The bot cannot track delegation (stake) changes right now (Blind spot).")
-                api_down_alerted = True
-        else:
-            if api_down_alerted:
-                send_alert("✅ Huginn API connection restored. Monitoring is active.")
-                api_down_alerted = False
-            
-            # API Lag Detection
-            if current_height is not None and val_api_data.get("api_block_height") is not None:
-                api_height = val_api_data["api_block_height"]
-                lag = current_height - api_height
-                if lag > API_LAG_THRESHOLD:
-                    if time.time() - last_api_lag_alert_time > 3600:  # Alert once per hour
-                        send_alert(f"⏳ **HUGINN API LAG WARNING** ⏳\nHuginn API is lagging `{lag:,}` blocks behind your local node!\nDelegation and reward metrics might not be up-to-date right now.")
-                        last_api_lag_alert_time = time.time()
+        for alert in local_node.check(snapshot):
+            send_alert(alert)
+        if initial_rewards is None:
+            initial_rewards = local_node.initial_rewards
 
-            # --- STAKE ALERTS ---
-            if "stake" in val_api_data:
-                current_stake = val_api_data["stake"]
-                if last_stake is not None:
-                    if current_stake < last_stake:
-                        dropped_amount = last_stake - current_stake
-                        send_alert(f"⚠️ **STAKE DROP ALERT** ⚠️\n`{dropped_amount:,.2f} MON` was unstaked from your validator!\nCurrent Stake: `{current_stake:,.2f} MON`")
-                    elif current_stake > last_stake:
-                        gained_amount = current_stake - last_stake
-                        send_alert(f"🎉 **STAKE INCREASE ALERT** 🎉\n`{gained_amount:,.2f} MON` was delegated to your validator!\nCurrent Stake: `{current_stake:,.2f} MON`")
-                last_stake = current_stake
-        
-        if val_api_data and val_api_data.get("is_jailed"):
-            send_alert("🚨 *CRITICAL ALERT* 🚨\n\nYour validator has been **JAILED (Slashed)**! Immediate action required!")
-            time.sleep(60) 
-
-        if missed_block_counter >= ALERT_TIMEOUT_THRESHOLD:
-            send_alert(f"🚨 **VALIDATOR ALERT** 🚨\nMissed `{missed_block_counter}` consecutive blocks locally!")
-            missed_block_counter = 0  
-            time.sleep(10) 
-
-        if time.time() - last_hardware_alert_time > 300: 
-            alert_msg = ""
-            if cpu > ALERT_CPU_THRESHOLD: alert_msg += f"⚠️ *HIGH CPU:* `{cpu}%`\n"
-            if ram > ALERT_RAM_THRESHOLD: alert_msg += f"⚠️ *HIGH RAM:* `{ram}%`\n"
-            if disk_percent > ALERT_DISK_THRESHOLD: alert_msg += f"💽 *OS DISK:* `{disk_percent}%`\n"
-            if triedb_percent is not None and triedb_percent > ALERT_DISK_THRESHOLD: 
-                alert_msg += f"🗄️💽 *TRIEDB:* `{triedb_percent}%`\n"
-            
-            if "🔴" in nvme_str:
-                 alert_msg += f"🔥 **NVME WEAR CRITICAL!** A disk has exceeded 100% wear! Ticking Time Bomb! 💣\n"
-                 
-            if alert_msg:
-                send_alert(f"🚨 **SYSTEM RESOURCE WARNING** 🚨\n\n{alert_msg}")
-                last_hardware_alert_time = time.time()
-
-        if current_gas_sec >= ALERT_GAS_SEC_THRESHOLD and time.time() - last_gas_alert_time > 300:
-            send_alert(f"🔥 **HEAVY EXECUTION ALERT** 🔥\nNetwork burning `{current_gas_sec / 1_000_000:.1f}M` Gas/sec!")
-            last_gas_alert_time = time.time()
-    
-        if current_base_fee >= ALERT_BASE_FEE_THRESHOLD and time.time() - last_fee_alert_time > 300:
-            send_alert(f"💸 **BASE FEE SPIKE DETECTED** 💸\nFees skyrocketed to `{current_base_fee:.2f} gwei`!")
-            last_fee_alert_time = time.time()
+        if ANOMALY_DETECTION:
+            samples = {"cpu": cpu, "ram": ram}  # None (skipped) until the system collector reports
+            # Only feed block metrics when a new block arrived, so a stall does not look like a steady baseline
+            # (the block collector republishes every run, so its snapshot version changes during a stall too)
+            if current_height is not None and current_height != last_anomaly_height:
+                last_anomaly_height = current_height
+                samples.update({"gas_per_sec": current_gas_sec, "base_fee": current_base_fee,
+                                "block_time_ms": current_block_time_ms or None})
+            # One RPC latency sample per probe round
+            if snapshot.version_of("rpc_probe") != last_anomaly_probe_version and snapshot.get("rpc_probe"):
+                last_anomaly_probe_version = snapshot.version_of("rpc_probe")
+                samples["rpc_p95_ms"] = snapshot.get("rpc_probe")["methods"].get("all", {}).get("p95_ms")
+            for alert in check_anomalies(samples):
+                send_alert(alert)
+            if time.time() - last_anomaly_save > ANOMALY_SAVE_INTERVAL:
+                try:
+                    anomaly_monitor.save()
+                except OSError as e:
+                    print(f"⚠️ [ANOMALY] Cannot persist baselines: {e}")
+                last_anomaly_save = time.time()
 
-        if current_tps >= ALERT_TPS_THRESHOLD:
-            if time.time() - last_tps_alert_time > 300:
-                send_alert(f"🚀 **HIGH TPS ALERT** 🚀\nNetwork reached estimated `{current_tps}` TPS!")
-                last_tps_alert_time = time.time()
+        # Keep counting between alerts instead of pausing the loop
+        if time.time() - alert_cooldowns["missed"] > 10:
+            missed_blocks = log_engine.consume_missed(ALERT_TIMEOUT_THRESHOLD)
+            if missed_blocks:
+                send_alert(f"🚨 **VALIDATOR ALERT** 🚨\nMissed `{missed_blocks}` consecutive blocks locally!")
+                alert_cooldowns["missed"] = time.time()
 
-        if current_height is not None:
-            if current_height != last_height:
-                stuck_counter = 0
-            else:
-                stuck_counter += 1
+        for event in process_tracker.drain_events():
+            send_alert(event)
 
-            if stuck_counter >= 90: 
-                send_alert(f"🛑 *ALERT: Node STUCK!*\nBlock: `{current_height}`\nNo new blocks for 3 minutes!")
-                stuck_counter = 0 
+        # Thresholds, hysteresis and cooldowns for everything else live in the alert rules
+        reload_config()
+        for text, channel in format_rule_alerts(evaluate_alert_rules([local_node])):
+            send_alert(text, channel)
 
-            if time.time() - last_report_time > AUTO_REPORT_INTERVAL:
+        if current_height is not None and system is not None:
+            if time.time() - alert_cooldowns["report"] > AUTO_REPORT_INTERVAL:
                 msg = create_status_message(current_height, current_tps, current_gas_sec, current_base_fee, current_block_time_ms, cpu, ram, disk_str, disk_io_str, temp_str, nvme_str, monad_details, val_api_data)
                 send_message(TELEGRAM_CHAT_ID, "⏰ *AUTOMATIC REPORT*\n\n" + msg)
-                last_report_time = time.time()
-            
-            last_height = current_height
+                alert_cooldowns["report"] = time.time()
             
-        time.sleep(CHECK_INTERVAL)
+        marker = state_marker()
+        persist_state([local_node], urgent=marker != last_state_marker)
+        last_state_marker = marker
+        time.sleep(finish_tick(tick_started))
+
+# --- ONE-SHOT PROBE ---
+def once_block():
+    height, tps, gas_per_sec, base_fee, block_time_ms = get_eth_block_details()
+    head_age = time.time() - block_ingestor.blocks[-1][1] if block_ingestor.blocks else None
+    return {"height": height, "head_age_seconds": head_age, "tps": tps, "gas_per_sec": gas_per_sec,
+            "base_fee_gwei": base_fee, "block_time_ms": block_time_ms}
+
+def once_system():
+    import psutil
+    # Rates need two readings; take the first now and the second after a short window
+    psutil.cpu_percent(interval=None)
+    disk_stats.collect()
+    time.sleep(ONCE_SAMPLE_SECONDS)
+    cpu, ram, disk_percent, _, _, _, _ = get_system_health()
+    diskstats = snapshot.get("diskstats") or {}
+    return {"cpu_percent": cpu, "ram_percent": ram, "disk_percent": disk_percent,
+            "disks": diskstats.get("devices"), "disk_roles": diskstats.get("roles"),
+            "nvme": [{"device": d, "wear_percent": wear, "temp_c": temp} for d, wear, temp in snapshot.get("nvme") or []]}
+
+def once_processes():
+    process_tracker.collect()
+    time.sleep(ONCE_SAMPLE_SECONDS)
+    return process_tracker.collect()
+
+def once_network():
+    net_stats.collect()
+    time.sleep(ONCE_SAMPLE_SECONDS)
+    return net_stats.collect()
+
+def once_logs():
+    cmd = ['journalctl', '-u', LOG_UNIT, '-n', str(ONCE_LOG_LINES), '-o', 'json', '--output-fields=MESSAGE', '--no-pager']
+    output = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=ONCE_DEADLINE, check=True).stdout
+    engine = LogEngine(cursor_file=None, max_age=None)
+    lines = output.splitlines()
+    engine.process_batch(lines)
+    return {"missed_blocks": engine.missed_blocks, "lines": len(lines), "lag_seconds": engine.lag_seconds}
+
+def once_validator_api():
+    data = get_validator_api_details()
+    if data is None:
+        raise ConnectionError("Huginn API returned no validator data")
+    return data
+
+def once_epoch():
+    epoch, progress, blocks_left = get_epoch_details()
+    return {"epoch": epoch, "progress": progress, "blocks_left": blocks_left}
+
+ONCE_FUNCTIONS = {
+    "block": once_block,
+    "system": once_system,
+    "monad_status": get_monad_status_details,
+    "processes": once_processes,
+    "network": once_network,
+    "rpc_probe": rpc_probe.collect,
+    "logs": once_logs,
+    "validator_api": once_validator_api,
+    "epoch": once_epoch,
+}
+
+def evaluate_once(results):
+    """Returns (critical, warning) problem lists for the collected data."""
+    critical, warning = [], []
+    data = {name: r["data"] for name, r in results.items() if r["ok"]}
+
+    block = data.get("block")
+    if block and block["height"] is None:
+        critical.append(f"node RPC {NODE_RPC_URL} is unreachable")
+    elif block and block["head_age_seconds"] is not None and block["head_age_seconds"] > STALL_TIMEOUT:
+        critical.append(f"no new block for {block['head_age_seconds']:.0f}s (height {block['height']})")
+    monad = data.get("monad_status")
+    if monad:
+        if monad.get("sync_status") not in ("in-sync", "Unknown", None):
+            critical.append(f"node is not in sync: {monad['sync_status']}")
+        if monad.get("triedb_percent") is not None and monad["triedb_percent"] > ALERT_DISK_THRESHOLD:
+            warning.append(f"TrieDB is {monad['triedb_percent']}% full")
+    logs = data.get("logs")
+    if logs and logs["missed_blocks"] >= ALERT_TIMEOUT_THRESHOLD:
+        critical.append(f"{logs['missed_blocks']} consecutive missed blocks in the journal")
+    val = data.get("validator_api")
+    if val and val.get("is_jailed"):
+        critical.append("validator is jailed")
+    if "processes" in data:
+        critical += [f"{name} is not running" for name in REQUIRED_PROCESSES if name not in data["processes"]]
+
+    probe = data.get("rpc_probe")
+    if probe:
+        critical += [f"RPC returned bad data: {problem}" for problem in probe["problems"]]
+        if probe["error_pct"] >= 100:
+            critical.append(f"every RPC probe call failed ({probe['last_error']})")
+        overall = probe["methods"].get("all")
+        if overall and overall["max_ms"] > ALERT_RPC_P95_MS:
+            warning.append(f"slowest RPC probe call took {overall['max_ms']:.0f} ms")
+        if probe["lag_blocks"] is not None and probe["lag_blocks"] > ALERT_RPC_LAG_BLOCKS:
+            warning.append(f"node is {probe['lag_blocks']} blocks behind the reference RPC")
+    network = data.get("network")
+    if network and network["peers"] is not None and network["peers"] < ALERT_MIN_PEERS:
+        warning.append(f"only {network['peers']} peers")
+
+    system = data.get("system")
+    if system:
+        if system["cpu_percent"] > ALERT_CPU_THRESHOLD:
+            warning.append(f"CPU at {system['cpu_percent']}%")
+        if system["ram_percent"] > ALERT_RAM_THRESHOLD:
+            warning.append(f"RAM at {system['ram_percent']}%")
+        if system["disk_percent"] > ALERT_DISK_THRESHOLD:
+            warning.append(f"OS disk {system['disk_percent']}% full")
+        warning += [f"NVMe {d['device']} wear at {d['wear_percent']}%" for d in system["nvme"] if d["wear_percent"] >= 100]
+        for role, name in (system["disk_roles"] or {}).items():
+            d = (system["disks"] or {}).get(name)
+            if d and d["await_ms"] is not None and d["await_ms"] > ALERT_DISK_AWAIT_MS:
+                warning.append(f"{role} disk {name} await {d['await_ms']:.1f} ms")
+    return critical, warning
+
+def timed_once(func):
+    started = time.perf_counter()
+    try:
+        data = func()
+        return time.perf_counter() - started, data, None
+    except Exception as e:
+        return time.perf_counter() - started, None, f"{type(e).__name__}: {e}"
+
+def run_once(names, deadline=ONCE_DEADLINE, out=None):
+    """Runs the named collectors in parallel, prints one JSON document and returns the exit code.
+
+    Exit codes follow the Nagios convention: 0 ok, 1 warning, 2 critical,
+    3 unknown (a collector failed or missed the deadline). The document goes to
+    `out` (default sys.stdout).
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="once")
+    futures = {}
+    for name in names:
+        func = ONCE_FUNCTIONS[name]
+        futures[executor.submit(timed_once, func)] = name
+    wait(futures, timeout=deadline)
+
+    results = {}
+    for future, name in futures.items():
+        if not future.done():
+            results[name] = {"ok": False, "error": f"timed out after {deadline}s"}
+            continue
+        elapsed, data, error = future.result()
+        results[name] = {"ok": error is None, "elapsed_ms": round(elapsed * 1000, 1)}
+        results[name]["data" if error is None else "error"] = data if error is None else error
+
+    critical, warning = evaluate_once(results)
+    unknown = [f"{name}: {r['error']}" for name, r in results.items() if not r["ok"]]
+    if critical:
+        status, code = "critical", 2
+    elif unknown:
+        status, code = "unknown", 3
+    elif warning:
+        status, code = "warning", 1
+    else:
+        status, code = "ok", 0
+
+    print(json.dumps({
+        "status": status,
+        "exit_code": code,
+        "problems": critical + unknown + warning,
+        "timestamp": time.time(),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "collectors": results,
+    }, default=str), file=out)
+    return code
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Monad validator watchdog.")
+    parser.add_argument("--once", action="store_true",
+                        help="collect once, print a JSON health snapshot and exit (0 ok, 1 warning, 2 critical, 3 unknown)")
+    parser.add_argument("--collectors", default=",".join(ONCE_COLLECTORS),
+                        help=f"comma-separated collectors for --once (available: {', '.join(ONCE_FUNCTIONS)})")
+    parser.add_argument("--deadline", type=float, default=ONCE_DEADLINE, help="seconds allowed for --once")
+    args = parser.parse_args()
+    if args.once:
+        names = [n.strip() for n in args.collectors.split(",") if n.strip()]
+        unknown_names = [n for n in names if n not in ONCE_FUNCTIONS]
+        if unknown_names or not names:
+            parser.error(f"unknown collectors: {', '.join(unknown_names)}")
+        # Collector warnings go to stderr so stdout carries only the JSON document
+        out, sys.stdout = sys.stdout, sys.stderr
+        code = run_once(names, args.deadline, out)
+        out.flush()
+        # Do not wait for collectors stuck past the deadline
+        os._exit(code)
     main()
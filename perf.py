@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+import collections
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds, Prometheus-style. The last bucket is +Inf.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram. observe() is one bisect and a few adds."""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimates a quantile by interpolating inside the bucket that holds it."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lo = self.bounds[i - 1] if i else 0.0
+                hi = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(lo + (hi - lo) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            # Cumulative counts per upper bound, as the metrics exporter needs them
+            "buckets": list(zip(self.bounds + (float("inf"),), _cumulative(self.counts))),
+        }
+
+
+class WindowedHistogram:
+    """Latency histogram over roughly the last `window` seconds.
+
+    Observations go into the newest of `slots` sub-histograms; the oldest is
+    dropped as time moves on, so quantiles follow recent behaviour instead of
+    the whole uptime. `total` keeps everything for cumulative exports.
+    """
+
+    def __init__(self, window=300, slots=5, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.slot_seconds = window / slots
+        self.slots = [LatencyHistogram(bounds) for _ in range(slots)]
+        self.current = 0
+        self.slot_started = time.monotonic()
+        self.total = LatencyHistogram(bounds)
+
+    def _rotate(self, now):
+        if now - self.slot_started >= self.slot_seconds * len(self.slots):
+            self.slots = [LatencyHistogram(self.bounds) for _ in self.slots]
+            self.slot_started = now
+            return
+        while now - self.slot_started >= self.slot_seconds:
+            self.current = (self.current + 1) % len(self.slots)
+            self.slots[self.current] = LatencyHistogram(self.bounds)
+            self.slot_started += self.slot_seconds
+
+    def observe(self, seconds, now=None):
+        self._rotate(time.monotonic() if now is None else now)
+        self.slots[self.current].observe(seconds)
+        self.total.observe(seconds)
+
+    def recent(self, now=None):
+        """One LatencyHistogram merging every live slot."""
+        self._rotate(time.monotonic() if now is None else now)
+        merged = LatencyHistogram(self.bounds)
+        for hist in self.slots:
+            merged.counts = [a + b for a, b in zip(merged.counts, hist.counts)]
+            merged.count += hist.count
+            merged.sum += hist.sum
+            merged.max = max(merged.max, hist.max)
+        return merged
+
+
+def _cumulative(counts):
+    total = 0
+    out = []
+    for n in counts:
+        total += n
+        out.append(total)
+    return out
+
+
+class PerfRecorder:
+    """Latency histograms and counters for the watchdog's own hot paths.
+
+    Histograms are keyed by (kind, name), e.g. ("collector", "block") or
+    ("outbound", "huginn"). One lock guards everything; an observation holds it
+    for well under a microsecond.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = collections.Counter()
+
+    def observe(self, kind, name, seconds):
+        with self._lock:
+            hist = self.histograms.get((kind, name))
+            if hist is None:
+                hist = self.histograms[(kind, name)] = LatencyHistogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def timed(self, kind, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(kind, name, time.perf_counter() - started)
+
+    def wrap(self, kind, name, func):
+        def timed_call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe(kind, name, time.perf_counter() - started)
+        return timed_call
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "histograms": {key: hist.to_dict() for key, hist in self.histograms.items()},
+                "counters": dict(self.counters),
+            }
+
+
+class SamplingProfiler:
+    """Samples every thread's stack at a fixed rate and writes folded stacks.
+
+    The output is the "collapsed" format read by flamegraph.pl, speedscope and
+    inferno: one `thread;outer;...;inner count` line per distinct stack. Only
+    one profile runs at a time.
+    """
+
+    def __init__(self, output_dir, hz=100):
+        self.output_dir = output_dir
+        self.hz = hz
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self, duration, on_done=None):
+        """Profiles for `duration` seconds in the background. Returns the output path, or None if busy."""
+        with self._lock:
+            if self._running:
+                return None
+            self._running = True
+        path = os.path.join(self.output_dir, time.strftime("watchdog-%Y%m%d-%H%M%S.folded"))
+        threading.Thread(target=self._run, args=(duration, path, on_done), daemon=True, name="profiler").start()
+        return path
+
+    def _run(self, duration, path, on_done):
+        try:
+            stacks = self.sample(duration)
+            with open(path, "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            result = path
+        except Exception as e:
+            print(f"⚠️ [PROFILER] Profiling failed: {e}")
+            result = None
+        finally:
+            with self._lock:
+                self._running = False
+        if on_done:
+            on_done(result)
+
+    def sample(self, duration):
+        stacks = collections.Counter()
+        me = threading.get_ident()
+        interval = 1.0 / self.hz
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                frames.append(names.get(ident, str(ident)).replace(" ", "_").replace(";", "_"))
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(interval)
+        return stacks
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+import base64
+import threading
+import zlib
+from array import array
+
+
+def _count_bits(bitmap, lo, hi):
+    """Set bits of `bitmap` at positions lo..hi-1."""
+    if hi <= lo:
+        return 0
+    count = 0
+    first_full, last_full = (lo + 7) // 8, hi // 8
+    if first_full >= last_full:
+        return sum(1 for i in range(lo, hi) if bitmap[i >> 3] & (1 << (i & 7)))
+    for i in range(lo, first_full * 8):
+        count += bool(bitmap[i >> 3] & (1 << (i & 7)))
+    for i in range(last_full * 8, hi):
+        count += bool(bitmap[i >> 3] & (1 << (i & 7)))
+    return count + bin(int.from_bytes(bitmap[first_full:last_full], "little")).count("1")
+
+
+def _pack(bitmap):
+    return base64.b64encode(zlib.compress(bytes(bitmap))).decode()
+
+
+def _unpack(text, size):
+    data = zlib.decompress(base64.b64decode(text))
+    return bytearray(data[:size].ljust(size, b"\0"))
+
+
+class EpochIndex:
+    """Proposals of one epoch: a seen-bitmap over its blocks, per-validator
+    counts in an array indexed by validator id, and one bitmap per tracked
+    address marking the blocks it proposed."""
+
+    __slots__ = ("epoch", "start", "length", "seen", "blocks", "counts", "ours")
+
+    def __init__(self, epoch, length):
+        self.epoch = epoch
+        self.start = epoch * length
+        self.length = length
+        self.seen = bytearray((length + 7) // 8)
+        self.blocks = 0
+        self.counts = array("I")
+        self.ours = {}  # address -> bytearray
+
+    def count(self, validator_id):
+        return self.counts[validator_id] if validator_id < len(self.counts) else 0
+
+    def proposed(self, address, lo=None, hi=None):
+        """Blocks `address` proposed with lo <= number < hi (the whole epoch by default)."""
+        bitmap = self.ours.get(address)
+        if bitmap is None:
+            return 0
+        lo = 0 if lo is None else max(lo - self.start, 0)
+        hi = self.length if hi is None else min(hi - self.start, self.length)
+        return _count_bits(bitmap, lo, hi)
+
+    def observed(self, lo, hi):
+        return _count_bits(self.seen, max(lo - self.start, 0), min(hi - self.start, self.length))
+
+
+class ProposalTracker:
+    """Attributes every block header to its proposer (the `miner` field).
+
+    Several ingestors may feed the same chain; each block is counted once.
+    Only the last `keep_epochs` epochs are kept. Tracked addresses (our own
+    validators) additionally get a bitmap of the blocks they proposed, which
+    is what the proposal rate, the overdue check and the reconciliation with
+    Huginn's finalized/timeout counters read from.
+    """
+
+    def __init__(self, epoch_length, keep_epochs=3):
+        self.epoch_length = epoch_length
+        self.keep_epochs = keep_epochs
+        self.ids = {}          # proposer address -> validator id
+        self.addresses = []    # validator id -> proposer address
+        self.tracked = set()
+        self.epochs = {}       # epoch -> EpochIndex
+        self.head = None
+        self.last_proposed = {}  # tracked address -> block number
+        self.huginn = {}         # tracked address -> (api height, finalized, timeouts)
+        self.reconciled = {}     # tracked address -> {"through", "local", "huginn", "timeouts"}
+        self._lock = threading.Lock()
+
+    def track(self, address):
+        if address:
+            self.tracked.add(address.lower())
+
+    def _epoch(self, epoch):
+        index = self.epochs.get(epoch)
+        if index is None:
+            if len(self.epochs) >= self.keep_epochs and epoch < min(self.epochs):
+                return None
+            index = self.epochs[epoch] = EpochIndex(epoch, self.epoch_length)
+            for old in sorted(self.epochs)[:-self.keep_epochs]:
+                del self.epochs[old]
+        return index
+
+    def record(self, number, proposer):
+        if not proposer:
+            return
+        proposer = proposer.lower()
+        with self._lock:
+            index = self._epoch(number // self.epoch_length)
+            if index is None:
+                return
+            offset = number - index.start
+            byte, bit = offset >> 3, 1 << (offset & 7)
+            if index.seen[byte] & bit:
+                return
+            index.seen[byte] |= bit
+            index.blocks += 1
+            validator_id = self.ids.get(proposer)
+            if validator_id is None:
+                validator_id = self.ids[proposer] = len(self.addresses)
+                self.addresses.append(proposer)
+            if validator_id >= len(index.counts):
+                index.counts.extend([0] * (validator_id + 1 - len(index.counts)))
+            index.counts[validator_id] += 1
+            if proposer in self.tracked:
+                bitmap = index.ours.get(proposer)
+                if bitmap is None:
+                    bitmap = index.ours[proposer] = bytearray(len(index.seen))
+                bitmap[byte] |= bit
+                self.last_proposed[proposer] = max(number, self.last_proposed.get(proposer, -1))
+            if self.head is None or number > self.head:
+                self.head = number
+
+    def proposed_between(self, address, lo, hi):
+        """(proposed, observed) for blocks lo <= number < hi."""
+        proposed = observed = 0
+        for index in self.epochs.values():
+            if index.start < hi and lo < index.start + index.length:
+                proposed += index.proposed(address, lo, hi)
+                observed += index.observed(lo, hi)
+        return proposed, observed
+
+    def summary(self, address):
+        """Local proposal stats for `address` in the current epoch, or None before the first block."""
+        address = (address or "").lower()
+        with self._lock:
+            if self.head is None:
+                return None
+            current = self.epochs.get(self.head // self.epoch_length)
+            validator_id = self.ids.get(address)
+            proposed = current.proposed(address)
+            # Expected share from the completed epochs we saw; the current one is too young
+            past = [e for e in self.epochs.values() if e is not current and e.blocks]
+            past_blocks = sum(e.blocks for e in past)
+            baseline = sum(e.proposed(address) for e in past) / past_blocks if past_blocks else None
+            last = self.last_proposed.get(address)
+            since = self.head - last if last is not None else None
+            expected = baseline * current.blocks if baseline is not None else None
+            ranking = sorted(range(len(current.counts)), key=current.count, reverse=True)
+            return {
+                "epoch": current.epoch,
+                "blocks": current.blocks,
+                "proposed": proposed,
+                "share": proposed / current.blocks if current.blocks else 0.0,
+                "baseline_share": baseline,
+                "expected": expected,
+                "shortfall": max(expected - proposed, 0.0) if expected is not None else None,
+                "last_proposed": last,
+                "blocks_since_last": since,
+                # Blocks since our last proposal in units of our usual gap between proposals
+                "overdue": since * baseline if since is not None and baseline else None,
+                "rank": ranking.index(validator_id) + 1 if validator_id is not None and current.count(validator_id) else None,
+                "proposers": sum(1 for n in current.counts if n),
+                "reconciled": dict(self.reconciled[address]) if address in self.reconciled else None,
+            }
+
+    def reconcile(self, address, api_height, finalized, timeouts):
+        """Compares Huginn's counter deltas with our own count over the same block range.
+
+        Ranges we did not fully observe are skipped. Returns the running totals for `address`.
+        """
+        address = (address or "").lower()
+        with self._lock:
+            previous = self.huginn.get(address)
+            self.huginn[address] = (api_height, finalized, timeouts)
+            totals = self.reconciled.setdefault(address, {"through": None, "local": 0, "huginn": 0, "timeouts": 0})
+            if previous is None or api_height <= previous[0] or finalized < previous[1]:
+                return dict(totals)
+            local, observed = self.proposed_between(address, previous[0] + 1, api_height + 1)
+            if observed < api_height - previous[0]:
+                return dict(totals)
+            totals["through"] = api_height
+            totals["local"] += local
+            totals["huginn"] += finalized - previous[1]
+            totals["timeouts"] += max(timeouts - previous[2], 0)
+            return dict(totals)
+
+    def to_state(self):
+        with self._lock:
+            return {
+                "epoch_length": self.epoch_length,
+                "addresses": list(self.addresses),
+                "head": self.head,
+                "last_proposed": dict(self.last_proposed),
+                "epochs": {str(e.epoch): {"blocks": e.blocks, "seen": _pack(e.seen), "counts": list(e.counts),
+                                          "ours": {a: _pack(b) for a, b in e.ours.items()}}
+                           for e in self.epochs.values()},
+            }
+
+    def load_state(self, data):
+        with self._lock:
+            if data.get("epoch_length", self.epoch_length) != self.epoch_length:
+                return
+            self.addresses = list(data["addresses"])
+            self.ids = {a: i for i, a in enumerate(self.addresses)}
+            self.head = data["head"]
+            self.last_proposed.update(data.get("last_proposed", {}))
+            for epoch, saved in data["epochs"].items():
+                index = EpochIndex(int(epoch), self.epoch_length)
+                index.blocks = saved["blocks"]
+                index.seen = _unpack(saved["seen"], len(index.seen))
+                index.counts = array("I", saved["counts"])
+                index.ours = {a: _unpack(b, len(index.seen)) for a, b in saved["ours"].items()}
+                self.epochs[index.epoch] = index
+            for old in sorted(self.epochs)[:-self.keep_epochs]:
+                del self.epochs[old]
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+import operator
+
+COMPARATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+SEVERITIES = ("info", "warning", "critical")
+CHANNELS = ("all", "telegram", "discord")
+
+
+class Rule:
+    """One compiled alert rule.
+
+    Spec keys: name, metric, op, threshold, message (required); for (seconds
+    the condition must hold), hysteresis (how far back past the threshold the
+    value must go to clear), cooldown (minimum seconds between notifications),
+    repeat (keep notifying every cooldown while active), severity, channel,
+    group (alerts of one group raised in the same tick share a message),
+    resolved (message sent when the alert clears), enabled.
+    """
+
+    __slots__ = ("name", "metric", "op", "compare", "threshold", "clear_threshold", "duration",
+                 "cooldown", "repeat", "severity", "channel", "group", "message", "resolved")
+
+    def __init__(self, spec):
+        self.name = spec.get("name")
+        if not self.name:
+            raise ValueError(f"rule without a name: {spec!r}")
+        try:
+            self.metric = spec["metric"]
+            self.op = spec["op"]
+            self.threshold = spec["threshold"]
+            self.message = spec["message"]
+        except KeyError as e:
+            raise ValueError(f"rule {self.name}: missing {e.args[0]!r}") from None
+        if self.op not in COMPARATORS:
+            raise ValueError(f"rule {self.name}: unknown comparator {self.op!r}")
+        self.compare = COMPARATORS[self.op]
+
+        hysteresis = spec.get("hysteresis", 0)
+        if self.op in (">", ">="):
+            self.clear_threshold = self.threshold - hysteresis
+        elif self.op in ("<", "<="):
+            self.clear_threshold = self.threshold + hysteresis
+        else:
+            self.clear_threshold = self.threshold
+        self.duration = spec.get("for", 0)
+        self.cooldown = spec.get("cooldown", 300)
+        self.repeat = spec.get("repeat", True)
+        self.severity = spec.get("severity", "warning")
+        self.channel = spec.get("channel", "all")
+        self.group = spec.get("group")
+        self.resolved = spec.get("resolved")
+        if self.severity not in SEVERITIES:
+            raise ValueError(f"rule {self.name}: unknown severity {self.severity!r}")
+        if self.channel not in CHANNELS:
+            raise ValueError(f"rule {self.name}: unknown channel {self.channel!r}")
+        # Render both templates once now, so a typo is rejected here instead of raising on the first firing
+        for template in (self.message, self.resolved):
+            if template is None:
+                continue
+            try:
+                self.render(template, f"{self.metric}@instance", self.threshold)
+            except (KeyError, IndexError, ValueError, TypeError, AttributeError) as e:
+                raise ValueError(f"rule {self.name}: bad template {template!r}: {e!r}") from None
+
+    def cleared(self, value):
+        return not self.compare(value, self.clear_threshold)
+
+    def render(self, template, key, value):
+        instance = key.partition("@")[2]
+        return template.format(value=value, threshold=self.threshold, metric=key, instance=instance, name=self.name)
+
+
+class RuleState:
+    __slots__ = ("pending_since", "active", "last_fired", "value", "last_seen")
+
+    def __init__(self):
+        self.pending_since = None
+        self.active = False
+        self.last_fired = None
+        self.value = None
+        self.last_seen = None
+
+
+class Firing:
+    __slots__ = ("rule", "key", "value", "resolved", "text")
+
+    def __init__(self, rule, key, value, resolved, text):
+        self.rule = rule
+        self.key = key
+        self.value = value
+        self.resolved = resolved
+        self.text = text
+
+
+class RuleEngine:
+    """Evaluates compiled rules against a flat {metric: value} dict in one pass.
+
+    Metric keys are `name` or `name@instance` (a node, disk or process). A rule
+    on `name` applies to the bare key and to every instance; a rule on
+    `name@instance` applies to that instance only. The rules matching a key
+    are resolved once and cached, so a tick costs one dict lookup per metric
+    plus the comparisons. State is kept per (rule, key) and survives reloads
+    of rules with the same name. An alert whose key has not been reported for
+    `expire_after` seconds (a disk, process or RPC method that went away) is
+    cleared as if it had resolved.
+    """
+
+    def __init__(self, specs=(), expire_after=60):
+        self.expire_after = expire_after
+        self.rules = []
+        self.states = {}  # (rule name, key) -> RuleState
+        self._by_metric = {}
+        self._index = {}
+        self.load(specs)
+
+    def load(self, specs):
+        """Compiles `specs`; raises ValueError and keeps the old rules if any spec is invalid."""
+        rules = [Rule(spec) for spec in specs if spec.get("enabled", True)]
+        names = [r.name for r in rules]
+        duplicates = {n for n in names if names.count(n) > 1}
+        if duplicates:
+            raise ValueError(f"duplicate rule names: {', '.join(sorted(duplicates))}")
+        by_metric = {}
+        for rule in rules:
+            by_metric.setdefault(rule.metric, []).append(rule)
+        self.rules = rules
+        self._by_metric = by_metric
+        self._index = {}
+        kept = set(names)
+        self.states = {k: st for k, st in self.states.items() if k[0] in kept}
+
+    def rules_for(self, key):
+        """[(rule, state)] for every rule that applies to `key`, cached after the first lookup."""
+        pairs = self._index.get(key)
+        if pairs is None:
+            rules = list(self._by_metric.get(key, ()))
+            base = key.partition("@")[0]
+            if base != key:
+                rules += self._by_metric.get(base, ())
+            pairs = []
+            for rule in rules:
+                state = self.states.get((rule.name, key))
+                if state is None:
+                    state = self.states[(rule.name, key)] = RuleState()
+                pairs.append((rule, state))
+            self._index[key] = pairs
+        return pairs
+
+    def evaluate(self, metrics, now):
+        firings = []
+        seen = set()
+        for key, value in metrics.items():
+            if value is None:
+                continue
+            seen.add(key)
+            for rule, state in self.rules_for(key):
+                state.value = value
+                state.last_seen = now
+                if not state.active:
+                    if not rule.compare(value, rule.threshold):
+                        state.pending_since = None
+                        continue
+                    if state.pending_since is None:
+                        state.pending_since = now
+                    if now - state.pending_since < rule.duration:
+                        continue
+                    state.active = True
+                    if state.last_fired is None or now - state.last_fired >= rule.cooldown:
+                        state.last_fired = now
+                        firings.append(Firing(rule, key, value, False, rule.render(rule.message, key, value)))
+                elif rule.cleared(value):
+                    state.active = False
+                    state.pending_since = None
+                    if rule.resolved:
+                        firings.append(Firing(rule, key, value, True, rule.render(rule.resolved, key, value)))
+                elif rule.repeat and (state.last_fired is None or now - state.last_fired >= rule.cooldown):
+                    state.last_fired = now
+                    firings.append(Firing(rule, key, value, False, rule.render(rule.message, key, value)))
+        firings += self.expire(seen, now)
+        return firings
+
+    def expire(self, seen, now):
+        """Resets the states of keys missing from this tick; active ones resolve after `expire_after`."""
+        firings = []
+        rules = None
+        for (name, key), state in list(self.states.items()):
+            if key in seen or not (state.active or state.pending_since is not None):
+                continue
+            state.pending_since = None
+            if not state.active:
+                continue
+            if state.last_seen is None:
+                # Restored from disk; give the key a full grace period to reappear
+                state.last_seen = now
+            if now - state.last_seen < self.expire_after:
+                continue
+            state.active = False
+            rules = rules or {r.name: r for r in self.rules}
+            rule = rules.get(name)
+            if rule and rule.resolved and state.value is not None:
+                firings.append(Firing(rule, key, state.value, True, rule.render(rule.resolved, key, state.value)))
+        return firings
+
+    def active(self):
+        """[(rule, key, value)] for every alert currently raised."""
+        rules = {r.name: r for r in self.rules}
+        # Copied first so another thread can read while evaluate() adds states
+        states = sorted(list(self.states.items()), key=lambda item: item[0])
+        return [(rules[name], key, st.value) for (name, key), st in states if st.active and name in rules]
+
+    def to_state(self):
+        return {f"{name}|{key}": [st.active, st.last_fired] for (name, key), st in list(self.states.items())
+                if st.active or st.last_fired is not None}
+
+    def load_state(self, data):
+        for compound, (active, last_fired) in data.items():
+            name, _, key = compound.partition("|")
+            state = self.states.setdefault((name, key), RuleState())
+            state.active = active
+            state.last_fired = last_fired
+        self._index = {}
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+import time
+
+
+class StateStore:
+    """Small JSON state file for warm restarts.
+
+    Every write goes to a temporary file that is fsynced and then renamed over
+    the old one (the directory is fsynced as well), so a crash leaves either
+    the previous or the new state, never a torn file. Unchanged state is never
+    written, and routine changes are written at most once per `min_interval`;
+    `urgent` saves skip that limit for things that must not be replayed.
+    Volatile baselines (raw counters, block heights) are written along with
+    every save but never count as a change, so on their own they only cause
+    a write every `volatile_interval`.
+    """
+
+    def __init__(self, path, min_interval=5, volatile_interval=600):
+        self.path = path
+        self.min_interval = min_interval
+        self.volatile_interval = volatile_interval
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._last_data = None
+        self._last_write = 0.0
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def save(self, state, urgent=False, volatile=None):
+        """Writes `state` if it changed. Returns True when the file was replaced.
+
+        `volatile` is an optional callable returning a dict merged into the
+        written file; it is only called when a write happens.
+        """
+        data = json.dumps(state, sort_keys=True, separators=(",", ":"))
+        with self._lock:
+            now = time.monotonic()
+            changed = data != self._last_data
+            if not changed and (volatile is None or (not urgent and now - self._last_write < self.volatile_interval)):
+                return False
+            if changed and not urgent and now - self._last_write < self.min_interval:
+                return False
+            body = json.dumps({**state, **volatile()}, sort_keys=True, separators=(",", ":")) if volatile else data
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(body)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+            self._last_data = data
+            self._last_write = now
+            self.writes += 1
+            return True
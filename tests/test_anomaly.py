@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import math
+import random
+
+import pytest
+
+from anomaly import AnomalyDetector, AnomalyMonitor, P2Quantile
+
+
+@pytest.mark.parametrize("p", [0.5, 0.9, 0.99])
+def test_p2_converges_to_the_true_quantile(p):
+    rnd = random.Random(1)
+    est = P2Quantile(p)
+    values = [rnd.gauss(100, 10) for _ in range(20000)]
+    for v in values:
+        est.update(v)
+    exact = sorted(values)[int(p * len(values))]
+    assert est.value == pytest.approx(exact, abs=1.0)
+
+
+def test_p2_small_samples_and_round_trip():
+    est = P2Quantile(0.5)
+    assert est.value is None
+    for v in (3, 1, 2):
+        est.update(v)
+    assert est.value == 2
+    for v in range(100):
+        est.update(v)
+    assert P2Quantile.from_dict(est.to_dict()).value == est.value
+
+
+def test_baseline_half_life_matches_slow_alpha():
+    det = AnomalyDetector("x", warmup=1, z_enter=math.inf)  # Never anomalous, so the full alpha applies
+    det.update(0.0)
+    det.update(0.0)
+    steps = round(math.log(2) / det.slow_alpha)
+    for _ in range(steps):
+        det.update(100.0)
+    assert det.mean == pytest.approx(50.0, rel=0.01)
+
+
+def step_detector(**kwargs):
+    rnd = random.Random(2)
+    det = AnomalyDetector("latency", warmup=200, hold=5, **kwargs)
+    for _ in range(1000):
+        assert det.update(10 + rnd.gauss(0, 1)) is None
+    return det, rnd
+
+
+def test_noise_alone_never_enters():
+    det, rnd = step_detector()
+    assert all(det.update(10 + rnd.gauss(0, 1)) is None for _ in range(5000))
+    assert not det.anomalous
+
+
+def test_sustained_step_enters_then_exits():
+    det, rnd = step_detector()
+    events = [det.update(30 + rnd.gauss(0, 1)) for _ in range(200)]
+    assert events.count("enter") == 1
+    assert det.anomalous
+    baseline = det.mean
+    assert baseline < 12  # Barely adapts while anomalous
+    events = [det.update(10 + rnd.gauss(0, 1)) for _ in range(500)]
+    assert events.count("exit") == 1
+    assert not det.anomalous
+
+
+def test_direction_low_ignores_spikes():
+    det, rnd = step_detector(direction="low")
+    assert "enter" not in [det.update(30 + rnd.gauss(0, 1)) for _ in range(200)]
+    assert "enter" in [det.update(-10 + rnd.gauss(0, 1)) for _ in range(200)]
+
+
+def test_monitor_persists_baselines(tmp_path):
+    path = str(tmp_path / "baselines.json")
+    monitor = AnomalyMonitor([AnomalyDetector("cpu"), AnomalyDetector("idle")], path)
+    for v in range(100):
+        monitor.update("cpu", v)
+    monitor.save()
+
+    restored = AnomalyMonitor([AnomalyDetector("cpu"), AnomalyDetector("idle")], path)
+    restored.load()
+    assert restored.detectors["cpu"].to_dict() == monitor.detectors["cpu"].to_dict()
+    assert restored.detectors["idle"].mean is None
+
+
+def test_monitor_ignores_a_corrupt_file(tmp_path):
+    path = tmp_path / "baselines.json"
+    path.write_text("{not json")
+    monitor = AnomalyMonitor([AnomalyDetector("cpu")], str(path))
+    monitor.load()
+    assert monitor.detectors["cpu"].mean is None
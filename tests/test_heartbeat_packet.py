@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+
+import heartbeat_server as hb
+from heartbeat_packet import HEALTH_IN_SYNC, HEALTH_RPC_UP, decode_heartbeat, encode_heartbeat
+
+SECRETS = {"val-1": "s3cret"}
+
+
+def decode(data):
+    return decode_heartbeat(data, SECRETS.get)
+
+
+def test_round_trip():
+    packet = encode_heartbeat("s3cret", "val-1", 7, 123456, HEALTH_RPC_UP | HEALTH_IN_SYNC, now_ms=1000)
+    assert decode(packet) == ("val-1", 7, 1000, 123456, HEALTH_RPC_UP | HEALTH_IN_SYNC)
+
+
+def test_unknown_height_round_trips_as_none():
+    assert decode(encode_heartbeat("s3cret", "val-1", 1, None, 0))[3] is None
+
+
+@pytest.mark.parametrize("mangle", [
+    lambda p: p[:-1] + bytes([p[-1] ^ 1]),        # MAC altered
+    lambda p: p[:20] + bytes([p[20] ^ 1]) + p[21:],  # Payload altered
+    lambda p: p[:-3],                             # Truncated
+    lambda p: b"XXXX" + p[4:],                    # Wrong magic
+])
+def test_tampered_packets_are_rejected(mangle):
+    assert decode(mangle(encode_heartbeat("s3cret", "val-1", 1, 10, 0))) is None
+
+
+def test_wrong_secret_or_unknown_node_is_rejected():
+    assert decode(encode_heartbeat("guess", "val-1", 1, 10, 0)) is None
+    assert decode(encode_heartbeat("s3cret", "val-2", 1, 10, 0)) is None
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(hb, "HEARTBEAT_SECRETS", dict(SECRETS))
+    monkeypatch.setattr(hb, "send_alert", lambda msg: None)
+    return hb.HeartbeatService()
+
+
+def test_replayed_and_stale_datagrams_are_dropped(service):
+    protocol = hb.HeartbeatDatagramProtocol(service)
+    first = encode_heartbeat("s3cret", "val-1", 5, 100, 0)
+    protocol.datagram_received(first, None)
+    protocol.datagram_received(first, None)  # Replay
+    protocol.datagram_received(encode_heartbeat("s3cret", "val-1", 4, 100, 0), None)  # Older sequence
+    stale_ms = int((time.time() - 2 * hb.HEARTBEAT_MAX_SKEW) * 1000)
+    protocol.datagram_received(encode_heartbeat("s3cret", "val-1", 6, 100, 0, now_ms=stale_ms), None)
+    assert protocol.rejected == 3
+    assert service.nodes["val-1"].pings == 1
+    protocol.datagram_received(encode_heartbeat("s3cret", "val-1", 6, 101, 0), None)
+    assert service.nodes["val-1"].height == 101
+
+
+def test_signed_nodes_refuse_plain_pings(service):
+    assert service.ping("val-1") is None
+    assert service.signed_ping(*decode(encode_heartbeat("s3cret", "val-1", 1, 100, 0)))
+    assert service.ping("val-1") is None
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from proposals import EpochIndex, ProposalTracker, _count_bits
+
+OURS = "0xabc"
+
+
+def naive_count(bitmap, lo, hi):
+    return sum(1 for i in range(lo, hi) if bitmap[i >> 3] & (1 << (i & 7)))
+
+
+@pytest.mark.parametrize("lo,hi", [(0, 0), (0, 7), (3, 5), (3, 64), (8, 16), (5, 200), (0, 256), (100, 99)])
+def test_count_bits_matches_naive_count(lo, hi):
+    rnd = random.Random(lo * 1000 + hi)
+    bitmap = bytearray(rnd.getrandbits(8) for _ in range(32))
+    assert _count_bits(bitmap, lo, hi) == naive_count(bitmap, lo, hi)
+
+
+def test_epoch_index_clamps_ranges():
+    index = EpochIndex(2, 100)
+    assert index.start == 200
+    index.ours[OURS] = bytearray(len(index.seen))
+    for offset in (0, 50, 99):
+        index.ours[OURS][offset >> 3] |= 1 << (offset & 7)
+    assert index.proposed(OURS) == 3
+    assert index.proposed(OURS, 250, 1000) == 2
+    assert index.proposed(OURS, 0, 250) == 1
+    assert index.proposed("0xother") == 0
+
+
+def test_each_block_counts_once():
+    tracker = ProposalTracker(epoch_length=100)
+    tracker.track(OURS.upper())
+    for _ in range(2):  # A second ingestor delivers the same blocks
+        tracker.record(10, OURS)
+        tracker.record(11, "0xdef")
+    summary = tracker.summary(OURS)
+    assert (summary["blocks"], summary["proposed"], summary["proposers"]) == (2, 1, 2)
+    assert summary["last_proposed"] == 10
+
+
+def test_summary_against_previous_epochs():
+    tracker = ProposalTracker(epoch_length=100)
+    tracker.track(OURS)
+    for n in range(100):  # Epoch 0: every tenth block is ours
+        tracker.record(n, OURS if n % 10 == 0 else "0xdef")
+    for n in range(100, 150):  # Epoch 1 so far: none
+        tracker.record(n, "0xdef")
+    summary = tracker.summary(OURS)
+    assert summary["epoch"] == 1
+    assert summary["baseline_share"] == pytest.approx(0.1)
+    assert summary["expected"] == pytest.approx(5)
+    assert summary["shortfall"] == pytest.approx(5)
+    assert summary["blocks_since_last"] == 149 - 90
+    assert summary["overdue"] == pytest.approx(5.9)
+
+
+def test_old_epochs_are_dropped():
+    tracker = ProposalTracker(epoch_length=10, keep_epochs=2)
+    for n in range(50):
+        tracker.record(n, "0xdef")
+    assert sorted(tracker.epochs) == [3, 4]
+    tracker.record(5, "0xdef")  # Older than everything kept
+    assert sorted(tracker.epochs) == [3, 4]
+
+
+def test_reconcile_only_fully_observed_ranges():
+    tracker = ProposalTracker(epoch_length=100)
+    tracker.track(OURS)
+    for n in range(0, 60):
+        tracker.record(n, OURS if n % 5 == 0 else "0xdef")
+    tracker.reconcile(OURS, 9, 100, 1)
+    totals = tracker.reconcile(OURS, 59, 110, 2)
+    assert totals == {"through": 59, "local": 10, "huginn": 10, "timeouts": 1}
+    totals = tracker.reconcile(OURS, 80, 112, 2)  # Blocks 60..80 were never seen
+    assert totals["through"] == 59
+
+
+def test_state_round_trip():
+    tracker = ProposalTracker(epoch_length=100)
+    tracker.track(OURS)
+    for n in range(250):
+        tracker.record(n, OURS if n % 7 == 0 else "0xdef")
+    restored = ProposalTracker(epoch_length=100)
+    restored.track(OURS)
+    restored.load_state(tracker.to_state())
+    assert restored.summary(OURS) == tracker.summary(OURS)
+
+    mismatched = ProposalTracker(epoch_length=50)
+    mismatched.load_state(tracker.to_state())
+    assert mismatched.head is None
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from rules import RuleEngine, Rule
+
+
+def cpu_rule(**extra):
+    spec = {"name": "cpu_high", "metric": "cpu", "op": ">", "threshold": 90, "hysteresis": 10, "cooldown": 300,
+            "message": "CPU {value:.0f}% on {instance}", "resolved": "CPU back to {value:.0f}%"}
+    spec.update(extra)
+    return spec
+
+
+def texts(firings):
+    return [(f.text, f.resolved) for f in firings]
+
+
+def test_fires_after_duration():
+    engine = RuleEngine([cpu_rule(**{"for": 10})])
+    assert engine.evaluate({"cpu": 95}, 0) == []
+    assert engine.evaluate({"cpu": 95}, 5) == []
+    assert texts(engine.evaluate({"cpu": 95}, 10)) == [("CPU 95% on ", False)]
+
+
+def test_dip_resets_pending_duration():
+    engine = RuleEngine([cpu_rule(**{"for": 10})])
+    engine.evaluate({"cpu": 95}, 0)
+    engine.evaluate({"cpu": 50}, 5)
+    assert engine.evaluate({"cpu": 95}, 10) == []
+    assert len(engine.evaluate({"cpu": 95}, 20)) == 1
+
+
+def test_hysteresis_holds_until_clear_threshold():
+    engine = RuleEngine([cpu_rule(repeat=False)])
+    engine.evaluate({"cpu": 95}, 0)
+    assert engine.evaluate({"cpu": 85}, 1) == []  # Below threshold, above clear_threshold
+    assert [key for _, key, _ in engine.active()] == ["cpu"]
+    assert texts(engine.evaluate({"cpu": 79}, 2)) == [("CPU back to 79%", True)]
+    assert engine.active() == []
+
+
+def test_cooldown_spaces_repeats():
+    engine = RuleEngine([cpu_rule()])
+    assert len(engine.evaluate({"cpu": 95}, 0)) == 1
+    assert engine.evaluate({"cpu": 95}, 299) == []
+    assert len(engine.evaluate({"cpu": 95}, 300)) == 1
+
+
+def test_cooldown_applies_to_refire_after_resolve():
+    engine = RuleEngine([cpu_rule()])
+    engine.evaluate({"cpu": 95}, 0)
+    engine.evaluate({"cpu": 50}, 10)
+    assert engine.evaluate({"cpu": 95}, 20) == []
+    assert [key for _, key, _ in engine.active()] == ["cpu"]
+
+
+def test_base_rule_covers_instances():
+    engine = RuleEngine([cpu_rule(metric="disk_await_ms", message="{instance} {value}")])
+    firings = engine.evaluate({"disk_await_ms@nvme0": 95, "disk_await_ms@nvme1": 1}, 0)
+    assert texts(firings) == [("nvme0 95", False)]
+
+
+def test_missing_key_resolves_after_expiry():
+    engine = RuleEngine([cpu_rule(metric="disk_await_ms")], expire_after=60)
+    engine.evaluate({"disk_await_ms@nvme0": 95}, 0)
+    assert engine.evaluate({"disk_await_ms@nvme0": None}, 30) == []
+    assert texts(engine.evaluate({}, 60)) == [("CPU back to 95%", True)]
+    assert engine.active() == []
+
+
+def test_state_survives_reload_and_restore():
+    engine = RuleEngine([cpu_rule()])
+    engine.evaluate({"cpu": 95}, 0)
+    engine.load([cpu_rule(threshold=92)])
+    assert engine.evaluate({"cpu": 95}, 10) == []  # Still active and inside the cooldown
+
+    restored = RuleEngine([cpu_rule()])
+    restored.load_state(engine.to_state())
+    assert [key for _, key, _ in restored.active()] == ["cpu"]
+
+
+@pytest.mark.parametrize("spec", [
+    cpu_rule(message="{val}"),
+    cpu_rule(resolved="{value:.1f"),
+    cpu_rule(op="=>"),
+    cpu_rule(severity="page"),
+    {"name": "no_metric", "op": ">", "threshold": 1, "message": "x"},
+])
+def test_invalid_spec_is_rejected(spec):
+    with pytest.raises(ValueError):
+        Rule(spec)
+
+
+def test_invalid_reload_keeps_old_rules():
+    engine = RuleEngine([cpu_rule()])
+    with pytest.raises(ValueError):
+        engine.load([cpu_rule(), cpu_rule()])
+    assert [r.name for r in engine.rules] == ["cpu_high"]
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from timeseries import MetricsStore, RingBuffer, TimeSeries
+
+
+def test_ring_buffer_wraps_and_keeps_order():
+    ring = RingBuffer(4)
+    assert ring.oldest() is None
+    for t in range(6):
+        ring.append(t, t * 10, t * 10, t * 10)
+    assert ring.count == 4
+    assert ring.oldest() == 2
+    avgs, _, _ = ring.window(0)
+    assert list(avgs) == [20, 30, 40, 50]
+    avgs, _, _ = ring.window(4)  # Crosses the wrap point
+    assert list(avgs) == [40, 50]
+
+
+def test_raw_window_stats():
+    series = TimeSeries()
+    for t in range(100):
+        series.append(1000 + t, float(t))
+    stats = series.stats(10, now=1099)
+    assert stats["count"] == 11
+    assert (stats["min"], stats["max"]) == (89, 99)
+    assert stats["avg"] == pytest.approx(94)
+    assert series.stats(10, now=5000) is None
+
+
+def test_falls_back_to_downsampled_tier_with_open_bucket():
+    series = TimeSeries(tiers=((0, 10), (60, 100)))
+    for t in range(0, 600):
+        series.append(t, 1.0 if t % 60 else 5.0)
+    # The raw tier only covers the last 10 s, so a 5 min window reads 1 min buckets
+    stats = series.stats(300, now=599)
+    assert stats["count"] == 5  # Buckets starting at 300..480 plus the open one at 540
+    assert stats["max"] == 5.0 and stats["min"] == 1.0
+    assert stats["avg"] == pytest.approx((59 + 5) / 60)
+
+
+def test_p99_on_raw_samples():
+    series = TimeSeries()
+    for t in range(1000):
+        series.append(t, float(t % 100))
+    assert series.stats(1000, now=999)["p99"] == 99
+
+
+def test_store_skips_none_and_tracks_names():
+    store = MetricsStore()
+    store.record("cpu", None, 1)
+    assert store.stats("cpu", 60, now=1) is None
+    store.record("cpu", 10, 1)
+    store.record("cpu", 30, 2)
+    assert store.stats("cpu", 60, now=2)["avg"] == 20
+    assert store.names() == ["cpu"]
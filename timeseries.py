@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from array import array
+
+# --- DOWNSAMPLING TIERS ---
+# (bucket size in seconds, capacity). A bucket size of 0 keeps raw samples.
+DEFAULT_TIERS = (
+    (0, 3600),      # raw samples (~2 h at a 2 s cadence)
+    (60, 10080),    # 1 min buckets for 7 days
+    (3600, 2160),   # 1 h buckets for 90 days
+)
+
+
+class RingBuffer:
+    """Fixed-size circular buffer of (timestamp, avg, min, max) doubles."""
+
+    __slots__ = ("capacity", "times", "avgs", "mins", "maxs", "head", "count")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.avgs = array("d", bytes(8 * capacity))
+        self.mins = array("d", bytes(8 * capacity))
+        self.maxs = array("d", bytes(8 * capacity))
+        self.head = 0
+        self.count = 0
+
+    def append(self, t, avg, lo, hi):
+        i = self.head
+        self.times[i] = t
+        self.avgs[i] = avg
+        self.mins[i] = lo
+        self.maxs[i] = hi
+        self.head = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def oldest(self):
+        return self.times[(self.head - self.count) % self.capacity] if self.count else None
+
+    def window(self, since):
+        """Returns (avgs, mins, maxs) for entries with timestamp >= since, oldest first."""
+        start = (self.head - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            spans = [(start, start + self.count)]
+        else:
+            spans = [(start, self.capacity), (0, self.head)]
+
+        avgs, mins, maxs = array("d"), array("d"), array("d")
+        for lo, hi in spans:
+            times = self.times[lo:hi]
+            # Timestamps are sorted within a span, so bisect instead of scanning
+            first = _bisect(times, since)
+            avgs.extend(self.avgs[lo + first:hi])
+            mins.extend(self.mins[lo + first:hi])
+            maxs.extend(self.maxs[lo + first:hi])
+        return avgs, mins, maxs
+
+
+def _bisect(times, value):
+    lo, hi = 0, len(times)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if times[mid] < value:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class TimeSeries:
+    """One metric, kept at every tier. Appends are O(1)."""
+
+    __slots__ = ("tiers", "pending")
+
+    def __init__(self, tiers=DEFAULT_TIERS):
+        self.tiers = [(size, RingBuffer(capacity)) for size, capacity in tiers]
+        # Open bucket per downsampled tier: [bucket_start, sum, n, min, max]
+        self.pending = [None] * len(self.tiers)
+
+    def append(self, t, value):
+        for i, (size, ring) in enumerate(self.tiers):
+            if size == 0:
+                ring.append(t, value, value, value)
+                continue
+            bucket_start = t - t % size
+            bucket = self.pending[i]
+            if bucket is not None and bucket[0] != bucket_start:
+                ring.append(bucket[0], bucket[1] / bucket[2], bucket[3], bucket[4])
+                bucket = None
+            if bucket is None:
+                self.pending[i] = [bucket_start, value, 1, value, value]
+            else:
+                bucket[1] += value
+                bucket[2] += 1
+                if value < bucket[3]:
+                    bucket[3] = value
+                if value > bucket[4]:
+                    bucket[4] = value
+
+    def stats(self, window, now=None):
+        """min/max/avg/p99 over the last `window` seconds from the finest tier that covers it."""
+        now = time.time() if now is None else now
+        since = now - window
+        tier = len(self.tiers) - 1
+        for i, (_, candidate) in enumerate(self.tiers):
+            oldest = candidate.oldest()
+            if oldest is not None and (oldest <= since or candidate.count < candidate.capacity):
+                tier = i
+                break
+        size, ring = self.tiers[tier]
+
+        avgs, mins, maxs = ring.window(since)
+        if size:
+            # Include the still-open bucket so recent samples are not hidden
+            bucket = self.pending[tier]
+            if bucket is not None and bucket[0] >= since - size:
+                avgs.append(bucket[1] / bucket[2])
+                mins.append(bucket[3])
+                maxs.append(bucket[4])
+        if not avgs:
+            return None
+
+        # On downsampled tiers p99 is taken over bucket maxima (an upper bound)
+        ranked = sorted(maxs if size else avgs)
+        return {
+            "min": min(mins),
+            "max": max(maxs),
+            "avg": sum(avgs) / len(avgs),
+            "p99": ranked[min(len(ranked) - 1, int(len(ranked) * 0.99))],
+            "count": len(avgs),
+        }
+
+
+class MetricsStore:
+    """Thread-safe collection of named time series with bounded memory."""
+
+    def __init__(self, tiers=DEFAULT_TIERS):
+        self.tiers = tiers
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, value, t=None):
+        if value is None:
+            return
+        t = time.time() if t is None else t
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = TimeSeries(self.tiers)
+            series.append(t, float(value))
+
+    def stats(self, name, window, now=None):
+        with self._lock:
+            series = self._series.get(name)
+            return series.stats(window, now) if series else None
+
+    def names(self):
+        with self._lock:
+            return list(self._series)